@@ -0,0 +1,85 @@
+# benchmarks/bench_bulk_insert.py
+"""
+Rows/sec of insert_new_data (COPY and multi-row INSERT ... ON CONFLICT)
+against plain ORM create_all.
+
+Needs the database from .env:
+    python -m benchmarks.bench_bulk_insert --games 2000 --moves 40
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from constants import CONN_STRING
+from database.database.engine import init_db
+from database.database.db_interface import DBInterface
+from database.database.models import Player, Game, Move
+from database.operations.format_games import insert_new_data
+from database.operations.models import GAME_COLUMNS, MOVE_COLUMNS
+from benchmarks.synthetic import db_rows, BENCH_WHITE, BENCH_BLACK, BENCH_LINK_BASE
+
+
+async def clean_bench_rows():
+    # open_request never commits, the deletes need a session that does
+    async with DBInterface(Game).session_scope() as session:
+        await session.execute(text("DELETE FROM moves WHERE link >= :base"), {"base": BENCH_LINK_BASE})
+        await session.execute(text("DELETE FROM game WHERE link >= :base"), {"base": BENCH_LINK_BASE})
+        # the bench players only ever play the bench games
+        await session.execute(text("DELETE FROM player_game_counts WHERE player_name IN (:white, :black)"),
+                              {"white": BENCH_WHITE, "black": BENCH_BLACK})
+
+
+async def orm_insert(games_list, moves_list):
+    game_interface = DBInterface(Game)
+    async with game_interface.session_scope() as session:
+        await game_interface.create_all(games_list, session=session)
+        await DBInterface(Move).create_all(moves_list, session=session)
+
+
+async def run_once(games_list, moves_list, method: str) -> float:
+    await clean_bench_rows()
+    # the formatter already hands tuples to insert_new_data, the ORM wants dicts
+    games_rows = [tuple(game[column] for column in GAME_COLUMNS) for game in games_list]
+    moves_rows = [tuple(move[column] for column in MOVE_COLUMNS) for move in moves_list]
+    start = time.perf_counter()
+    if method == "orm":
+        await orm_insert(games_list, moves_list)
+    else:
+        await insert_new_data(games_rows, moves_rows, [], use_copy=method == "copy")
+    return time.perf_counter() - start
+
+
+async def main(n_games: int, moves_per_game: int):
+    await init_db(CONN_STRING)
+    DBInterface.initialize_engine_and_session(CONN_STRING)
+
+    player_interface = DBInterface(Player)
+    async with player_interface.session_scope() as session:
+        for player_name in (BENCH_WHITE, BENCH_BLACK):
+            if await session.get(Player, player_name) is None:
+                session.add(Player(player_name=player_name))
+
+    games_list, moves_list = db_rows(n_games, moves_per_game)
+    n_rows = len(games_list) + len(moves_list)
+
+    results = {}
+    for method in ("orm", "insert", "copy"):
+        results[method] = await run_once(games_list, moves_list, method)
+    await clean_bench_rows()
+
+    print('#####')
+    print(f"{n_games} games, {len(moves_list)} moves ({n_rows} rows)")
+    for label, elapsed in results.items():
+        print(f"{label:>6}: {elapsed:8.2f} s  {n_rows / elapsed:12,.0f} rows/s")
+    print(f"speedup: {results['orm'] / results['copy']:.1f}x")
+    print('#####')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--moves", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(main(args.games, args.moves))
@@ -0,0 +1,44 @@
+# benchmarks/bench_format_pool.py
+"""
+Games/sec of format_games_in_pool for growing format pool sizes,
+against formatting in a single thread (no pool).
+
+    python -m benchmarks.bench_format_pool --games 20000 --workers 1 2 4 8 16
+"""
+import argparse
+import asyncio
+import time
+
+from database.operations import format_games
+from benchmarks.synthetic import raw_month
+
+
+async def games_per_second(games, chunk_size: int) -> float:
+    start = time.perf_counter()
+    formatted = await format_games.format_games_in_pool(games, chunk_size=chunk_size)
+    assert len(formatted.game_rows) == len(games)
+    return len(games) / (time.perf_counter() - start)
+
+
+async def main(n_games: int, workers, chunk_size: int):
+    games = raw_month(n_games)
+    print('#####')
+    baseline = await games_per_second(games, chunk_size)
+    print(f"no pool (thread): {baseline:10,.0f} games/s")
+    for n_workers in workers:
+        format_games.start_format_pool(n_workers)
+        # warm-up: spawning workers and importing the formatter is not formatting
+        await format_games.format_games_in_pool(games[:n_workers * chunk_size], chunk_size=chunk_size)
+        rate = await games_per_second(games, chunk_size)
+        await format_games.stop_format_pool()
+        print(f"{n_workers:>3} workers:      {rate:10,.0f} games/s  ({rate / baseline:.1f}x)")
+    print('#####')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.games, args.workers, args.chunk_size))
@@ -0,0 +1,78 @@
+# benchmarks/bench_pgn_headers.py
+"""
+Games/sec of PGN header extraction: one get_pgn_item split per tag (before)
+against the single-pass parse_pgn_headers (after), over a synthetic month archive.
+
+    python -m benchmarks.bench_pgn_headers --games 3000
+"""
+import argparse
+import time
+from datetime import datetime
+
+from database.operations.format_games import (
+    get_pgn_item, get_start_and_end_date, parse_pgn_headers, create_game_dict
+)
+from benchmarks.synthetic import raw_month
+
+
+def legacy_start_and_end_date(game, game_for_db):
+    """get_start_and_end_date as it was, one get_pgn_item call per tag."""
+    game_date = get_pgn_item(game['pgn'], item='Date').split('.')
+    game_for_db['year'], game_for_db['month'], game_for_db['day'] = (int(x) for x in game_date)
+    start = get_pgn_item(game['pgn'], item='StartTime').split(':')
+    game_for_db['hour'], game_for_db['minute'], game_for_db['second'] = (int(x) for x in start)
+    end_date = get_pgn_item(game['pgn'], item='EndDate').split('.')
+    end_time = get_pgn_item(game['pgn'], item='EndTime').split(':')
+    game_end = datetime(*(int(x) for x in end_date), *(int(x) for x in end_time))
+    game_start = datetime(game_for_db['year'], game_for_db['month'], game_for_db['day'],
+                          game_for_db['hour'], game_for_db['minute'], game_for_db['second'])
+    game_for_db['time_elapsed'] = (game_end - game_start).total_seconds()
+    get_pgn_item(game['pgn'], item='Termination')
+    return game_for_db
+
+
+def games_per_second(function, games, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for game in games:
+            function(game)
+        best = min(best, time.perf_counter() - start)
+    return len(games) / best
+
+
+def main(n_games: int, repeat: int):
+    games = raw_month(n_games)
+
+    for game in games[:50]:
+        before = legacy_start_and_end_date(game, {})
+        after = get_start_and_end_date(game, {})
+        assert before['time_elapsed'] == after['time_elapsed'], game['url']
+
+    tags_before = games_per_second(
+        lambda game: [get_pgn_item(game['pgn'], item) for item in ('Date', 'StartTime', 'EndDate', 'EndTime', 'Termination')],
+        games, repeat
+    )
+    tags_after = games_per_second(lambda game: parse_pgn_headers(game['pgn']), games, repeat)
+    before = games_per_second(lambda game: legacy_start_and_end_date(game, {}), games, repeat)
+    after = games_per_second(
+        lambda game: (get_start_and_end_date(game, {}, parse_pgn_headers(game['pgn']))), games, repeat
+    )
+    full = games_per_second(create_game_dict, games, repeat)
+
+    print('#####')
+    print(f"{n_games} games")
+    print(f"tags only, get_pgn_item x5:    {tags_before:11,.0f} games/s")
+    print(f"tags only, parse_pgn_headers:  {tags_after:11,.0f} games/s  ({tags_after / tags_before:.1f}x)")
+    print(f"dates, get_pgn_item x5:        {before:11,.0f} games/s")
+    print(f"dates, parse_pgn_headers:      {after:11,.0f} games/s  ({after / before:.1f}x)")
+    print(f"full create_game_dict:         {full:11,.0f} games/s")
+    print('#####')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.games, args.repeat)
@@ -0,0 +1,89 @@
+# benchmarks/bench_pipeline.py
+"""
+Games/sec of the whole ingestion pipeline (ingest_months: format pool and
+inserts, months of synthetic games instead of downloads) for growing numbers
+of months formatted at the same time.
+
+Needs the database from .env:
+    python -m benchmarks.bench_pipeline --months 24 --games 300 --format-months 1 2 4 8
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from constants import CONN_STRING, FORMAT_WORKERS
+from database.database.engine import init_db
+from database.database.db_interface import DBInterface
+from database.database.models import Month
+from database.operations import format_games
+from database.operations.pipeline import ingest_months
+from benchmarks.synthetic import raw_month, BENCH_WHITE, BENCH_LINK_BASE
+from benchmarks.bench_bulk_insert import clean_bench_rows
+
+
+class SyntheticMonths:
+    """
+    Stands in for the FairDownloadScheduler ingest_months can read from:
+    yields the months at once, as if every download was instant.
+    """
+
+    def __init__(self, n_games: int):
+        self.n_games = n_games
+
+    async def stream(self, player_name, months):
+        for i, month_str in enumerate(months):
+            year, month = (int(value) for value in month_str.split('-'))
+            yield year, month, raw_month(self.n_games, link_base=BENCH_LINK_BASE + i * self.n_games, seed=i)
+
+
+async def clean_pipeline_rows():
+    await clean_bench_rows()
+    async with DBInterface(Month).session_scope() as session:
+        await session.execute(text("DELETE FROM months WHERE player_name = :player_name"),
+                              {"player_name": BENCH_WHITE})
+
+
+async def games_per_second(months, n_games: int, format_months: int) -> float:
+    await clean_pipeline_rows()
+    start = time.perf_counter()
+    summary = await ingest_months(BENCH_WHITE, months, scheduler=SyntheticMonths(n_games),
+                                  format_months=format_months)
+    elapsed = time.perf_counter() - start
+    assert summary["games"] == len(months) * n_games
+    return summary["games"] / elapsed
+
+
+async def main(n_months: int, n_games: int, format_months_options, workers: int):
+    await init_db(CONN_STRING)
+    DBInterface.initialize_engine_and_session(CONN_STRING)
+    format_games.start_format_pool(workers)
+    # 2000-01 onwards: finished months, far from any real one of the bench player
+    months = [f"{2000 + i // 12}-{1 + i % 12:02d}" for i in range(n_months)]
+    results = {}
+    try:
+        # warm-up: spawning workers and importing the formatter is not formatting
+        await format_games.format_games_in_pool(raw_month(workers * 10), chunk_size=10)
+        for format_months in format_months_options:
+            results[format_months] = await games_per_second(months, n_games, format_months)
+    finally:
+        await clean_pipeline_rows()
+        await format_games.stop_format_pool()
+
+    print('#####')
+    print(f"{n_months} months of {n_games} games, {workers} format workers")
+    baseline = results[format_months_options[0]]
+    for format_months, rate in results.items():
+        print(f"{format_months:>3} months formatting: {rate:10,.0f} games/s  ({rate / baseline:.1f}x)")
+    print('#####')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--games", type=int, default=300)
+    parser.add_argument("--format-months", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--workers", type=int, default=FORMAT_WORKERS)
+    args = parser.parse_args()
+    asyncio.run(main(args.months, args.games, args.format_months, args.workers))
@@ -0,0 +1,114 @@
+# benchmarks/bench_player_lookup.py
+"""
+Seconds to find (and insert) the player names not in the DB yet: the temporary
+table lookup and the multi-row upsert (before) against the unnest anti-join and
+insert of check_player_in_db (after). Half of the names already exist.
+
+Needs the database from .env:
+    python -m benchmarks.bench_player_lookup --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Set
+
+from sqlalchemy import text
+
+from constants import CONN_STRING
+from database.database.engine import init_db
+from database.database.db_interface import DBInterface
+from database.database.models import Player
+from database.operations.check_player_in_db import get_only_players_not_in_db, insert_missing_players
+
+BENCH_PREFIX = "bench_lookup_"
+
+
+async def legacy_get_only_players_not_in_db(player_names: Set[str]) -> Set[str]:
+    """
+    get_only_players_not_in_db as it was: temporary table filled with string built
+    multi-VALUES inserts, then a join. The inserts were gathered on one session,
+    which runs them one after the other anyway, so here they simply are.
+    """
+    player_interface = DBInterface(Player)
+    player_names_list = list(player_names)
+    async with player_interface.session_scope() as session:
+        await session.execute(text("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS temp_player_names (
+                player_name_col VARCHAR PRIMARY KEY
+            ) ON COMMIT DROP;
+        """))
+        for i in range(0, len(player_names_list), 1000):
+            batch = player_names_list[i:i + 1000]
+            values_clause = ", ".join([f"('{name.replace("'", "''")}')" for name in batch])
+            await session.execute(text(f"INSERT INTO temp_player_names (player_name_col) VALUES {values_clause};"))
+        result = await session.execute(text(
+            "SELECT p.player_name FROM player p JOIN temp_player_names t ON p.player_name = t.player_name_col"
+        ))
+        found = set(result.scalars().all())
+    return player_names - found
+
+
+async def legacy_insert_players(player_names: Set[str]) -> List[str]:
+    """insert_players_of_games as it was: upsert_all, one multi-row INSERT per bind parameter batch."""
+    return await DBInterface(Player).upsert_all(
+        [{"player_name": name} for name in player_names], ['player_name'], returning='player_name'
+    )
+
+
+async def reset_bench_players(existing: List[str]):
+    async with DBInterface(Player).session_scope() as session:
+        await session.execute(text("DELETE FROM player WHERE player_name LIKE :prefix"),
+                              {"prefix": BENCH_PREFIX + "%"})
+    await insert_missing_players(existing)
+
+
+async def timed(coroutine) -> float:
+    start = time.perf_counter()
+    await coroutine
+    return time.perf_counter() - start
+
+
+async def bench_size(n_names: int):
+    names = {f"{BENCH_PREFIX}{i}" for i in range(n_names)}
+    existing = sorted(names)[::2]
+
+    await reset_bench_players(existing)
+    legacy_missing = await legacy_get_only_players_not_in_db(names)
+    missing = await get_only_players_not_in_db(names)
+    assert legacy_missing == missing, "both lookups have to find the same players"
+
+    results = {
+        "lookup before": await timed(legacy_get_only_players_not_in_db(names)),
+        "lookup after": await timed(get_only_players_not_in_db(names)),
+    }
+    await reset_bench_players(existing)
+    results["insert before"] = await timed(legacy_insert_players(names))
+    await reset_bench_players(existing)
+    results["insert after"] = await timed(insert_missing_players(names))
+
+    print('#####')
+    print(f"{n_names} names, {len(missing)} not in DB")
+    for label, elapsed in results.items():
+        print(f"{label:>14}: {elapsed:8.3f} s")
+    print(f"lookup speedup: {results['lookup before'] / results['lookup after']:.1f}x, "
+          f"insert speedup: {results['insert before'] / results['insert after']:.1f}x")
+    print('#####')
+
+
+async def main(sizes: List[int]):
+    await init_db(CONN_STRING)
+    DBInterface.initialize_engine_and_session(CONN_STRING)
+    try:
+        for n_names in sizes:
+            await bench_size(n_names)
+    finally:
+        async with DBInterface(Player).session_scope() as session:
+            await session.execute(text("DELETE FROM player WHERE player_name LIKE :prefix"),
+                                  {"prefix": BENCH_PREFIX + "%"})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes))
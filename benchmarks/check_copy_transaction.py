@@ -0,0 +1,102 @@
+# benchmarks/check_copy_transaction.py
+"""
+Checks that copy_all's COPY, staging table and merge all run in the caller's
+transaction: rows copied in a session that fails are rolled back with it,
+and a committed merge skips the rows that already exist.
+
+Needs the database from .env:
+    python -m benchmarks.check_copy_transaction
+"""
+import asyncio
+import sys
+
+from sqlalchemy import text
+
+from constants import CONN_STRING
+from database.database.engine import init_db
+from database.database.db_interface import DBInterface
+from database.database.models import Player, Game, Move
+from database.operations.models import GAME_COLUMNS, MOVE_COLUMNS
+from benchmarks.synthetic import db_rows, BENCH_WHITE, BENCH_BLACK, BENCH_LINK_BASE
+from benchmarks.bench_bulk_insert import clean_bench_rows
+
+
+class Rollback(Exception):
+    pass
+
+
+async def count_bench_games(session) -> int:
+    result = await session.execute(text("SELECT COUNT(*) FROM game WHERE link >= :base"),
+                                   {"base": BENCH_LINK_BASE})
+    return result.scalar()
+
+
+async def check() -> bool:
+    games_list, moves_list = db_rows(200, 10)
+    games_rows = [tuple(game[column] for column in GAME_COLUMNS) for game in games_list]
+    moves_rows = [tuple(move[column] for column in MOVE_COLUMNS) for move in moves_list]
+    game_interface = DBInterface(Game)
+    move_interface = DBInterface(Move)
+    ok = True
+
+    def report(label: str, passed: bool):
+        nonlocal ok
+        ok = ok and passed
+        print(f"{'OK  ' if passed else 'FAIL'} {label}")
+
+    # 1. COPY + merge inside a transaction that is rolled back
+    try:
+        async with game_interface.session_scope() as session:
+            xact_before = (await session.execute(text("SELECT pg_current_xact_id()::text"))).scalar()
+            new_links = await game_interface.copy_all(
+                games_rows, session=session, conflict_columns=['link'],
+                returning='link', columns=GAME_COLUMNS
+            )
+            await move_interface.copy_all(
+                moves_rows, session=session, conflict_columns=['link', 'n_move'], columns=MOVE_COLUMNS
+            )
+            xact_after = (await session.execute(text("SELECT pg_current_xact_id()::text"))).scalar()
+            report("COPY and merge run in the session's transaction", xact_before == xact_after)
+            report("merged rows are visible inside the transaction",
+                   len(new_links) == len(games_rows) and await count_bench_games(session) == len(games_rows))
+            raise Rollback()
+    except Rollback:
+        pass
+    async with game_interface.session_scope() as session:
+        report("rollback leaves no copied rows", await count_bench_games(session) == 0)
+
+    # 2. committed merge, then a second one overlapping it by half
+    half = len(games_rows) // 2
+    first_links = await game_interface.copy_all(
+        games_rows[:half], conflict_columns=['link'], returning='link', columns=GAME_COLUMNS
+    )
+    second_links = await game_interface.copy_all(
+        games_rows, conflict_columns=['link'], returning='link', columns=GAME_COLUMNS
+    )
+    report("merge skips the rows already committed",
+           len(first_links) == half and sorted(second_links) == sorted(row[0] for row in games_rows[half:]))
+    async with game_interface.session_scope() as session:
+        report("both merges committed", await count_bench_games(session) == len(games_rows))
+        stage = (await session.execute(text("SELECT to_regclass('pg_temp._copy_stage_game')"))).scalar()
+        report("staging table dropped on commit", stage is None)
+    return ok
+
+
+async def main() -> int:
+    await init_db(CONN_STRING)
+    DBInterface.initialize_engine_and_session(CONN_STRING)
+    async with DBInterface(Player).session_scope() as session:
+        for player_name in (BENCH_WHITE, BENCH_BLACK):
+            if await session.get(Player, player_name) is None:
+                session.add(Player(player_name=player_name))
+
+    await clean_bench_rows()
+    try:
+        ok = await check()
+    finally:
+        await clean_bench_rows()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,93 @@
+# benchmarks/check_replay.py
+"""
+Checks that replaying a month from the raw archive store rewrites its rows:
+a month is ingested, one of its stored games is changed (as an older formatter
+would have written it) and loses moves, and the replay writes them back
+without counting the month's games twice.
+
+Needs the database from .env (the raw archive store is a temporary directory):
+    python -m benchmarks.check_replay
+"""
+import asyncio
+import json
+import sys
+import tempfile
+
+from sqlalchemy import text
+
+from constants import CONN_STRING
+from database.database.engine import init_db
+from database.database.db_interface import DBInterface
+from database.database.models import Game
+from database.operations import chess_com_api
+from database.operations.raw_archives import RawArchiveStore
+from database.operations.games import replay_player_games
+from benchmarks.synthetic import raw_month, BENCH_WHITE, BENCH_LINK_BASE
+from benchmarks.bench_pipeline import clean_pipeline_rows
+
+N_GAMES = 20
+
+
+async def fetch_one(sql: str, params=None):
+    async with DBInterface(Game).session_scope() as session:
+        return (await session.execute(text(sql), params or {})).one()
+
+
+async def check() -> bool:
+    ok = True
+
+    def report(label: str, passed: bool):
+        nonlocal ok
+        ok = ok and passed
+        print(f"{'OK  ' if passed else 'FAIL'} {label}")
+
+    archive = json.dumps({"games": raw_month(N_GAMES, moves_per_game=20)}).encode()
+    chess_com_api.raw_archive_store.save(BENCH_WHITE, 2000, 1, archive)
+    link = BENCH_LINK_BASE
+
+    # 1. first ingestion of the month
+    await replay_player_games(BENCH_WHITE)
+    white_elo, n_moves = await fetch_one(
+        "SELECT white_elo, (SELECT COUNT(*) FROM moves WHERE link = :link) FROM game WHERE link = :link",
+        {"link": link})
+    (n_games,) = await fetch_one("SELECT n_games FROM player_game_counts WHERE player_name = :player_name",
+                                 {"player_name": BENCH_WHITE})
+    report("month ingested", n_games == N_GAMES and n_moves > 0)
+
+    # 2. the stored rows differ from what the formatter writes now
+    async with DBInterface(Game).session_scope() as session:
+        await session.execute(text("UPDATE game SET white_elo = 0, eco = 'old_eco' WHERE link = :link"), {"link": link})
+        await session.execute(text("DELETE FROM moves WHERE link = :link AND n_move > 1"), {"link": link})
+
+    # 3. the replay rewrites them
+    await replay_player_games(BENCH_WHITE)
+    replayed = await fetch_one(
+        "SELECT white_elo, eco, (SELECT COUNT(*) FROM moves WHERE link = :link) FROM game WHERE link = :link",
+        {"link": link})
+    report("replay rewrites the changed game columns", replayed[0] == white_elo and replayed[1] != 'old_eco')
+    report("replay writes the game's moves again", replayed[2] == n_moves)
+    (n_games_after,) = await fetch_one("SELECT n_games FROM player_game_counts WHERE player_name = :player_name",
+                                       {"player_name": BENCH_WHITE})
+    report("replayed games are not counted twice", n_games_after == N_GAMES)
+    (month_games,) = await fetch_one(
+        "SELECT n_games FROM months WHERE player_name = :player_name AND year = 2000 AND month = 1",
+        {"player_name": BENCH_WHITE})
+    report("the month keeps every game in n_games", month_games == N_GAMES)
+    return ok
+
+
+async def main() -> int:
+    await init_db(CONN_STRING)
+    DBInterface.initialize_engine_and_session(CONN_STRING)
+    with tempfile.TemporaryDirectory() as root:
+        chess_com_api.raw_archive_store = RawArchiveStore(root)
+        await clean_pipeline_rows()
+        try:
+            ok = await check()
+        finally:
+            await clean_pipeline_rows()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
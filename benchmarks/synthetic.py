@@ -0,0 +1,127 @@
+# benchmarks/synthetic.py
+"""
+Synthetic chess.com-like data for the benchmarks, so they can run
+without downloading anything.
+"""
+import random
+from typing import Dict, Any, List, Tuple
+
+BENCH_WHITE = "bench_white_player"
+BENCH_BLACK = "bench_black_player"
+# Far above real chess.com game ids, so benchmark rows never collide with real ones.
+BENCH_LINK_BASE = 9_000_000_000_000
+
+
+def db_rows(n_games: int,
+            moves_per_game: int = 40,
+            link_base: int = BENCH_LINK_BASE,
+            seed: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Builds already formatted game and move rows, shaped like the dicts
+    GameCreateData / MoveCreateData produce.
+
+    Returns: (games_list, moves_list)
+    """
+    rng = random.Random(seed)
+    games_list = []
+    moves_list = []
+    for i in range(n_games):
+        link = link_base + i
+        games_list.append({
+            "link": link,
+            "year": 2024, "month": 1 + i % 12, "day": 1 + i % 28,
+            "hour": i % 24, "minute": i % 60, "second": i % 60,
+            "white": BENCH_WHITE, "black": BENCH_BLACK,
+            "white_elo": rng.randint(800, 2800), "black_elo": rng.randint(800, 2800),
+            "white_result": 1.0, "black_result": 0.0,
+            "white_str_result": "win", "black_str_result": "resigned",
+            "time_control": "180+2", "eco": "https://www.chess.com/openings/Sicilian-Defense",
+            "time_elapsed": rng.randint(60, 600), "n_moves": moves_per_game,
+            "fens_done": False,
+        })
+        white_left = black_left = 180.0
+        for n_move in range(1, moves_per_game + 1):
+            white_spent = round(rng.uniform(0.1, 5.0), 1)
+            black_spent = round(rng.uniform(0.1, 5.0), 1)
+            white_left = max(round(white_left - white_spent + 2, 1), 0.0)
+            black_left = max(round(black_left - black_spent + 2, 1), 0.0)
+            moves_list.append({
+                "link": link, "n_move": n_move,
+                "white_move": "e4", "black_move": "c5",
+                "white_reaction_time": white_spent, "black_reaction_time": black_spent,
+                "white_time_left": white_left, "black_time_left": black_left,
+            })
+    return games_list, moves_list
+
+
+SAN_CYCLE = ["e4", "c5", "Nf3", "d6", "d4", "cxd4", "Nxd4", "Nf6", "Nc3", "a6",
+             "Be3", "e5", "Nb3", "Be6", "f3", "Be7", "Qd2", "O-O", "O-O-O", "Nbd7"]
+
+
+def clock_str(seconds: float) -> str:
+    """180.5 -> '0:03:00.5', the way chess.com writes [%clk ...] annotations."""
+    tenths = int(round(seconds * 10))
+    hours, rest = divmod(tenths, 36000)
+    minutes, rest = divmod(rest, 600)
+    secs, tenth = divmod(rest, 10)
+    text = f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{text}.{tenth}" if tenth else text
+
+
+def raw_game(link: int, n_moves: int, rng: random.Random, day: int = 5) -> Dict[str, Any]:
+    """One game as it comes in a chess.com monthly archive."""
+    base, bonus = 180, 2
+    white_left = black_left = float(base)
+    tokens = []
+    for n_move in range(1, n_moves + 1):
+        white_left = max(white_left - round(rng.uniform(0.1, 6.0), 1) + bonus, 0.1)
+        black_left = max(black_left - round(rng.uniform(0.1, 6.0), 1) + bonus, 0.1)
+        white_san = SAN_CYCLE[(2 * n_move) % len(SAN_CYCLE)]
+        black_san = SAN_CYCLE[(2 * n_move + 1) % len(SAN_CYCLE)]
+        tokens.append(f"{n_move}. {white_san} {{[%clk {clock_str(white_left)}]}} "
+                      f"{n_move}... {black_san} {{[%clk {clock_str(black_left)}]}}")
+    movetext = " ".join(tokens) + " 1-0"
+    url = f"https://www.chess.com/game/live/{link}"
+    headers = [
+        ("Event", "Live Chess"), ("Site", "Chess.com"), ("Date", f"2024.01.{day:02d}"),
+        ("Round", "-"), ("White", BENCH_WHITE), ("Black", BENCH_BLACK), ("Result", "1-0"),
+        ("CurrentPosition", "r1bq1rk1/1p1nbppp/p2pbn2/4p3/4P3/1NN1BP2/PPPQ2PP/2KR1B1R w - -"),
+        ("Timezone", "UTC"), ("ECO", "B90"),
+        ("ECOUrl", "https://www.chess.com/openings/Sicilian-Defense-Najdorf-Variation"),
+        ("UTCDate", f"2024.01.{day:02d}"), ("UTCTime", "12:00:01"),
+        ("WhiteElo", "1500"), ("BlackElo", "1490"), ("TimeControl", f"{base}+{bonus}"),
+        ("Termination", f"{BENCH_WHITE} won by resignation"),
+        ("StartTime", "12:00:01"), ("EndDate", f"2024.01.{day:02d}"), ("EndTime", "12:09:31"),
+        ("Link", url),
+    ]
+    pgn = "\n".join(f'[{tag} "{value}"]' for tag, value in headers) + "\n\n" + movetext + "\n"
+    return {
+        "url": url,
+        "pgn": pgn,
+        "time_control": f"{base}+{bonus}",
+        "end_time": 1704456571,
+        "rated": True,
+        "time_class": "blitz",
+        "rules": "chess",
+        "eco": "https://www.chess.com/openings/Sicilian-Defense-Najdorf-Variation",
+        "white": {"rating": 1500, "result": "win", "username": BENCH_WHITE},
+        "black": {"rating": 1490, "result": "resigned", "username": BENCH_BLACK},
+    }
+
+
+def raw_month(n_games: int = 3000,
+              moves_per_game: int = 40,
+              link_base: int = BENCH_LINK_BASE,
+              seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    A month archive of a very active player: n_games games with
+    roughly moves_per_game moves each (+-50%).
+    """
+    rng = random.Random(seed)
+    return [
+        raw_game(link_base + i,
+                 max(1, int(moves_per_game * rng.uniform(0.5, 1.5))),
+                 rng,
+                 day=1 + i % 28)
+        for i in range(n_games)
+    ]
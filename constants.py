@@ -58,6 +58,86 @@ LOSE_RESULTS = ['checkmated', 'resigned', 'threecheck', 'timeout', 'abandoned']
 WINING_RESULT = ['win', 'kingofthehill']
 USER_AGENT = "ChessismApp/1.0 (marinlafare@gmail.com)"
 
+# Game formatting process pool, see database/operations/format_games.py
+FORMAT_WORKERS = int(os.getenv("FORMAT_WORKERS", os.cpu_count() or 1))
+FORMAT_CHUNK_SIZE = int(os.getenv("FORMAT_CHUNK_SIZE", 500))
+# Months allowed to wait between two stages of the ingestion pipeline
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 2))
+# Months of one ingestion formatted at the same time (or formatted and waiting to be inserted)
+PIPELINE_FORMAT_MONTHS = int(os.getenv("PIPELINE_FORMAT_MONTHS", max(2, FORMAT_WORKERS)))
+# Validate every formatted game and move with its Pydantic model (slow, for debugging)
+STRICT_VALIDATION = os.getenv("STRICT_VALIDATION", "false").lower() in ("1", "true", "yes")
+# Shared chess.com HTTP client, see database/operations/chess_com_client.py
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 10))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 10))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 15))
+# Adaptive rate limiter for chess.com requests (requests per second and requests in flight)
+CHESS_COM_RATE = float(os.getenv("CHESS_COM_RATE", 2))
+CHESS_COM_MIN_RATE = float(os.getenv("CHESS_COM_MIN_RATE", 0.5))
+CHESS_COM_MAX_RATE = float(os.getenv("CHESS_COM_MAX_RATE", 10))
+CHESS_COM_MIN_CONCURRENCY = int(os.getenv("CHESS_COM_MIN_CONCURRENCY", 1))
+CHESS_COM_MAX_CONCURRENCY = int(os.getenv("CHESS_COM_MAX_CONCURRENCY", 8))
+# Responses slower than this (seconds) don't raise the limits
+CHESS_COM_SLOW_RESPONSE = float(os.getenv("CHESS_COM_SLOW_RESPONSE", 2))
+# Retries of a failed chess.com request (exponential backoff with jitter, seconds)
+CHESS_COM_RETRY_ATTEMPTS = int(os.getenv("CHESS_COM_RETRY_ATTEMPTS", 4))
+CHESS_COM_RETRY_BASE_DELAY = float(os.getenv("CHESS_COM_RETRY_BASE_DELAY", 0.5))
+CHESS_COM_RETRY_MAX_DELAY = float(os.getenv("CHESS_COM_RETRY_MAX_DELAY", 30))
+# Consecutive failures that pause every chess.com request, and for how long (seconds)
+CHESS_COM_BREAKER_THRESHOLD = int(os.getenv("CHESS_COM_BREAKER_THRESHOLD", 5))
+CHESS_COM_BREAKER_RESET = float(os.getenv("CHESS_COM_BREAKER_RESET", 30))
+# (player, year, month) ETag/Last-Modified validators kept for conditional month requests
+ARCHIVE_VALIDATORS_SIZE = int(os.getenv("ARCHIVE_VALIDATORS_SIZE", 20000))
+# Compressed raw month archives on disk, off unless RAW_ARCHIVE_DIR is set (preferably an absolute path,
+# a relative one is resolved against the working directory at startup), see database/operations/raw_archives.py
+RAW_ARCHIVE_DIR = os.getenv("RAW_ARCHIVE_DIR", "")
+RAW_ARCHIVE_MAX_BYTES = int(os.getenv("RAW_ARCHIVE_MAX_BYTES", 2 * 1024 ** 3))
+# /games/update/all: download workers shared by every player, players ingested at the same time
+# and months of one player downloaded ahead of its pipeline, see database/operations/download_scheduler.py
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", CHESS_COM_MAX_CONCURRENCY))
+SWEEP_ACTIVE_PLAYERS = int(os.getenv("SWEEP_ACTIVE_PLAYERS", 16))
+SWEEP_PLAYER_BUFFER = int(os.getenv("SWEEP_PLAYER_BUFFER", 4))
+# Background crawler of the opponents of principal players, see database/operations/crawler.py
+CRAWLER_ENABLED = os.getenv("CRAWLER_ENABLED", "false").lower() in ("1", "true", "yes")
+CRAWLER_WORKERS = int(os.getenv("CRAWLER_WORKERS", 1))
+CRAWLER_MAX_ATTEMPTS = int(os.getenv("CRAWLER_MAX_ATTEMPTS", 3))
+# seconds between two refreshes of the frontier, and to wait when it is empty
+CRAWLER_REFRESH_SECONDS = float(os.getenv("CRAWLER_REFRESH_SECONDS", 600))
+CRAWLER_IDLE_SECONDS = float(os.getenv("CRAWLER_IDLE_SECONDS", 30))
+# Player profiles are asked to chess.com again once they are this old (days)
+PROFILE_MAX_AGE_DAYS = float(os.getenv("PROFILE_MAX_AGE_DAYS", 30))
+# Profile enrichment: players per run and profiles fetched (then upserted) together
+PROFILE_ENRICH_LIMIT = int(os.getenv("PROFILE_ENRICH_LIMIT", 1000))
+PROFILE_BATCH_SIZE = int(os.getenv("PROFILE_BATCH_SIZE", 100))
+# A profile that failed for a transient reason (429, 5xx, timeout) is asked again after this long (seconds)
+PROFILE_RETRY_SECONDS = float(os.getenv("PROFILE_RETRY_SECONDS", 3600))
+# Profiles read to plan months (joined date) are trusted for this long (seconds)
+# before asking chess.com again, and at most PROFILE_CACHE_SIZE are kept in memory
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", 86400))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", 10000))
+# The one SQLAlchemy engine (database/database/engine.py): pool_size connections kept open,
+# up to max_overflow more under load, checkout waits at most DB_POOL_TIMEOUT seconds
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# seconds before a connection is replaced, -1 keeps them forever
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# prepared statements cached per asyncpg connection, 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+# In-memory index of game.link (database/operations/known_links.py), warmed at startup.
+# Past KNOWN_LINKS_MAX_BYTES it turns into a Bloom filter of at most that size.
+KNOWN_LINKS_ENABLED = os.getenv("KNOWN_LINKS_ENABLED", "true").lower() in ("1", "true", "yes")
+KNOWN_LINKS_MAX_BYTES = int(os.getenv("KNOWN_LINKS_MAX_BYTES", 512 * 1024 ** 2))
+# false positive rate the Bloom filter is sized for, and whether the exact
+# index also keeps one as a first-level check
+KNOWN_LINKS_BLOOM_FP_RATE = float(os.getenv("KNOWN_LINKS_BLOOM_FP_RATE", 0.01))
+KNOWN_LINKS_BLOOM = os.getenv("KNOWN_LINKS_BLOOM", "false").lower() in ("1", "true", "yes")
+# links inserted since the last merge into the sorted array, kept in a set until then
+KNOWN_LINKS_MERGE_SIZE = int(os.getenv("KNOWN_LINKS_MERGE_SIZE", 100000))
+
 # # constants.py
 # import os
 # from dotenv import load_dotenv
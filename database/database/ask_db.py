@@ -2,14 +2,16 @@
 
 import asyncpg
 from .db_interface import DBInterface
+from .engine import AsyncDBSession
 from .models import Player, Game, Month 
-from sqlalchemy import text, select 
+from sqlalchemy import text, select, bindparam, any_, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY
 from urllib.parse import urlparse
 from typing import Tuple, Set, List, Dict, Any, Union
 
 async def get_async_db_session():
     """
-    Provides an asynchronous database session using DBInterface.
+    Provides an asynchronous database session from the shared engine (engine.get_engine).
 
     This function is the asynchronous SQLAlchemy equivalent to
     getting a database connection. It returns an async context manager
@@ -20,14 +22,18 @@ async def get_async_db_session():
             # Perform database operations using 'session'
             # e.g., session.execute(select(MyModel))
     """
-    session_interface = DBInterface(Game)
-    return session_interface.AsyncSessionLocal()
+    if AsyncDBSession.kw.get("bind") is None:
+        raise RuntimeError("Database engine not initialized. Call init_db during application startup.")
+    return AsyncDBSession()
 
 
 async def get_games_already_in_db(links: Tuple[int, ...]) -> Set[int]:
     """
     Checks and returns a set of game links already in the DB.
-    Uses DBInterface for Game model. Handles large numbers of links by batching queries.
+    The links travel as one bigint[] parameter (link = ANY(...)), so any number
+    of them takes one statement on one session.
+    Ingestion only sends it what known_links can't answer (the Bloom filter's
+    positives, see format_games.skip_known_games).
 
     Args:
         links (Tuple[int, ...]): A tuple of game links (IDs) to check.
@@ -39,22 +45,12 @@ async def get_games_already_in_db(links: Tuple[int, ...]) -> Set[int]:
         return set()
 
     game_interface = DBInterface(Game)
-    already_in_db_links = set()
-
-    BATCH_SIZE = 10000
-
-    # Process links in batches
-    # This loop is crucial for handling the argument limit
-    for i in range(0, len(links), BATCH_SIZE):
-        batch_links = links[i:i + BATCH_SIZE]
-        
-        async with game_interface.AsyncSessionLocal() as session:
-            # Using SQLAlchemy ORM filter for safety and consistency
-            batch_of_links = select(game_interface.model.link).filter(game_interface.model.link.in_(batch_links))
-            result = await session.execute(batch_of_links)
-            already_in_db_links.update(result.scalars().all())
-
-    return already_in_db_links
+    async with game_interface.AsyncSessionLocal() as session:
+        links_in_db = select(game_interface.model.link).filter(
+            game_interface.model.link == any_(bindparam("links", list(links), type_=ARRAY(BigInteger)))
+        )
+        result = await session.execute(links_in_db)
+        return set(result.scalars().all())
 
 
 async def get_all_players() -> Set[str]:
@@ -160,17 +156,15 @@ async def open_request(sql_question: str, params: Union[Tuple[Any, ...], Dict[st
             raise # if error then return anxiety
 async def get_principal_players():
     """
-    Retrieves a list of all player names from the 'player' table where 'name' is not null.
+    Retrieves the players whose games were ingested (the ones with months in the DB).
+    A profile name isn't enough: enriched opponents have one too.
 
     Returns:
         List[str]: A list of player names (strings). Returns an empty list if no players are found
                    or if an error occurs.
     """
     try:
-        # Assuming your player table is named 'player' and the column is 'player_name'
-        # and you want to filter by a 'name' column not being null.
-        # Adjust table and column names if they are different in your schema.
-        query = "SELECT player_name FROM player WHERE name IS NOT NULL;"
+        query = "SELECT DISTINCT player_name FROM months;"
         # Fetch as list of tuples, then extract the first element (player_name) from each tuple
         player_names_tuples = await open_request(query, fetch_as_dict=False)
 
@@ -1,13 +1,20 @@
 # database/database/db_interface.py
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import declarative_base
 from sqlalchemy.future import select
-from typing import Type, Dict, Any, List, Optional
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Type, Dict, Any, List, Optional, AsyncIterator, Union
+from contextlib import asynccontextmanager
 import os
+from .engine import get_engine, AsyncDBSession
 
 Base = declarative_base()
 
+# PostgreSQL refuses statements with more bind parameters than this.
+MAX_BIND_PARAMETERS = 32767
+
 class DBInterface:
     _engine = None
     AsyncSessionLocal = None
@@ -15,18 +22,17 @@ class DBInterface:
     @classmethod
     def initialize_engine_and_session(cls, database_url: str):
         """
-        Initializes the SQLAlchemy async engine and sessionmaker for the application.
+        Binds DBInterface to the process' engine (engine.get_engine, the same
+        one init_db and AsyncDBSession use) and its sessionmaker.
         This method should be called ONCE during application startup.
         """
         if not database_url:
             raise ValueError("DATABASE_URL is wrong or something.")
         
         if cls._engine is None: # Only initialize if not already done
-            cls._engine = create_async_engine(database_url, echo=False)
-            cls.AsyncSessionLocal = sessionmaker(
-                cls._engine, expire_on_commit=False, class_=AsyncSession
-            )
-            print("DBInterface: SQLAlchemy engine and AsyncSessionLocal initialized.")
+            cls._engine = get_engine(database_url)
+            cls.AsyncSessionLocal = AsyncDBSession
+            print("DBInterface: bound to the shared engine and AsyncDBSession.")
         else:
             print("DBInterface: Engine already initialized, skipping.")
 
@@ -153,7 +159,20 @@ class DBInterface:
                     return True
                 return False
 
-    async def create_all(self, data_list: List[Dict[str, Any]]) -> List[Base]:
+    @asynccontextmanager
+    async def session_scope(self, session: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+        """
+        Yields the given session untouched (the caller owns the transaction),
+        or opens a new session whose transaction is committed on exit.
+        """
+        if session is not None:
+            yield session
+            return
+        async with self.AsyncSessionLocal() as new_session:
+            async with new_session.begin():
+                yield new_session
+
+    async def create_all(self, data_list: List[Dict[str, Any]], session: Optional[AsyncSession] = None) -> List[Base]:
         """
         Performs a bulk insert of records.
         """
@@ -161,14 +180,170 @@ class DBInterface:
             print(f"Warning: create_all called with empty data list for {self.model.__name__}. No action taken.")
             return []
             
-        async with self.AsyncSessionLocal() as session:
-            async with session.begin():
-                items = [self.model(**data) for data in data_list]
-                session.add_all(items)
-                # No refresh needed for bulk insert, as individual items won't be used immediately after.
-                # If you need IDs/updated states, you'd fetch them individually or use a different strategy.
-            print(f"Successfully performed bulk insert for {len(data_list)} items in {self.model.__name__}.")
-            return items
+        async with self.session_scope(session) as active_session:
+            items = [self.model(**data) for data in data_list]
+            active_session.add_all(items)
+            # No refresh needed for bulk insert, as individual items won't be used immediately after.
+            # If you need IDs/updated states, you'd fetch them individually or use a different strategy.
+        print(f"Successfully performed bulk insert for {len(data_list)} items in {self.model.__name__}.")
+        return items
+
+    async def copy_all(self,
+                       data_list: List[Union[Dict[str, Any], tuple]],
+                       session: Optional[AsyncSession] = None,
+                       conflict_columns: Optional[List[str]] = None,
+                       returning: Optional[str] = None,
+                       columns: Optional[List[str]] = None,
+                       update_columns: Optional[List[str]] = None) -> Union[int, List[Any]]:
+        """
+        Bulk loads records with PostgreSQL COPY, using asyncpg's binary copy
+        on the connection behind the session. No ORM objects are built.
+
+        Columns are taken from the first record, in table order, or records are
+        plain tuples laid out as `columns`. Columns left out (e.g. autoincrement ids)
+        get their database default.
+
+        With conflict_columns the rows are copied into a temporary staging table
+        and merged with INSERT ... SELECT ... ON CONFLICT (conflict_columns) DO NOTHING,
+        so rows that already exist are skipped instead of failing the load.
+        With update_columns too, existing rows get those columns overwritten
+        instead (DO UPDATE, as upsert_all), and count as written.
+
+        Returns: the number of rows written, or the `returning` column of
+                 the rows actually written when `returning` is given.
+        """
+        if not data_list:
+            print(f"Warning: copy_all called with empty data list for {self.model.__name__}. No action taken.")
+            return [] if returning else 0
+
+        table_name = self.model.__tablename__
+        if columns is None:
+            columns = [c.name for c in self.model.__table__.columns if c.name in data_list[0]]
+            records = [tuple(data[column] for column in columns) for data in data_list]
+        else:
+            columns = list(columns)
+            records = data_list
+
+        async with self.session_scope(session) as active_session:
+            driver_connection = await self.driver_connection(active_session)
+            if not conflict_columns:
+                await driver_connection.copy_records_to_table(
+                    table_name,
+                    records=records,
+                    columns=columns
+                )
+                print(f"Successfully copied {len(records)} rows into {table_name}.")
+                return [record[columns.index(returning)] for record in records] if returning else len(records)
+
+            stage_name = f"_copy_stage_{table_name}"
+            column_list = ", ".join(f'"{column}"' for column in columns)
+            # Same column types as the target, but none of its constraints or defaults.
+            # Created through the session, so it lives (and is dropped) in its transaction.
+            await active_session.execute(text(
+                f'CREATE TEMPORARY TABLE IF NOT EXISTS "{stage_name}" ON COMMIT DROP '
+                f'AS SELECT {column_list} FROM "{table_name}" WITH NO DATA'
+            ))
+            await active_session.execute(text(f'TRUNCATE "{stage_name}"'))
+            await driver_connection.copy_records_to_table(
+                stage_name,
+                records=records,
+                columns=columns
+            )
+            conflict_list = ", ".join(f'"{column}"' for column in conflict_columns)
+            if update_columns:
+                # DO UPDATE can't touch a row twice in one statement, one record per key
+                select_sql = f'SELECT DISTINCT ON ({conflict_list}) {column_list} FROM "{stage_name}" '
+                conflict_action = "DO UPDATE SET " + ", ".join(
+                    f'"{column}" = EXCLUDED."{column}"' for column in update_columns
+                )
+            else:
+                select_sql = f'SELECT {column_list} FROM "{stage_name}" '
+                conflict_action = "DO NOTHING"
+            # rows are inserted (and locked) in key order, so concurrent merges
+            # sharing rows wait on each other instead of deadlocking
+            merge_sql = (
+                f'INSERT INTO "{table_name}" ({column_list}) '
+                f'{select_sql}'
+                f'ORDER BY {conflict_list} '
+                f'ON CONFLICT ({conflict_list}) {conflict_action}'
+            )
+            if returning:
+                rows = await driver_connection.fetch(f'{merge_sql} RETURNING "{returning}"')
+                written = [row[0] for row in rows]
+                print(f"Copied {len(records)} rows into {table_name}, {len(written)} were new.")
+                return written
+            status = await driver_connection.execute(merge_sql)
+            n_written = int(status.split()[-1])
+            print(f"Copied {len(records)} rows into {table_name}, {n_written} were new.")
+            return n_written
+
+    async def upsert_all(self,
+                         data_list: List[Union[Dict[str, Any], tuple]],
+                         conflict_columns: List[str],
+                         update_columns: Optional[List[str]] = None,
+                         returning: Optional[str] = None,
+                         session: Optional[AsyncSession] = None,
+                         columns: Optional[List[str]] = None) -> Union[int, List[Any]]:
+        """
+        Bulk INSERT ... ON CONFLICT (conflict_columns).
+        DO NOTHING when update_columns is empty, otherwise DO UPDATE those
+        columns with the incoming (EXCLUDED) values.
+
+        Records are dicts, or plain tuples laid out as `columns`. Rows are sent
+        in multi-row statements sized to stay under PostgreSQL's bind parameter limit.
+
+        Returns: the number of rows written (inserted or updated), or the
+                 `returning` column of those rows when `returning` is given.
+        """
+        if not data_list:
+            print(f"Warning: upsert_all called with empty data list for {self.model.__name__}. No action taken.")
+            return [] if returning else 0
+        if columns is not None:
+            data_list = [dict(zip(columns, record)) for record in data_list]
+
+        table = self.model.__table__
+        batch_size = max(1, MAX_BIND_PARAMETERS // len(data_list[0]))
+        written = []
+        n_written = 0
+
+        async with self.session_scope(session) as active_session:
+            for i in range(0, len(data_list), batch_size):
+                stmt = pg_insert(table).values(data_list[i:i + batch_size])
+                if update_columns:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=conflict_columns,
+                        set_={column: stmt.excluded[column] for column in update_columns}
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+
+                if returning:
+                    result = await active_session.execute(stmt.returning(table.c[returning]))
+                    written.extend(result.scalars().all())
+                else:
+                    result = await active_session.execute(stmt)
+                    n_written += result.rowcount
+
+        n_written = len(written) if returning else n_written
+        print(f"Upserted {len(data_list)} rows into {table.name}, {n_written} written.")
+        return written if returning else n_written
+
+    @staticmethod
+    async def driver_connection(session: AsyncSession):
+        """
+        Returns the raw asyncpg connection the session is running on,
+        for operations SQLAlchemy does not expose (COPY), inside the session's transaction.
+
+        SQLAlchemy's asyncpg adapter only sends BEGIN with the first statement it
+        executes, so until then raw calls would autocommit on their own. A first
+        statement goes through the session when the transaction hasn't started yet.
+        """
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        if not driver_connection.is_in_transaction():
+            await session.execute(text("SELECT 1"))
+        return driver_connection
 
     def to_dict(self, obj: Base) -> Dict[str, Any]:
         """
@@ -0,0 +1,29 @@
+# database/database/dedupe.py
+"""
+One-off migration for databases from before the unique indexes: removes the
+duplicated rows that keep ensure_indexes from building them (moves; init_db
+already does months), then builds the missing indexes. It scans (and may
+rewrite) whole tables, so it is run by hand, never at startup:
+
+    python -m database.database.dedupe
+"""
+import asyncio
+
+from constants import CONN_STRING
+from .engine import get_engine, dispose_engine, remove_duplicate_rows, ensure_indexes
+
+
+async def main():
+    engine = get_engine(CONN_STRING)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(remove_duplicate_rows)
+        async with engine.connect() as conn:
+            autocommit_conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await autocommit_conn.run_sync(ensure_indexes)
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,19 +1,269 @@
 # database/database/engine.py
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.schema import CreateIndex
 from .models import Base
-from constants import CONN_STRING
+from constants import (CONN_STRING, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                       DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_STATEMENT_CACHE_SIZE)
 import asyncio
 import asyncpg
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
 from urllib.parse import urlparse
 
-async_engine = None
+# The one engine of the process (get_engine). AsyncDBSession, DBInterface and
+# ask_db.open_request all take their connections from its pool.
+async_engine: Optional[AsyncEngine] = None
 AsyncDBSession = sessionmaker(expire_on_commit=False, class_=AsyncSession)
 
-async def init_db(connection_string: str):
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default pool of the async engine, counting checkouts and how long they
+    waited for a connection (a pool too small for the bulk loads shows up here).
+    """
+    counters = Counter()
+    wait_seconds = 0.0
+    max_wait_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            MeasuredQueuePool.counters["timeouts"] += 1
+            raise
+        waited = time.perf_counter() - start
+        MeasuredQueuePool.counters["checkouts"] += 1
+        MeasuredQueuePool.wait_seconds += waited
+        MeasuredQueuePool.max_wait_seconds = max(MeasuredQueuePool.max_wait_seconds, waited)
+        return connection
+
+
+def get_engine(connection_string: str = CONN_STRING) -> AsyncEngine:
+    """
+    Creates the process' engine on first call (sized by the DB_POOL_* constants)
+    and binds AsyncDBSession to it. Later calls return the same engine.
+
+    Returns: the shared AsyncEngine.
+    """
     global async_engine
+    if async_engine is None:
+        async_engine = create_async_engine(
+            connection_string,
+            echo=False,
+            poolclass=MeasuredQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            pool_recycle=DB_POOL_RECYCLE,
+            connect_args={
+                "statement_cache_size": DB_STATEMENT_CACHE_SIZE, # asyncpg's own cache
+                "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE, # SQLAlchemy's adapter cache
+            },
+        )
+        AsyncDBSession.configure(bind=async_engine)
+        print(f"Database engine created (pool_size={DB_POOL_SIZE}, max_overflow={DB_MAX_OVERFLOW}).")
+    return async_engine
+
+
+async def dispose_engine():
+    """
+    Closes the pool's connections (main.py's lifespan). The engine opens new ones if used again.
+    """
+    if async_engine is not None:
+        await async_engine.dispose()
+        print("Database engine disposed.")
+
+
+def engine_pool_stats() -> Dict[str, Any]:
+    """
+    State of the engine's pool and its checkout counters.
+
+    Returns: a JSON friendly dictionary.
+    """
+    checkouts = MeasuredQueuePool.counters["checkouts"]
+    stats = {
+        "running": async_engine is not None,
+        "checkouts": checkouts,
+        "timeouts": MeasuredQueuePool.counters["timeouts"],
+        "avg_wait_ms": round(1000 * MeasuredQueuePool.wait_seconds / checkouts, 3) if checkouts else 0,
+        "max_wait_ms": round(1000 * MeasuredQueuePool.max_wait_seconds, 3),
+    }
+    if async_engine is None:
+        return stats
+    pool = async_engine.pool
+    stats["pool"] = {
+        "size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+    }
+    return stats
+
 
+def get_index_validity(sync_conn) -> Dict[str, bool]:
+    """
+    Every index of the public schema, and whether it is valid (usable by the planner).
+    """
+    return {
+        row[0]: row[1] for row in sync_conn.execute(text("""
+            SELECT index_class.relname, pg_index.indisvalid
+            FROM pg_index
+            JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+            JOIN pg_namespace ON pg_namespace.oid = index_class.relnamespace
+            WHERE pg_namespace.nspname = 'public'
+        """))
+    }
+
+# Tables small enough (one row per player and month) to be deduped by init_db
+# before their unique index is built, the others wait for database/database/dedupe.py
+STARTUP_DEDUPE_TABLES = ('months',)
+
+def has_duplicated_keys(sync_conn, table, index) -> bool:
+    """
+    Whether two rows of the table share the key of the unique index (stops at the first pair).
+    """
+    key_list = ", ".join(f'"{column.name}"' for column in index.columns)
+    return sync_conn.execute(text(
+        f'SELECT EXISTS (SELECT 1 FROM "{table.name}" GROUP BY {key_list} HAVING COUNT(*) > 1)'
+    )).scalar()
+
+def remove_duplicate_rows(sync_conn, table_names: Optional[Iterable[str]] = None):
+    """
+    Deletes the rows that share the key of a unique index that isn't built yet,
+    keeping the newest id, in table_names (every table when None).
+    Tables without duplicates are only probed.
+    """
+    index_validity = get_index_validity(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if table_names is not None and table.name not in table_names:
+            continue
+        for index in table.indexes:
+            if not index.unique or 'id' not in table.c or index_validity.get(index.name):
+                continue
+            if not has_duplicated_keys(sync_conn, table, index):
+                print(f"No duplicated rows in {table.name} for {index.name}.")
+                continue
+            same_key = " AND ".join(f'a."{c.name}" = b."{c.name}"' for c in index.columns)
+            removed = sync_conn.execute(text(
+                f'DELETE FROM "{table.name}" a USING "{table.name}" b '
+                f'WHERE a.id < b.id AND {same_key}'
+            ))
+            print(f"Removed {removed.rowcount} duplicated rows from {table.name} for {index.name}.")
+
+def ensure_indexes(sync_conn):
+    """
+    create_all only builds indexes together with brand new tables, so indexes
+    declared on the models later are created here on existing databases,
+    with CREATE INDEX CONCURRENTLY: writes to the table go on while it is built.
+    sync_conn has to be in autocommit (CONCURRENTLY can't run in a transaction).
+
+    A build that failed (here or in an earlier run) leaves an invalid index behind,
+    it is dropped and built again on the next startup. Nothing is deleted here
+    (init_db dedupes the small STARTUP_DEDUPE_TABLES before): a unique index that
+    can't be built because the table holds duplicated rows stops the startup,
+    every ON CONFLICT upsert on that table would fail without it.
+    `python -m database.database.dedupe` removes them (see remove_duplicate_rows).
+    Tables that got a new index are analyzed.
+    """
+    index_validity = get_index_validity(sync_conn)
+    indexed_tables = set()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index_validity.get(index.name):
+                continue
+            if index.name in index_validity:
+                print(f"Dropping invalid index {index.name} left by an interrupted build...")
+                sync_conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+            print(f"Creating index {index.name} on {table.name}...")
+            create_index = str(CreateIndex(index, if_not_exists=True).compile(dialect=sync_conn.dialect))
+            try:
+                sync_conn.execute(text(create_index.replace("INDEX", "INDEX CONCURRENTLY", 1)))
+            except IntegrityError as e:
+                sync_conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                raise RuntimeError(
+                    f"Could not create unique index {index.name}, {table.name} has duplicated rows "
+                    f"and its upserts can't work without it: run `python -m database.database.dedupe` "
+                    f"to remove them, then start again."
+                ) from e
+            except DBAPIError as e:
+                print(f"Could not create index {index.name}, retried on the next startup: {e}")
+                sync_conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                continue
+            indexed_tables.add(table.name)
+    # fresh statistics, so the planner prices the new indexes right away
+    for table_name in indexed_tables:
+        sync_conn.execute(text(f'ANALYZE "{table_name}"'))
+
+def ensure_columns(sync_conn):
+    """
+    create_all doesn't alter tables that already exist, so columns added to
+    the models later are added here (nullable, without defaults).
+    When months.status is added, the rows that predate it are marked complete,
+    except each player's latest month, which may have been fetched while it was
+    running: it is marked partial so it gets refreshed once more (as the update used to do).
+    """
+    existing_columns = {
+        (row[0], row[1]) for row in sync_conn.execute(
+            text("SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = 'public'")
+        )
+    }
+    added_columns = set()
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if (table.name, column.name) in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            print(f"Adding column {column.name} to {table.name}...")
+            sync_conn.execute(text(
+                f'ALTER TABLE "{table.name}" ADD COLUMN IF NOT EXISTS "{column.name}" {column_type}'
+            ))
+            added_columns.add((table.name, column.name))
+    if ('months', 'status') not in added_columns:
+        return
+    print("Marking the months that predate months.status...")
+    sync_conn.execute(text("""
+        WITH latest AS (
+            SELECT DISTINCT ON (player_name) player_name, year, month
+            FROM months ORDER BY player_name, year DESC, month DESC
+        )
+        UPDATE months m
+        SET status = CASE WHEN m.year = latest.year AND m.month = latest.month
+                          THEN 'partial' ELSE 'complete' END
+        FROM latest
+        WHERE m.player_name = latest.player_name AND m.status IS NULL
+    """))
+
+def ensure_game_counts(sync_conn):
+    """
+    player_game_counts starts empty on databases that already have games:
+    it is filled once from the game table (one GROUP BY over white and black),
+    insert_new_data keeps it up to date from then on.
+    """
+    needs_backfill = sync_conn.execute(text(
+        "SELECT NOT EXISTS (SELECT 1 FROM player_game_counts) AND EXISTS (SELECT 1 FROM game)"
+    )).scalar()
+    if not needs_backfill:
+        return
+    print("Counting the games of every player into player_game_counts...")
+    sync_conn.execute(text("""
+        INSERT INTO player_game_counts (player_name, n_games)
+        SELECT player_name, COUNT(*)
+        FROM (SELECT white AS player_name FROM game UNION ALL SELECT black FROM game) sides
+        GROUP BY player_name
+        ON CONFLICT (player_name) DO NOTHING
+    """))
+
+async def init_db(connection_string: str):
     parsed_url = urlparse(connection_string)
     db_user = parsed_url.username
     db_password = parsed_url.password
@@ -53,12 +303,19 @@ async def init_db(connection_string: str):
         if temp_conn:
             await temp_conn.close() # Ensure the temporary connection is closed
 
-    async_engine = create_async_engine(connection_string, echo=False)
+    engine = get_engine(connection_string)
     
-    async with async_engine.begin() as conn:
+    async with engine.begin() as conn:
         print("Ensuring database tables exist...")
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_columns)
+        # before ensure_indexes, so their unique indexes can be built
+        await conn.run_sync(remove_duplicate_rows, STARTUP_DEDUPE_TABLES)
+    # outside the transaction above, each index build commits on its own
+    async with engine.connect() as conn:
+        autocommit_conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await autocommit_conn.run_sync(ensure_indexes)
+    async with engine.begin() as conn:
+        await conn.run_sync(ensure_game_counts)
         print("Database tables checked/created.")
-    
-    AsyncDBSession.configure(bind=async_engine)
     print("Database initialization complete.")
@@ -1,6 +1,6 @@
 #DATABASE
 from typing import Any
-from sqlalchemy import Column, ForeignKey, Integer, String, Float, BigInteger, Table
+from sqlalchemy import Column, ForeignKey, Integer, String, Float, BigInteger, Table, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import Boolean
@@ -26,6 +26,8 @@ class Player(Base):
     twitch_url = Column('twitch_url', String, nullable=True)
     verified = Column('verified', Boolean, nullable=True)
     league = Column('league', String, nullable=True)
+    # unix time of the last profile request to chess.com, NULL for opponents never asked for
+    profile_fetched_at = Column('profile_fetched_at', BigInteger, nullable=True)
 class Game(Base):
     __tablename__ = 'game'
     link = Column('link',BigInteger, primary_key = True, unique = True)
@@ -58,6 +60,12 @@ class Game(Base):
         secondary='game_fen_association',
         back_populates='games' # <--- This links back to the 'games' relationship on the Fen model
     )
+    # a player's games (by date) from either side: COUNT and link lookups are
+    # index-only scans, link rides along in the index
+    __table_args__ = (
+        Index('ix_game_white_date', 'white', 'year', 'month', 'day', postgresql_include=['link']),
+        Index('ix_game_black_date', 'black', 'year', 'month', 'day', postgresql_include=['link']),
+    )
 class Month(Base):
     __tablename__ = "months"
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -71,7 +79,13 @@ class Month(Base):
     year = Column("year", Integer, nullable=False, unique=False)
     month = Column("month", Integer, nullable=False, unique=False)
     n_games = Column("n_games",Integer, nullable=False, unique=False)
+    # complete / empty / partial (the month was still running when it was fetched)
+    status = Column("status", String, nullable=True, unique=False)
     player = relationship(Player, foreign_keys=[player_name])
+    # one row per player and month, target of the ON CONFLICT upserts
+    __table_args__ = (
+        Index('ix_months_player_year_month', 'player_name', 'year', 'month', unique=True),
+    )
 
 class Move(Base):
     __tablename__ = "moves"
@@ -86,6 +100,32 @@ class Move(Base):
     white_time_left = Column("white_time_left", Float, nullable=False)
     black_time_left = Column("black_time_left", Float, nullable=False)
     game = relationship(Game, foreign_keys=[link])
+    __table_args__ = (
+        Index('ix_moves_link_n_move', 'link', 'n_move', unique=True),
+    )
+
+class PlayerGameCount(Base):
+    # games of every player (as white or black), kept up to date by insert_new_data
+    __tablename__ = "player_game_counts"
+    player_name = Column("player_name", String, ForeignKey("player.player_name"), primary_key=True, nullable=False)
+    n_games = Column("n_games", BigInteger, nullable=False)
+    player = relationship(Player, foreign_keys=[player_name])
+
+class CrawlFrontier(Base):
+    # opponents waiting to be ingested as full players, see operations/crawler.py
+    __tablename__ = "crawl_frontier"
+    player_name = Column("player_name", String, ForeignKey("player.player_name"), primary_key=True, nullable=False)
+    # games against principal players, the crawler takes the highest first
+    priority = Column("priority", Integer, nullable=False)
+    # queued / in_progress / done / failed
+    status = Column("status", String, nullable=False)
+    attempts = Column("attempts", Integer, nullable=False)
+    last_error = Column("last_error", String, nullable=True)
+    updated_at = Column("updated_at", BigInteger, nullable=False)
+    player = relationship(Player, foreign_keys=[player_name])
+    __table_args__ = (
+        Index('ix_crawl_frontier_status_priority', 'status', 'priority'),
+    )
 
 class Fen(Base):
     __tablename__ = "fen"
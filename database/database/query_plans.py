@@ -0,0 +1,110 @@
+# database/database/query_plans.py
+"""
+EXPLAIN checks for the hot per-player queries: each one has to be able to run
+on the index declared for it in models.py.
+
+Needs the database from .env:
+    python -m database.database.query_plans
+"""
+import asyncio
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from constants import CONN_STRING
+from .engine import AsyncDBSession, get_engine
+
+# query -> indexes its plan has to use. Parameters: :player_name, :year, :month
+HOT_QUERIES = {
+    "games_count": {
+        "sql": "SELECT COUNT(link) FROM game WHERE white = :player_name OR black = :player_name",
+        "indexes": {"ix_game_white_date", "ix_game_black_date"},
+    },
+    "games_of_month_as_white": {
+        "sql": "SELECT link FROM game WHERE white = :player_name AND year = :year AND month = :month",
+        "indexes": {"ix_game_white_date"},
+    },
+    "games_of_month_as_black": {
+        "sql": "SELECT link FROM game WHERE black = :player_name AND year = :year AND month = :month",
+        "indexes": {"ix_game_black_date"},
+    },
+    "months_of_player": {
+        "sql": "SELECT year, month, status FROM months WHERE player_name = :player_name",
+        "indexes": {"ix_months_player_year_month"},
+    },
+}
+
+
+def plan_nodes(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [plan]
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+async def explain(sql: str, params: Dict[str, Any], force_index: bool) -> Dict[str, Any]:
+    """
+    EXPLAIN (FORMAT JSON) of a query. force_index turns sequential scans off for
+    the transaction: on a small table the planner rightly prefers them, the check
+    is that the index can serve the query, which is what a big table needs.
+    """
+    async with AsyncDBSession() as session:
+        if force_index:
+            await session.execute(text("SET LOCAL enable_seqscan = off"))
+        result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params)
+        plan = result.scalar()
+    # the session is closed without committing, SET LOCAL goes with its transaction
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return plan[0]["Plan"]
+
+
+async def check_query_plans(player_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Explains every HOT_QUERIES query, with the planner's own choice and with
+    sequential scans off.
+
+    Returns: per query, the indexes each plan uses, its node types and total cost,
+             and whether the expected indexes are usable (ok).
+    """
+    if player_name is None:
+        async with AsyncDBSession() as session:
+            row = (await session.execute(text(
+                "SELECT player_name FROM months LIMIT 1"
+            ))).first()
+        player_name = row[0] if row else "hikaru"
+    params = {"player_name": player_name, "year": 2024, "month": 1}
+
+    report = {}
+    for name, query in HOT_QUERIES.items():
+        plans = {}
+        for label, force_index in (("default", False), ("forced", True)):
+            plan = await explain(query["sql"], params, force_index)
+            nodes = plan_nodes(plan)
+            plans[label] = {
+                "indexes": sorted({node["Index Name"] for node in nodes if "Index Name" in node}),
+                "nodes": [node["Node Type"] for node in nodes],
+                "cost": plan["Total Cost"],
+            }
+        report[name] = {
+            "ok": query["indexes"] <= set(plans["forced"]["indexes"]),
+            "expected": sorted(query["indexes"]),
+            **plans,
+        }
+    return report
+
+
+async def main() -> int:
+    get_engine(CONN_STRING)
+    report = await check_query_plans()
+    for name, result in report.items():
+        status = "OK  " if result["ok"] else "FAIL"
+        print(f"{status} {name}: expected {result['expected']}, "
+              f"forced plan uses {result['forced']['indexes']}, "
+              f"planner's choice {result['default']['nodes']} (cost {result['default']['cost']})")
+    return 0 if all(result["ok"] for result in report.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -5,7 +5,8 @@ import calendar
 from typing import Dict, Any, List, Tuple, Optional, Union
 
 from database.operations.models import MonthCreateData
-from database.operations.months import read_months, update_month
+from database.operations.months import read_months, update_month, is_finished_month
+from database.operations.chess_com_api import get_archives
 import database.operations.players as players_ops
 from fastapi.encoders import jsonable_encoder
 from database.database.db_interface import DBInterface
@@ -15,13 +16,16 @@ from sqlalchemy import select
 
 async def get_joined_and_current_date(player_name: str) -> Dict[str, Any]:
     """
-    Fetches player profile (inserting if new) and extracts the date they joined.
+    Reads the player's profile (see get_player_profile, chess.com is only asked
+    when it expired, inserting the player if new) and extracts the date they joined.
 
     Arg: player_name = "some_chess_com_user"
     
     Returns a dictionary with 'joined_date' and 'current_date' or an 'error' key.
     """
-    profile = await players_ops.insert_player({"player_name": player_name})
+    profile = await players_ops.get_player_profile(player_name)
+    if profile is None:
+        return {"error": f"Profile of {player_name} not found."}
 
     joined_ts = profile.joined
 
@@ -41,18 +45,24 @@ async def get_joined_and_current_date(player_name: str) -> Dict[str, Any]:
 
 async def full_range(player_name: str) -> Union[List[str], Dict[str, Any]]:
     """
-    Generates a list of 'YYYY-MM' month strings
-    from player's joined date to current date.
+    Generates a list of 'YYYY-MM' month strings the player has games in,
+    taken from the chess.com archives index. If the index can't be fetched,
+    falls back to every month from player's joined date to current date.
 
     Arg: player_name = "some_chess_com_user"
     
     Returns a list of strings or a dictionary with an 'error' key.
     """
-    dates_info = await get_joined_and_current_date(player_name)
+    dates_info = await get_joined_and_current_date(player_name) # also makes sure the player is at the DB
 
     if "error" in dates_info:
         return dates_info # you should feel ashamed if this happens
 
+    archive_months = await get_archives(player_name)
+    if archive_months is not None:
+        return archive_months
+    print(f"Archives index unavailable for {player_name}, planning every month since joined.")
+
     joined_date = dates_info["joined_date"]
     current_date = dates_info["current_date"]
 
@@ -71,24 +81,28 @@ async def full_range(player_name: str) -> Union[List[str], Dict[str, Any]]:
     return all_months
 
 
-async def just_new_months(player_name: str) -> Union[List[str], Dict[str, Any], bool]:
+async def plan_new_months(player_name: str) -> Dict[str, Any]:
     """
-    Creates a str for every month the user has been in chess_com,
+    Lists the months the user has games in (see full_range),
     months = ["2020-01","2020-02","2020-n"]
-    filters the months already at the DB.
-    
+    and splits them between months still to fetch and months already at the DB.
+
+    A Month row is committed together with that month's games and moves, so the
+    months at the DB are exactly the ones a previous (maybe interrupted) run finished.
+    Finished months (complete or empty) are skipped for good, a partial month
+    (fetched while it was still running) is fetched again.
+
     Arg: player_name = "some_chess_com_user".lower()
-    
-    Returns on success: a list of 'YYYY-MM' strings,
-                otherwise an error dict, or False if no new months.
+
+    Returns on success: {"new_months": ['YYYY-MM', ...], "skipped_months": int},
+                otherwise an error dict.
     """
-    
     all_possible_months_strs = await full_range(player_name) # List[str] or Dict[str,Any]
     
     if isinstance(all_possible_months_strs, dict) and "error" in all_possible_months_strs:
         return all_possible_months_strs # Shame on you
 
-    existing_months_for_player = []
+    existing_months_for_player = set()
     month_db_interface = DBInterface(Month)
     async with month_db_interface.AsyncSessionLocal() as session:
     
@@ -100,14 +114,37 @@ async def just_new_months(player_name: str) -> Union[List[str], Dict[str, Any],
 
         player_db_months = select(month_db_interface.model).filter_by(player_name=player_name)
         result = await session.execute(player_db_months)
-        existing_months_for_player = [f"{m.year}-{m.month:02d}" for m in result.scalars().all()]
+        existing_months_for_player = {
+            f"{m.year}-{m.month:02d}" for m in result.scalars().all() if is_finished_month(m.status)
+        }
     
     new_months_to_fetch = [
         month_str for month_str in all_possible_months_strs
         if month_str not in existing_months_for_player
     ]
+    skipped_months = len(all_possible_months_strs) - len(new_months_to_fetch)
+    if skipped_months and new_months_to_fetch:
+        print(f"Resuming {player_name}: {skipped_months} months already in DB are skipped, {len(new_months_to_fetch)} to go.")
+
+    return {"new_months": new_months_to_fetch, "skipped_months": skipped_months}
+
+
+async def just_new_months(player_name: str) -> Union[List[str], Dict[str, Any], bool]:
+    """
+    Creates a str for every month the user has been in chess_com,
+    months = ["2020-01","2020-02","2020-n"]
+    filters the months already at the DB.
+    
+    Arg: player_name = "some_chess_com_user".lower()
+    
+    Returns on success: a list of 'YYYY-MM' strings,
+                otherwise an error dict, or False if no new months.
+    """
+    plan = await plan_new_months(player_name)
+    if "error" in plan:
+        return plan
 
-    if not new_months_to_fetch:
+    if not plan["new_months"]:
         return False
     
-    return new_months_to_fetch
+    return plan["new_months"]
@@ -6,7 +6,6 @@
 # from sqlalchemy.orm import declarative_base
 
 
-from .models import PlayerCreateData
 from database.database.db_interface import DBInterface
 from database.database.models import Player
 # --- TEMPORARY TABLE MODEL ---
@@ -136,108 +135,63 @@ from database.database.models import Player
 
 
 import time
-from typing import Set
-import asyncio
-from math import ceil
+from typing import Iterable, List, Set
 
-from sqlalchemy import Column, String, text, select
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import String, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
 
-# --- TEMPORARY TABLE MODEL ---
-TempBase = declarative_base()
-
-class TempPlayerName(TempBase):
-    """
-    SQLAlchemy model for a temporary table to hold player names for bulk lookups.
-    """
-    __tablename__ = "temp_player_names"
-    # Ensure this is correct for your PostgreSQL setup.
-    # ON COMMIT DROP is good, but means everything must be in one transaction.
-    __table_args__ = {'prefixes': ['TEMPORARY']}
+# The whole name set travels as one text[] parameter and is unnested server side:
+# one statement, one round trip, no temporary table and no SQL built from the names.
+MISSING_PLAYERS_SQL = text("""
+    SELECT names.player_name
+    FROM unnest(:player_names) AS names(player_name)
+    WHERE NOT EXISTS (SELECT 1 FROM player WHERE player.player_name = names.player_name)
+""").bindparams(bindparam("player_names", type_=ARRAY(String)))
 
-    player_name_col = Column(String, primary_key=True)
+INSERT_MISSING_PLAYERS_SQL = text("""
+    INSERT INTO player (player_name)
+    SELECT DISTINCT names.player_name FROM unnest(:player_names) AS names(player_name)
+    ORDER BY 1 -- same lock order in every transaction, concurrent inserts can't deadlock
+    ON CONFLICT (player_name) DO NOTHING
+    RETURNING player_name
+""").bindparams(bindparam("player_names", type_=ARRAY(String)))
 
 
-# --- ASYNC FUNCTION TO GET ONLY NEW PLAYERS ---
 async def get_only_players_not_in_db(player_names: Set[str]) -> Set[str]:
     """
-    Identifies which player names from the input set do not yet exist in the Player table.
-    Uses a temporary table to efficiently handle large numbers of player names
-    without hitting PostgreSQL's parameter limit for IN clauses or bulk inserts.
+    Identifies which player names from the input set do not yet exist in the Player table,
+    with an anti-join against the unnested array of names.
 
     Args:
         player_names (set[str]): A set of player names to check against the database.
-        player_interface: An instance of DBInterface for your Player model.
 
     Returns:
         set[str]: A set of player names that are not found in the database.
     """
-    player_interface = DBInterface(Player)
     if not player_names:
         print("No player names provided for lookup.")
         return set()
+    start_lookup = time.time()
+    player_interface = DBInterface(Player)
+    async with player_interface.session_scope() as session:
+        result = await session.execute(MISSING_PLAYERS_SQL, {"player_names": list(player_names)})
+        missing = set(result.scalars().all())
+    print(f"{len(missing)} of {len(player_names)} players not in DB, checked in {time.time() - start_lookup:.2f} seconds")
+    return missing
 
-    player_names_list = list(player_names)
-
-    INSERT_VALUES_BATCH_SIZE = 1000 # Keep this relatively small and adjust if needed
-
-    players_found_in_db = set()
-
-    # Use an asynchronous session to perform database operations
-    # ALL operations (create, insert, select/join) MUST happen within this single 'async with' block
-    # before the implicit commit at the end of the block.
-    async with player_interface.AsyncSessionLocal() as session:
-        start_temp_table_ops = time.time()
-        print(f"[{time.time()-start_temp_table_ops:.2f}s] Starting temp table operations for {len(player_names)} players...")
-
-        # Step 1: Create the temporary table.
-        # This occurs within the transaction.
-        await session.execute(text("""
-            CREATE TEMPORARY TABLE IF NOT EXISTS temp_player_names (
-                player_name_col VARCHAR PRIMARY KEY
-            ) ON COMMIT DROP;
-        """))
-        print(f"[{time.time()-start_temp_table_ops:.2f}s] Temporary table created.")
-
-        # Step 2: Insert player names into the temporary table in batches.
-        # These inserts also occur within the same transaction.
-        insert_tasks = []
-        for i in range(0, len(player_names_list), INSERT_VALUES_BATCH_SIZE):
-            batch = player_names_list[i : i + INSERT_VALUES_BATCH_SIZE]
-
-            # Construct a multi-value INSERT statement using text() for explicit control
-            values_clause = ", ".join([f"('{name.replace("'", "''")}')" for name in batch])
-            insert_sql = f"INSERT INTO temp_player_names (player_name_col) VALUES {values_clause};"
-            insert_tasks.append(session.execute(text(insert_sql)))
-
-        # Execute all insert tasks concurrently within the current session's transaction
-        await asyncio.gather(*insert_tasks)
-
-        print(f"[{time.time()-start_temp_table_ops:.2f}s] All {len(player_names_list)} player names inserted into temp table.")
-
-        # NO explicit session.commit() here!
-        # The session.commit() that was here was causing the temporary table to be dropped prematurely.
-        # The 'async with' block for AsyncSessionLocal will implicitly commit at its end,
-        # ensuring all operations are part of one transaction.
-
-        # Step 3: Query the main player table by joining with the temporary table.
-        # This query now runs within the same active transaction where the temp table exists.
-        start_join_query = time.time()
-        print(f"[{time.time()-start_temp_table_ops:.2f}s] Performing JOIN query to find existing players...")
-        stmt = select(player_interface.model.player_name).join(
-            TempPlayerName,
-            player_interface.model.player_name == TempPlayerName.player_name_col
-        )
-
-        result = await session.execute(stmt)
-        players_found_in_db.update(result.scalars().all())
-        print(f"[{time.time()-start_temp_table_ops:.2f}s] JOIN query completed in {time.time()-start_join_query:.2f}s.")
-
-    # The 'async with session:' block concludes here.
-    # If successful, it performs an implicit commit, at which point
-    # the temporary table will be dropped due to ON COMMIT DROP.
-    # If an exception occurs, it will implicitly roll back.
-
-    print(f"Total time for get_only_players_not_in_db: {time.time()-start_temp_table_ops:.2f} seconds")
-    return player_names - players_found_in_db
\ No newline at end of file
+
+async def insert_missing_players(player_names: Iterable[str]) -> List[str]:
+    """
+    Inserts a bare Player row (only player_name) for every name not in the DB yet,
+    in one statement. Existing players are left untouched (ON CONFLICT DO NOTHING),
+    so concurrent ingestions inserting the same opponent don't fail.
+
+    Returns: the names that were inserted.
+    """
+    player_names = list(player_names)
+    if not player_names:
+        return []
+    player_interface = DBInterface(Player)
+    async with player_interface.session_scope() as session:
+        result = await session.execute(INSERT_MISSING_PLAYERS_SQL, {"player_names": player_names})
+        return list(result.scalars().all())
@@ -3,99 +3,603 @@
 import asyncio
 import httpx
 import json
+import random
 import time
-from typing import List, Tuple, Dict, Any, Optional
-import pprint
+from collections import Counter, OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from typing import List, Tuple, Dict, Any, Optional, AsyncIterator
 # Ensure these imports are correct based on your project structure
 from constants import USER_AGENT # Assuming USER_AGENT is defined here
+from constants import (CHESS_COM_RATE, CHESS_COM_MIN_RATE, CHESS_COM_MAX_RATE,
+                       CHESS_COM_MIN_CONCURRENCY, CHESS_COM_MAX_CONCURRENCY, CHESS_COM_SLOW_RESPONSE,
+                       CHESS_COM_RETRY_ATTEMPTS, CHESS_COM_RETRY_BASE_DELAY, CHESS_COM_RETRY_MAX_DELAY,
+                       CHESS_COM_BREAKER_THRESHOLD, CHESS_COM_BREAKER_RESET, ARCHIVE_VALIDATORS_SIZE)
 import database.operations.chess_com_endpoints as chess_com_endpoints
 from database.operations.models import PlayerCreateData
+from database.operations.chess_com_client import get_chess_com_client
+from database.operations.raw_archives import raw_archive_store
+from database.operations.months import month_status, MONTH_PARTIAL
+
+# --- RATE LIMITING ---
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    Seconds asked by a Retry-After header (delta seconds or an HTTP date), None without one.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket plus AIMD concurrency for chess.com requests.
+
+    Every request takes a token (refilled at `rate` per second) and a slot
+    (at most `concurrency` in flight). Fast successful responses raise both
+    additively; a 429, a 5xx, a network error or a Retry-After header halves
+    them (at most once per decrease_cooldown, so one burst of failures counts once)
+    and Retry-After also pauses every request until it expires.
+
+    One instance is shared by every ingestion of the process (chess_com_rate_limiter).
+    """
+
+    def __init__(self,
+                 rate: float = CHESS_COM_RATE,
+                 min_rate: float = CHESS_COM_MIN_RATE,
+                 max_rate: float = CHESS_COM_MAX_RATE,
+                 min_concurrency: int = CHESS_COM_MIN_CONCURRENCY,
+                 max_concurrency: int = CHESS_COM_MAX_CONCURRENCY,
+                 slow_response_seconds: float = CHESS_COM_SLOW_RESPONSE,
+                 rate_step: float = 0.25,
+                 decrease_factor: float = 0.5,
+                 decrease_cooldown: float = 1.0,
+                 window_seconds: float = 60.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(min(max(2, min_concurrency), max_concurrency))
+        self.slow_response_seconds = slow_response_seconds
+        self.rate_step = rate_step
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.window_seconds = window_seconds
+
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.in_flight = 0
+        self.started_at = time.monotonic()
+        self.completed = deque() # monotonic times of the responses inside the window
+        self.counters = Counter()
+        self.condition = None
+        self.loop = None
+
+    def get_condition(self) -> asyncio.Condition:
+        # asyncio primitives belong to one event loop, scripts may run several
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.condition = asyncio.Condition()
+            self.loop = loop
+            self.in_flight = 0
+        return self.condition
+
+    async def acquire(self):
+        """
+        Waits for a free slot, then for a token (and for any Retry-After pause).
+        """
+        condition = self.get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.concurrency))
+            self.in_flight += 1
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(1.0, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+        except BaseException:
+            await self.release(None, 0.0, count=False)
+            raise
+
+    async def release(self, status_code: Optional[int], elapsed: float,
+                      retry_after: Optional[float] = None, count: bool = True):
+        """
+        Frees the slot and adapts rate and concurrency to how the request went.
+
+        Args:
+            status_code: the response status, None if the request failed without one.
+            elapsed: seconds the request took.
+            retry_after: seconds asked by chess.com before the next request.
+            count: False when the request was never sent.
+        """
+        now = time.monotonic()
+        if count:
+            self.counters["responses"] += 1
+            self.completed.append(now)
+            pushed_back = retry_after is not None or status_code is None or \
+                status_code == 429 or status_code >= 500
+            if retry_after is not None:
+                self.counters["retry_after"] += 1
+                self.paused_until = max(self.paused_until, now + retry_after)
+            if status_code is None:
+                self.counters["network_errors"] += 1
+            elif status_code == 429:
+                self.counters["throttled"] += 1
+            elif status_code >= 500:
+                self.counters["server_errors"] += 1
+
+            if pushed_back:
+                if now - self.last_decrease >= self.decrease_cooldown:
+                    self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                    self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease_factor)
+                    self.last_decrease = now
+                    self.counters["decreases"] += 1
+                    print(f"chess.com pushed back ({status_code}), rate: {self.rate:.2f}/s, concurrency: {int(self.concurrency)}")
+            elif elapsed <= self.slow_response_seconds:
+                self.rate = min(self.max_rate, self.rate + self.rate_step)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+        condition = self.get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    async def get(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        """
+        client.get(url, **kwargs) under the limiter. Network errors are raised as usual.
+        """
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            response = await client.get(url, **kwargs)
+        except httpx.RequestError:
+            await self.release(None, time.monotonic() - start)
+            raise
+        except BaseException:
+            await self.release(None, 0.0, count=False)
+            raise
+        await self.release(response.status_code, time.monotonic() - start, parse_retry_after(response))
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current limits and the effective request rate over the last window_seconds.
+        """
+        now = time.monotonic()
+        while self.completed and now - self.completed[0] > self.window_seconds:
+            self.completed.popleft()
+        window = min(self.window_seconds, max(now - self.started_at, 1e-9))
+        return {
+            "rate_limit_per_second": round(self.rate, 2),
+            "concurrency_limit": int(self.concurrency),
+            "in_flight": self.in_flight,
+            "effective_requests_per_second": round(len(self.completed) / window, 2),
+            "paused_for_seconds": round(max(0.0, self.paused_until - now), 2),
+            **self.counters,
+        }
+
+
+# every chess.com request of the process goes through this one
+chess_com_rate_limiter = AdaptiveRateLimiter()
+
+
+# --- RETRIES ---
+
+# What to do with a response, by status code (see RetryPolicy)
+RETRY = "retry"
+GIVE_UP = "give_up"
+DONE = "done"
+
+
+class RetryPolicy:
+    """
+    How a chess.com request is retried: up to `attempts` tries with exponential
+    backoff and full jitter (a random wait between 0 and base_delay * 2**attempt,
+    capped at max_delay, never shorter than a Retry-After header).
+
+    status_rules map a status code to RETRY, GIVE_UP or DONE. Without a rule:
+    2xx, 304 (conditional request, not modified) and 404 (a month without archive) are DONE, 408, 429 and 5xx are RETRY,
+    any other status is GIVE_UP. A 200 with an empty body is retried too.
+    """
+
+    def __init__(self,
+                 attempts: int = CHESS_COM_RETRY_ATTEMPTS,
+                 base_delay: float = CHESS_COM_RETRY_BASE_DELAY,
+                 max_delay: float = CHESS_COM_RETRY_MAX_DELAY,
+                 status_rules: Optional[Dict[int, str]] = None,
+                 retry_empty_body: bool = True):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.status_rules = status_rules or {}
+        self.retry_empty_body = retry_empty_body
+
+    def action(self, response: httpx.Response) -> str:
+        status_code = response.status_code
+        if status_code in self.status_rules:
+            return self.status_rules[status_code]
+        if status_code in (304, 404):
+            return DONE
+        if status_code in (408, 429) or status_code >= 500:
+            return RETRY
+        if status_code >= 400:
+            return GIVE_UP
+        if self.retry_empty_body and not response.content:
+            return RETRY
+        return DONE
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """
+    Stops every chess.com request while chess.com is failing.
+
+    After failure_threshold consecutive failures (network errors, 429, 5xx)
+    the circuit opens: requests wait reset_timeout seconds, then a single probe
+    is let through. If it works the circuit closes, otherwise it opens again.
+    """
+
+    def __init__(self,
+                 failure_threshold: int = CHESS_COM_BREAKER_THRESHOLD,
+                 reset_timeout: float = CHESS_COM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    async def wait(self) -> bool:
+        """
+        Returns when a request may be sent.
+
+        Returns: True when the request is the half-open probe, whose caller
+                 has to record its outcome or release_probe.
+        """
+        while True:
+            if self.state == "closed":
+                return False
+            now = time.monotonic()
+            if self.state == "open":
+                remaining = self.opened_at + self.reset_timeout - now
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    continue
+                self.state = "half_open"
+            if not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            await asyncio.sleep(0.5)
+
+    def release_probe(self):
+        """
+        The probe ended without an outcome (cancelled, or an error that says
+        nothing about chess.com): the next waiting request probes instead.
+        """
+        self.probe_in_flight = False
+
+    def record_success(self):
+        if self.state != "closed":
+            print("chess.com is answering again, circuit closed.")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or \
+           (self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+            self.times_opened += 1
+            print(f"chess.com keeps failing, pausing every request for {self.reset_timeout} seconds.")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+        }
+
+
+default_retry_policy = RetryPolicy()
+chess_com_circuit_breaker = CircuitBreaker()
+
+
+async def request_with_retries(client: httpx.AsyncClient,
+                               url: str,
+                               label: str,
+                               policy: Optional[RetryPolicy] = None,
+                               **kwargs) -> Optional[httpx.Response]:
+    """
+    GETs a chess.com url under the rate limiter, the retry policy and the circuit breaker.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTPX async client.
+        url (str): chess.com url.
+        label (str): what is being requested, for the logs.
+        policy (RetryPolicy): default_retry_policy when None.
+        **kwargs: passed to client.get.
+
+    Returns:
+        httpx.Response | None: the last response when the policy is DONE or GIVE_UP with it,
+                               None when every attempt failed.
+    """
+    policy = policy or default_retry_policy
+    for attempt in range(policy.attempts):
+        is_probe = await chess_com_circuit_breaker.wait()
+        retry_after = None
+        try:
+            response = await chess_com_rate_limiter.get(client, url, **kwargs)
+        except httpx.RequestError as e:
+            chess_com_circuit_breaker.record_failure()
+            problem = f"{type(e).__name__}: {e}"
+        except BaseException:
+            if is_probe:
+                chess_com_circuit_breaker.release_probe()
+            raise
+        else:
+            action = policy.action(response)
+            if action != RETRY:
+                chess_com_circuit_breaker.record_success()
+                return response
+            if response.status_code in (408, 429) or response.status_code >= 500:
+                chess_com_circuit_breaker.record_failure()
+            else:
+                chess_com_circuit_breaker.record_success()
+            retry_after = parse_retry_after(response)
+            problem = f"status {response.status_code}" if response.is_error else "empty body"
+        if attempt + 1 < policy.attempts:
+            delay = policy.delay(attempt, retry_after)
+            print(f"{label}: {problem}, retrying in {delay:.1f}s ({attempt + 1}/{policy.attempts}).")
+            await asyncio.sleep(delay)
+    print(f"{label}: {problem}, giving up after {policy.attempts} attempts.")
+    return None
+
+
+# --- CONDITIONAL REQUESTS ---
+
+# Yielded by stream_months instead of the games when a month didn't change (304)
+NOT_MODIFIED = "not_modified"
+
+
+class ArchiveValidators:
+    """
+    ETag / Last-Modified of the month archives already ingested, per (player, year, month),
+    sent back as If-None-Match / If-Modified-Since so an unchanged month answers 304.
+
+    Validators of a downloaded month are staged, and only become usable once
+    the month is committed (commit), otherwise a 304 could hide games that never
+    reached the DB. Validators of a month committed while it was still running
+    are dropped once it has ended: the 304 would skip the DB, and the month
+    would stay partial instead of being stored complete. Both maps are LRUs of
+    at most max_size entries.
+    """
+
+    def __init__(self, max_size: int = ARCHIVE_VALIDATORS_SIZE):
+        self.max_size = max_size
+        self.validators = OrderedDict()
+        self.staged = OrderedDict()
+        self.counters = Counter()
+
+    @staticmethod
+    def remember(cache: OrderedDict, key: Tuple[str, int, int], value: Dict[str, str], max_size: int):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+    def conditional_headers(self, player_name: str, year: int, month: int) -> Dict[str, str]:
+        validators = self.validators.get((player_name, year, month))
+        if validators is None:
+            return {}
+        if validators.get("partial") and month_status(year, month, 1) != MONTH_PARTIAL:
+            del self.validators[(player_name, year, month)]
+            return {}
+        self.validators.move_to_end((player_name, year, month))
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def stage(self, player_name: str, year: int, month: int, response: httpx.Response):
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if validators["etag"] or validators["last_modified"]:
+            self.remember(self.staged, (player_name, year, month), validators, self.max_size)
+
+    def commit(self, player_name: str, year: int, month: int):
+        validators = self.staged.pop((player_name, year, month), None)
+        if validators is not None:
+            validators["partial"] = month_status(year, month, 1) == MONTH_PARTIAL
+            self.remember(self.validators, (player_name, year, month), validators, self.max_size)
+
+    def record(self, status_code: int, conditional: bool):
+        if status_code == 304:
+            self.counters["not_modified"] += 1
+        elif conditional:
+            self.counters["modified"] += 1
+        else:
+            self.counters["unconditional"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self.validators), "staged": len(self.staged), **self.counters}
+
+
+# one instance for the process, like chess_com_rate_limiter
+archive_validators = ArchiveValidators()
+
 
 # --- API CLIENT FUNCTIONS ---
 
-async def get_profile(player_name: str) -> Optional[PlayerCreateData]:
+# Returned by get_profile(report_gone=True) instead of None when chess.com says
+# the profile doesn't exist (404, or 410 for a closed account): asking again won't help
+PROFILE_GONE = "profile_gone"
+
+
+async def get_profile(player_name: str, report_gone: bool = False) -> Optional[PlayerCreateData]:
     """
     Fetches a player's profile from the Chess.com API and returns it as a
     PlayerCreateData Pydantic model instance.
 
     Args:
         player_name (str): The Chess.com username.
+        report_gone (bool): return PROFILE_GONE for a profile chess.com says doesn't exist,
+                            so it can be told apart from a failed request.
 
     Returns:
         PlayerCreateData | None: An instance of PlayerCreateData with the profile details,
-                                 or None if whateva.
+                                 or None if whateva (PROFILE_GONE, see report_gone).
     """
     PLAYER_URL = chess_com_endpoints.PLAYER.replace('{player}', player_name)
-    async with httpx.AsyncClient(timeout=5) as client:
-        try:
-            response = await client.get(
-                PLAYER_URL,
-                headers={"User-Agent": USER_AGENT}
-            )
-            response.raise_for_status()
-            
-            raw_data = response.json()
-
-            # --- Transformation to match PlayerCreateData Pydantic model ---
-            processed_data = {} 
-            processed_data['player_name'] = player_name.lower() # Always use the requested player_name
-
-            # Populate other fields using .get() for safety and let Pydantic handle defaults
-            processed_data['name'] = raw_data.get('name')
-            processed_data['url'] = raw_data.get('url')
-            processed_data['title'] = raw_data.get('title')
-            processed_data['avatar'] = raw_data.get('avatar')
-            processed_data['followers'] = raw_data.get('followers')
-            
-            country_url = raw_data.get('country')
-            if country_url:
-                processed_data['country'] = country_url.split('/')[-1]
-            else:
-                processed_data['country'] = None
+    client = get_chess_com_client()
+    try:
+        response = await request_with_retries(
+            client,
+            PLAYER_URL,
+            f"profile {player_name}",
+            timeout=5,
+            headers={"User-Agent": USER_AGENT}
+        )
+        if response is None:
+            return None
+        response.raise_for_status()
+        
+        raw_data = response.json()
+
+        # --- Transformation to match PlayerCreateData Pydantic model ---
+        processed_data = {} 
+        processed_data['player_name'] = player_name.lower() # Always use the requested player_name
+
+        # Populate other fields using .get() for safety and let Pydantic handle defaults
+        processed_data['name'] = raw_data.get('name')
+        processed_data['url'] = raw_data.get('url')
+        processed_data['title'] = raw_data.get('title')
+        processed_data['avatar'] = raw_data.get('avatar')
+        processed_data['followers'] = raw_data.get('followers')
+        
+        country_url = raw_data.get('country')
+        if country_url:
+            processed_data['country'] = country_url.split('/')[-1]
+        else:
+            processed_data['country'] = None
 
-            processed_data['location'] = raw_data.get('location')
-            
-            joined_ts = raw_data.get('joined')
-            if joined_ts is not None:
-                try:
-                    processed_data['joined'] = int(joined_ts)
-                except (ValueError, TypeError):
-                    print(f"Warning: Could not convert 'joined' ({joined_ts}) to int for {player_name}. Setting to 0.")
-                    processed_data['joined'] = 0
-            else:
-                processed_data['joined'] = 0
+        processed_data['location'] = raw_data.get('location')
+        
+        joined_ts = raw_data.get('joined')
+        if joined_ts is not None:
             try:
-                
-                processed_data['status'] = raw_data.get('status')
-                processed_data['is_streamer'] = raw_data.get('is_streamer')
-                processed_data['twitch_url'] = raw_data.get('twitch_url')
-                processed_data['verified'] = raw_data.get('verified')
-                processed_data['league'] = raw_data.get('league')
-                pprint.pp(processed_data)
-                player_data = processed_data
-                return player_data # Return the Pydantic model instance
-            except Exception as pydantic_error:
-                print(f"Pydantic validation error for {player_name}: {pydantic_error}")
-                print(f"Data that failed validation: {processed_data}")
-                return None
-
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                print(f"Player '{player_name}' not found on Chess.com (404).")
-                return None
-            print(f"HTTP error for profile {player_name}: {e.response.status_code} - {e.response.text}")
-            return None
-        except httpx.RequestError as e:
-            print(f"Request error for profile {player_name}: {e}")
+                processed_data['joined'] = int(joined_ts)
+            except (ValueError, TypeError):
+                print(f"Warning: Could not convert 'joined' ({joined_ts}) to int for {player_name}. Setting to 0.")
+                processed_data['joined'] = 0
+        else:
+            processed_data['joined'] = 0
+        try:
+            
+            processed_data['status'] = raw_data.get('status')
+            processed_data['is_streamer'] = raw_data.get('is_streamer')
+            processed_data['twitch_url'] = raw_data.get('twitch_url')
+            processed_data['verified'] = raw_data.get('verified')
+            processed_data['league'] = raw_data.get('league')
+            processed_data['profile_fetched_at'] = int(time.time())
+            player_data = processed_data
+            return player_data # Return the Pydantic model instance
+        except Exception as pydantic_error:
+            print(f"Pydantic validation error for {player_name}: {pydantic_error}")
+            print(f"Data that failed validation: {processed_data}")
             return None
-        except Exception as e:
-            print(f"An unexpected error occurred getting profile {player_name}: {e}")
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in (404, 410):
+            print(f"Player '{player_name}' not found on Chess.com ({e.response.status_code}).")
+            return PROFILE_GONE if report_gone else None
+        print(f"HTTP error for profile {player_name}: {e.response.status_code} - {e.response.text}")
+        return None
+    except httpx.RequestError as e:
+        print(f"Request error for profile {player_name}: {e}")
+        return None
+    except Exception as e:
+        print(f"An unexpected error occurred getting profile {player_name}: {e}")
+        return None
+
+
+async def get_archives(player_name: str) -> Optional[List[str]]:
+    """
+    Fetches the list of months a player has games in, from the archives index.
+
+    Args:
+        player_name (str): The Chess.com username.
+
+    Returns:
+        List[str] | None: 'YYYY-MM' strings in calendar order (empty if the player
+                          has no games), or None if the index could not be fetched.
+    """
+    ARCHIVES_URL = chess_com_endpoints.ARCHIVES.replace('{player}', player_name)
+    client = get_chess_com_client()
+    try:
+        response = await request_with_retries(
+            client,
+            ARCHIVES_URL,
+            f"archives {player_name}",
+            timeout=5,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT}
+        )
+        if response is None:
             return None
+        response.raise_for_status()
+        archives = response.json().get('archives', [])
+        # every archive is ".../games/{year}/{month}"
+        months = []
+        for archive_url in archives:
+            year, month = archive_url.rstrip('/').split('/')[-2:]
+            months.append(f"{int(year)}-{int(month):02d}")
+        return sorted(months)
+    except httpx.HTTPStatusError as e:
+        print(f"HTTP error fetching archives for {player_name}: {e.response.status_code}")
+        return None
+    except httpx.RequestError as e:
+        print(f"Request error fetching archives for {player_name}: {e}")
+        return None
+    except (ValueError, AttributeError) as e:
+        print(f"Unexpected archives index for {player_name}: {e}")
+        return None
 
 
 async def ask_twice(player_name: str, year: int, month: int, client: httpx.AsyncClient) -> Optional[httpx.Response]:
     """
-    Fetches game archives for a specific month, with a retry logic.
+    Fetches game archives for a specific month, retried as default_retry_policy says
+    (the name predates the policy, it can ask more than twice). Months ingested
+    before are asked conditionally, see ArchiveValidators.
     Uses an existing httpx.AsyncClient instance.
 
     Args:
@@ -105,7 +609,8 @@ async def ask_twice(player_name: str, year: int, month: int, client: httpx.Async
         client (httpx.AsyncClient): The shared HTTPX async client.
 
     Returns:
-        httpx.Response | None: The HTTPX Response object if successful, None otherwise.
+        httpx.Response | None: The HTTPX Response object if successful (or 404: the
+                               month has no archive, or 304: not modified), None otherwise.
     """
     # Ensure month is two digits for URL formatting
     month_str = f"{month:02d}"
@@ -117,43 +622,30 @@ async def ask_twice(player_name: str, year: int, month: int, client: httpx.Async
         .replace("{month}", month_str)
     )
 
-    try:
-        games_response = await client.get(
-            DOWNLOAD_MONTH_URL,
-            follow_redirects=True,
-            timeout=5,
-            headers={"User-Agent": USER_AGENT}
-        )
-        
-        # Check for empty content on first try and retry if necessary
-        if not games_response.content:
-            await asyncio.sleep(1)
-            games_response = await client.get(
-                DOWNLOAD_MONTH_URL,
-                follow_redirects=True,
-                timeout=10,
-                headers={"User-Agent": USER_AGENT}
-            )
-        
-        if not games_response.content:
-            print(f"No content after two attempts for {player_name} in {year}-{month_str}.")
-            return None
+    conditional_headers = archive_validators.conditional_headers(player_name, year, month)
+    games_response = await request_with_retries(
+        client,
+        DOWNLOAD_MONTH_URL,
+        f"{player_name} {year}-{month_str}",
+        follow_redirects=True,
+        timeout=10,
+        headers={"User-Agent": USER_AGENT, **conditional_headers}
+    )
+    if games_response is None:
+        return None
+    archive_validators.record(games_response.status_code, bool(conditional_headers))
 
-        games_response.raise_for_status()
+    if games_response.status_code == 304:
+        print(f"{player_name} {year}-{month_str} not modified since its last ingestion (304).")
         return games_response
 
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code == 404:
-            print(f"No games found for {player_name} in {year}-{month_str} (404).")
-            return None
-        print(f"HTTP error downloading month {year}-{month_str}: {e.response.status_code} - {e.response.text}")
-        return None
-    except httpx.RequestError as e:
-        print(f"Request error downloading month {year}-{month_str}: {e}")
-        return None
-    except Exception as e:
-        print(f"An unexpected error occurred downloading month {year}-{month_str}: {e}")
+    if games_response.status_code == 404:
+        print(f"No games found for {player_name} in {year}-{month_str} (404).")
+        return games_response
+    if games_response.is_error:
+        print(f"HTTP error downloading month {year}-{month_str}: {games_response.status_code} - {games_response.text}")
         return None
+    return games_response
 
 
 async def download_month(player_name: str, year: int, month: int, client: httpx.AsyncClient) -> Optional[httpx.Response]:
@@ -164,6 +656,28 @@ async def download_month(player_name: str, year: int, month: int, client: httpx.
     return games
 
 
+# The only thing in chess.com archives that json can't read, replaced in the raw bytes
+LETS_PLAY_RAW = b' \\"Let"s Play!'
+LETS_PLAY_CLEAN = b'lets_play'
+
+
+def parse_month_archive(raw: bytes) -> Dict[str, Any]:
+    """
+    Parses a month archive as chess.com sends it (from the network or the raw archive store).
+    The whole body is in memory (the retry policy, the raw archive store and the
+    validators need the whole response) and the month's games are committed together,
+    so the month is parsed at once: peak memory is the body plus all its games.
+    The body is only copied when it contains LETS_PLAY_RAW, and it goes to json.loads
+    as bytes: json's own decode is the only str copy left.
+    Raises json.JSONDecodeError (and UnicodeDecodeError).
+
+    Returns: {"games": [...]}
+    """
+    if LETS_PLAY_RAW in raw:
+        raw = raw.replace(LETS_PLAY_RAW, LETS_PLAY_CLEAN)
+    return json.loads(raw)
+
+
 async def month_of_games(param: Dict[str, Any], client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
     """
     Downloads a month of games and returns as parsed JSON dictionary.
@@ -174,7 +688,9 @@ async def month_of_games(param: Dict[str, Any], client: httpx.AsyncClient) -> Op
         client (httpx.AsyncClient): The shared HTTPX async client.
 
     Returns:
-        Dict[str, Any] | None: The parsed JSON dictionary containing game data, or None on failure.
+        Dict[str, Any] | None: The parsed JSON dictionary containing game data
+                               ({"games": []} for a 404, {"not_modified": True} for a 304),
+                               or None on failure.
     """
     player_name = param["player_name"]
     year = param["year"]
@@ -184,12 +700,20 @@ async def month_of_games(param: Dict[str, Any], client: httpx.AsyncClient) -> Op
     
     if pgn_response is None:
         return None
+    if pgn_response.status_code == 404:
+        return {"games": []}
+    if pgn_response.status_code == 304:
+        return {"not_modified": True}
 
     try:
-        text_games = pgn_response.text
-        text_games = text_games.replace(' \\"Let"s Play!','lets_play') 
-        
-        parsed_json = json.loads(text_games)
+        parsed_json = parse_month_archive(pgn_response.content)
+        # usable for conditional requests once the month is committed (archive_validators.commit)
+        archive_validators.stage(player_name, year, month, pgn_response)
+        if raw_archive_store is not None:
+            try:
+                await asyncio.to_thread(raw_archive_store.save, player_name, year, month, pgn_response.content)
+            except OSError as e:
+                print(f"Could not store raw archive {player_name} {year}-{month}: {e}")
         return parsed_json
     except json.JSONDecodeError as e:
         print(f'JSON decoding failed for year: {year}, month: {month}: {e}')
@@ -199,85 +723,164 @@ async def month_of_games(param: Dict[str, Any], client: httpx.AsyncClient) -> Op
         return None
 
 
-async def download_months(
+def split_month_str(month_str: str) -> Tuple[int, int]:
+    """
+    '2020-1' or '2020-01' -> (2020, 1)
+    """
+    year_str, month_str_val = month_str.split('-')
+    return int(year_str), int(month_str_val)
+
+
+async def fetch_month_games(player_name: str,
+                            month_str: str,
+                            client: httpx.AsyncClient) -> Tuple[int, int, Optional[List[Dict[str, Any]]]]:
+    """
+    Fetches games for a single month.
+
+    Arg: month_str = '2020-1'
+
+    Returns: A tuple (year, month, games_list), games_list is [] for an empty month,
+             None on error and NOT_MODIFIED when the month didn't change.
+    """
+    year, month = split_month_str(month_str)
+    param = {"player_name": player_name, "year": year, "month": month}
+
+    try:
+        result = await month_of_games(param, client)
+    except Exception as e:
+        print(f"An error occurred in month {month_str} of {player_name}: {e}")
+        return year, month, None
+
+    if result is None:
+        return year, month, None
+    if result.get("not_modified"):
+        return year, month, NOT_MODIFIED
+
+    if 'games' in result and result['games'] is not None:
+        return year, month, result['games']
+    else:
+        print(f"No games or invalid data for {year}-{month} (missing/empty 'games' key in parsed JSON).")
+        return year, month, None
+
+
+async def stream_months(
                     player_name: str,
                     valid_dates: List[str],
-                    max_concurrent_requests: int = 2,
-                    min_delay_between_requests: float = 0.5
-                        ) -> Dict[int, Dict[int, List[Dict[str, Any]]]]:
+                    max_concurrent_requests: int = CHESS_COM_MAX_CONCURRENCY,
+                    min_delay_between_requests: float = 0.0
+                        ) -> AsyncIterator[Tuple[int, int, Optional[List[Dict[str, Any]]]]]:
     """
-    Downloads games for a player's month strings with controlled concurrency.
+    Downloads games for a player's month strings with controlled concurrency,
+    yielding every month as soon as it is downloaded (not in calendar order).
+
+    Months are only requested while the consumer keeps up: at most
+    max_concurrent_requests months are in flight or waiting to be consumed.
 
     Args:
         player_name (str): chess.com player's username.
         valid_dates (List[str]): A list of 'YYYY-MM' strings to download.
-        max_concurrent_requests (int): The maximum number of simultaneous requests to make.
-                                      Adjust based on Chess.com API rate limits.
-        min_delay_between_requests (float): Minimum delay in seconds between starting new requests.
-                                            This is crucial for API rate limiting.
+        max_concurrent_requests (int): Months downloaded at the same time by this call. The pace
+                                      itself is set by chess_com_rate_limiter, shared by every call.
+        min_delay_between_requests (float): Extra delay in seconds before every month request.
 
-    Returns:
-        Dict[int, Dict[int, List[Dict[str, Any]]]]: A dictionary where keys are years,
-        nested keys are months, and values are lists of game dictionaries.
+    Yields: (year, month, games_list), games_list is [] for an empty month, None on error
+            and NOT_MODIFIED when the month didn't change since it was ingested.
     """
-    all_games_by_month: Dict[int, Dict[int, List[Dict[str, Any]]]] = {}
-    
-    semaphore = asyncio.Semaphore(max_concurrent_requests)
+    pending_months = iter(valid_dates)
+    downloaded = asyncio.Queue(maxsize=max_concurrent_requests)
 
-    async with httpx.AsyncClient(timeout=15) as shared_client:
-        async def fetch_month_games_task(month_str: str) -> Tuple[int, int, Optional[List[Dict[str, Any]]]]:
-            """
-            Internal async function to fetch games for a single month,
-            semaphore and delay to not upset chess_com.
-            
-            Arg: mont_str = '2020-1'
-            
-            Returns: A tuple (year, month, games_list) or (year, month, None) on error/no games.
-            """
-            async with semaphore:
-                await asyncio.sleep(min_delay_between_requests)
+    shared_client = get_chess_com_client()
 
-                year_str, month_str_val = month_str.split('-')
-                year = int(year_str)
-                month = int(month_str_val)
+    async def download_worker():
+        # workers share one iterator, so every month is taken exactly once
+        for month_str in pending_months:
+            if min_delay_between_requests:
+                await asyncio.sleep(min_delay_between_requests)
+            await downloaded.put(await fetch_month_games(player_name, month_str, shared_client))
+        await downloaded.put(None)
 
-                param = {"player_name": player_name, "year": year, "month": month}
-                
-                result = await month_of_games(param, shared_client) 
+    workers = [asyncio.create_task(download_worker()) for _ in range(max_concurrent_requests)]
+    try:
+        finished_workers = 0
+        while finished_workers < len(workers):
+            item = await downloaded.get()
+            if item is None:
+                finished_workers += 1
+                continue
+            yield item
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def replay_months(
+                    player_name: str,
+                    valid_dates: Optional[List[str]] = None
+                        ) -> AsyncIterator[Tuple[int, int, Optional[List[Dict[str, Any]]]]]:
+    """
+    stream_months without network: yields the months saved in the raw archive store.
 
-                if result is None:
-                    return year, month, None
-                
-                if 'games' in result and result['games'] is not None:
-                    return year, month, result['games']
-                else:
-                    print(f"No games or invalid data for {year}-{month} (missing/empty 'games' key in parsed JSON).")
-                    return year, month, None
+    Args:
+        player_name (str): chess.com player's username.
+        valid_dates (List[str]): 'YYYY-MM' strings to replay, every stored month when None.
 
+    Yields: (year, month, games_list), games_list is None when the month isn't stored.
+    """
+    if raw_archive_store is None:
+        print("The raw archive store is off (RAW_ARCHIVE_DIR), nothing to replay.")
+        return
+    if valid_dates is None:
+        valid_dates = raw_archive_store.months(player_name)
+
+    for month_str in valid_dates:
+        year, month = split_month_str(month_str)
+        raw = await asyncio.to_thread(raw_archive_store.load, player_name, year, month)
+        if raw is None:
+            print(f"{player_name} {year}-{month:02d} is not in the raw archive store.")
+            yield year, month, None
+            continue
+        try:
+            parsed_json = parse_month_archive(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"Stored archive {player_name} {year}-{month:02d} can't be parsed: {e}")
+            yield year, month, None
+            continue
+        yield year, month, parsed_json.get('games') or []
 
-        tasks = [fetch_month_games_task(month_str) for month_str in valid_dates]
 
-        # Run tasks concurrently, limited by the semaphore
-        print(f"Starting download of {len(tasks)} months with {max_concurrent_requests} concurrent requests...")
-        start_time = time.time()
-        
-        # return_exceptions=True so that one task failing doesn't stop others
-        results = await asyncio.gather(*tasks, return_exceptions=True) 
+async def download_months(
+                    player_name: str,
+                    valid_dates: List[str],
+                    max_concurrent_requests: int = CHESS_COM_MAX_CONCURRENCY,
+                    min_delay_between_requests: float = 0.0
+                        ) -> Dict[int, Dict[int, List[Dict[str, Any]]]]:
+    """
+    Downloads games for a player's month strings with controlled concurrency,
+    and keeps all of them in memory (see stream_months for month by month).
 
-        end_time = time.time()
-        print(f"Finished downloading {len(tasks)} months in {end_time - start_time:.2f} seconds.")
+    Args:
+        player_name (str): chess.com player's username.
+        valid_dates (List[str]): A list of 'YYYY-MM' strings to download.
+        max_concurrent_requests (int): Months downloaded at the same time (see stream_months).
+        min_delay_between_requests (float): Extra delay in seconds before every month request.
 
-    # --- FIX: Handle exceptions in results list before unpacking ---
-    for item in results:
-        if isinstance(item, Exception):
-            print(f"An error occurred in month: {item}")
-            continue
-        year, month, games_list = item 
+    Returns:
+        Dict[int, Dict[int, List[Dict[str, Any]]]]: A dictionary where keys are years,
+        nested keys are months, and values are lists of game dictionaries.
+    """
+    all_games_by_month: Dict[int, Dict[int, List[Dict[str, Any]]]] = {}
 
-        if games_list is not None:
+    print(f"Starting download of {len(valid_dates)} months with {max_concurrent_requests} concurrent requests...")
+    start_time = time.time()
+    async for year, month, games_list in stream_months(player_name,
+                                                       valid_dates,
+                                                       max_concurrent_requests,
+                                                       min_delay_between_requests):
+        if games_list is not None and games_list is not NOT_MODIFIED:
             if year not in all_games_by_month:
                 all_games_by_month[year] = {}
             all_games_by_month[year][month] = games_list
+    print(f"Finished downloading {len(valid_dates)} months in {time.time() - start_time:.2f} seconds.")
 
     return all_games_by_month
-
@@ -0,0 +1,106 @@
+# database/operations/chess_com_client.py
+
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import httpx
+
+from constants import (HTTP2_ENABLED, HTTP_KEEPALIVE_EXPIRY, HTTP_MAX_CONNECTIONS,
+                       HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_TIMEOUT, USER_AGENT)
+
+try:
+    import h2  # noqa: F401 - httpx needs it for HTTP/2
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+# One client for every chess.com call, so connections (and their TLS sessions)
+# are reused across months and players. Started and stopped by main.py's lifespan.
+chess_com_client: Optional[httpx.AsyncClient] = None
+client_stats = {"requests": 0, "started_at": None, "http_versions": Counter(), "status_codes": Counter()}
+
+
+async def count_request(request: httpx.Request):
+    client_stats["requests"] += 1
+
+
+async def count_response(response: httpx.Response):
+    client_stats["http_versions"][response.http_version] += 1
+    client_stats["status_codes"][response.status_code] += 1
+
+
+def start_chess_com_client(max_connections: int = HTTP_MAX_CONNECTIONS,
+                           max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                           keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+                           http2: bool = HTTP2_ENABLED) -> httpx.AsyncClient:
+    """
+    Creates the shared chess.com client (once).
+    HTTP/2 needs the optional h2 package, without it the client falls back to HTTP/1.1 keep-alive.
+
+    Returns: the shared httpx.AsyncClient.
+    """
+    global chess_com_client
+    if chess_com_client is not None and not chess_com_client.is_closed:
+        return chess_com_client
+    if http2 and not H2_AVAILABLE:
+        print("h2 is not installed, chess.com client falls back to HTTP/1.1.")
+        http2 = False
+    chess_com_client = httpx.AsyncClient(
+        http2=http2,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        headers={"User-Agent": USER_AGENT},
+        event_hooks={"request": [count_request], "response": [count_response]},
+    )
+    client_stats["started_at"] = time.time()
+    print(f"chess.com client started (http2={http2}, max_connections={max_connections}).")
+    return chess_com_client
+
+
+async def stop_chess_com_client():
+    global chess_com_client
+    if chess_com_client is not None:
+        await chess_com_client.aclose()
+        chess_com_client = None
+        print("chess.com client closed.")
+
+
+def get_chess_com_client() -> httpx.AsyncClient:
+    """
+    The shared client, started on first use when the lifespan didn't (scripts, notebooks).
+    """
+    if chess_com_client is None or chess_com_client.is_closed:
+        return start_chess_com_client()
+    return chess_com_client
+
+
+def chess_com_client_stats() -> Dict[str, Any]:
+    """
+    Request counters and the state of the client's connection pool.
+
+    Returns: a JSON friendly dictionary.
+    """
+    stats = {
+        "running": chess_com_client is not None and not chess_com_client.is_closed,
+        "requests": client_stats["requests"],
+        "http_versions": dict(client_stats["http_versions"]),
+        "status_codes": {str(code): n for code, n in client_stats["status_codes"].items()},
+        "uptime_seconds": round(time.time() - client_stats["started_at"], 1) if client_stats["started_at"] else 0,
+    }
+    if not stats["running"]:
+        return stats
+    # httpx has no public pool API, the httpcore pool behind the transport does
+    pool = getattr(chess_com_client._transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    stats["pool"] = {
+        "connections": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "available": sum(1 for c in connections if c.is_available()),
+        "pending_requests": len(getattr(pool, "_requests", [])), # queued or being served
+    }
+    return stats
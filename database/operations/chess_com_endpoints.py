@@ -1,5 +1,6 @@
 USER_AGENT="Mozilla/5.0 (Macintosh; Intel Mac OS X x.y; rv:42.0) Gecko/20100101 Firefox/42.0"
 PLAYER="https://api.chess.com/pub/player/{player}"
 DOWNLOAD_MONTH = "https://api.chess.com/pub/player/{player}/games/{year}/{month}"
+ARCHIVES = "https://api.chess.com/pub/player/{player}/games/archives"
 LEADERBOARD = "https://api.chess.com/pub/leaderboards"
 STATS = "https://api.chess.com/pub/player/{username}/stats"
\ No newline at end of file
@@ -0,0 +1,204 @@
+# database/operations/crawler.py
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from constants import (CRAWLER_ENABLED, CRAWLER_IDLE_SECONDS, CRAWLER_MAX_ATTEMPTS,
+                       CRAWLER_REFRESH_SECONDS, CRAWLER_WORKERS)
+from database.database.ask_db import open_request
+from database.database.db_interface import DBInterface
+from database.database.models import CrawlFrontier
+from database.operations.available_months import plan_new_months
+from database.operations.pipeline import ingest_months
+
+# crawl_frontier.status
+QUEUED = "queued"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+crawler_tasks = []
+crawler_stats = Counter()
+
+
+async def refresh_frontier() -> int:
+    """
+    Queues every opponent of the principal players (the ones with months, as
+    get_principal_players) that isn't principal itself, with its number of
+    games against principal players as priority. Queued rows get their priority
+    refreshed; in progress, done and failed rows are left alone.
+
+    Returns: rows queued or re-prioritized.
+    """
+    frontier_interface = DBInterface(CrawlFrontier)
+    async with frontier_interface.session_scope() as session:
+        result = await session.execute(text("""
+            WITH principal AS (
+                SELECT DISTINCT player_name FROM months
+            ),
+            opponents AS (
+                SELECT g.black AS player_name FROM game g JOIN principal p ON g.white = p.player_name
+                UNION ALL
+                SELECT g.white AS player_name FROM game g JOIN principal p ON g.black = p.player_name
+            )
+            INSERT INTO crawl_frontier (player_name, priority, status, attempts, updated_at)
+            SELECT o.player_name, COUNT(*), :queued, 0, :now
+            FROM opponents o
+            WHERE o.player_name NOT IN (SELECT player_name FROM principal)
+            GROUP BY o.player_name
+            ON CONFLICT (player_name) DO UPDATE
+                SET priority = EXCLUDED.priority, updated_at = EXCLUDED.updated_at
+                WHERE crawl_frontier.status = :queued AND crawl_frontier.priority <> EXCLUDED.priority
+        """), {"queued": QUEUED, "now": int(time.time())})
+        return result.rowcount
+
+
+async def reset_in_progress() -> int:
+    """
+    Players left in progress by a stopped server are queued again. Their months
+    committed before the stop are skipped by plan_new_months, so they resume.
+
+    Returns: players queued again.
+    """
+    frontier_interface = DBInterface(CrawlFrontier)
+    async with frontier_interface.session_scope() as session:
+        result = await session.execute(
+            text("UPDATE crawl_frontier SET status = :queued WHERE status = :in_progress"),
+            {"queued": QUEUED, "in_progress": IN_PROGRESS}
+        )
+        return result.rowcount
+
+
+async def pop_next_player() -> Optional[Tuple[str, int]]:
+    """
+    Takes the queued player with the highest priority and marks it in progress.
+    SKIP LOCKED lets several crawlers (or servers) pop at the same time without
+    taking the same player.
+
+    Returns: (player_name, attempts) or None if nobody is queued.
+    """
+    frontier_interface = DBInterface(CrawlFrontier)
+    async with frontier_interface.session_scope() as session:
+        result = await session.execute(text("""
+            UPDATE crawl_frontier
+            SET status = :in_progress, attempts = attempts + 1, updated_at = :now
+            WHERE player_name = (
+                SELECT player_name FROM crawl_frontier
+                WHERE status = :queued
+                ORDER BY priority DESC
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING player_name, attempts
+        """), {"in_progress": IN_PROGRESS, "queued": QUEUED, "now": int(time.time())})
+        row = result.first()
+        return (row[0], row[1]) if row else None
+
+
+async def finish_player(player_name: str, status: str, error: Optional[str] = None):
+    frontier_interface = DBInterface(CrawlFrontier)
+    async with frontier_interface.session_scope() as session:
+        await session.execute(text("""
+            UPDATE crawl_frontier SET status = :status, last_error = :error, updated_at = :now
+            WHERE player_name = :player_name
+        """), {"status": status, "error": error, "now": int(time.time()), "player_name": player_name})
+
+
+async def crawl_player(player_name: str) -> Optional[str]:
+    """
+    Ingests a player of the frontier: profile (through plan_new_months) and every month.
+
+    Returns: None on success, otherwise what went wrong.
+    """
+    plan = await plan_new_months(player_name)
+    if "error" in plan:
+        return str(plan["error"])
+    if not plan["new_months"]:
+        return None
+    summary = await ingest_months(player_name, plan["new_months"])
+    crawler_stats["games"] += summary["games"]
+    if summary["failed_months"]:
+        return f"failed months: {sorted(summary['failed_months'])}"
+    return None
+
+
+async def crawler_worker(worker_id: int):
+    last_refresh = 0.0
+    while True:
+        try:
+            # one worker keeps the frontier up to date for all of them
+            if worker_id == 0 and time.monotonic() - last_refresh > CRAWLER_REFRESH_SECONDS:
+                queued = await refresh_frontier()
+                last_refresh = time.monotonic()
+                print(f"Crawl frontier refreshed: {queued} players queued or re-prioritized.")
+            job = await pop_next_player()
+            if job is None:
+                await asyncio.sleep(CRAWLER_IDLE_SECONDS)
+                continue
+            player_name, attempts = job
+            start_player = time.time()
+            try:
+                error = await crawl_player(player_name)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            if error is None:
+                await finish_player(player_name, DONE)
+                crawler_stats["done"] += 1
+                print(f"Crawler: {player_name} ingested in {time.time() - start_player:.2f} seconds.")
+            else:
+                status = FAILED if attempts >= CRAWLER_MAX_ATTEMPTS else QUEUED
+                await finish_player(player_name, status, error[:500])
+                crawler_stats[status] += 1
+                print(f"Crawler: {player_name} attempt {attempts} failed ({error}), {status}.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Crawler worker {worker_id} error: {e}")
+            await asyncio.sleep(CRAWLER_IDLE_SECONDS)
+
+
+async def start_crawler(workers: int = CRAWLER_WORKERS):
+    """
+    Starts the background crawler (main.py's lifespan) when CRAWLER_ENABLED.
+    Its downloads go through the same rate limiter as every other chess.com call.
+    """
+    if not CRAWLER_ENABLED:
+        print("Crawler disabled (CRAWLER_ENABLED).")
+        return
+    if crawler_tasks:
+        return
+    resumed = await reset_in_progress()
+    if resumed:
+        print(f"Crawler: resuming {resumed} players left in progress.")
+    crawler_tasks.extend(asyncio.create_task(crawler_worker(worker_id)) for worker_id in range(workers))
+    print(f"Crawler started with {workers} workers.")
+
+
+async def stop_crawler():
+    for task in crawler_tasks:
+        task.cancel()
+    await asyncio.gather(*crawler_tasks, return_exceptions=True)
+    crawler_tasks.clear()
+
+
+async def frontier_status() -> Dict[str, Any]:
+    """
+    Returns: players per status, the next players to crawl and the crawler's counters.
+    """
+    by_status = await open_request(
+        "SELECT status, COUNT(*) FROM crawl_frontier GROUP BY status"
+    )
+    next_players = await open_request("""
+        SELECT player_name, priority, attempts FROM crawl_frontier
+        WHERE status = :queued ORDER BY priority DESC LIMIT 10
+    """, {"queued": QUEUED}, fetch_as_dict=True)
+    return {
+        "running": bool(crawler_tasks),
+        "players": {status: n for status, n in by_status},
+        "next": next_players,
+        "crawler": dict(crawler_stats),
+    }
@@ -0,0 +1,121 @@
+# database/operations/download_scheduler.py
+
+import asyncio
+from collections import Counter, OrderedDict, deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from constants import SWEEP_PLAYER_BUFFER, SWEEP_WORKERS
+from database.operations.chess_com_api import fetch_month_games, split_month_str
+from database.operations.chess_com_client import get_chess_com_client
+
+
+class PlayerDownloads:
+    """
+    The months of one player waiting in the scheduler, and the ones downloaded
+    but not consumed yet.
+    """
+
+    def __init__(self, player_name: str, months: List[str]):
+        self.player_name = player_name
+        self.pending = deque(months)
+        self.results = asyncio.Queue()
+        self.in_flight = 0
+
+
+class FairDownloadScheduler:
+    """
+    Downloads the months of many players with one pool of workers.
+
+    Every player streams its months (stream, same contract as stream_months)
+    into its own ingestion pipeline; the workers take the next month round-robin
+    over the players, so a player with years of archives gets the same share of
+    requests as one with a single month instead of blocking it. A player's
+    months are only requested while its pipeline keeps up (buffer months in
+    flight or waiting). Every request still goes through chess_com_rate_limiter,
+    so the whole sweep shares one rate budget.
+
+    Usage:
+        async with FairDownloadScheduler(workers=8) as scheduler:
+            async for year, month, games in scheduler.stream(player_name, months):
+                ...
+    """
+
+    def __init__(self, workers: int = SWEEP_WORKERS, buffer: int = SWEEP_PLAYER_BUFFER):
+        self.workers = max(1, workers)
+        self.buffer = max(1, buffer)
+        self.players = OrderedDict() # round-robin order, the next player to serve first
+        self.wakeup = None
+        self.tasks = []
+        self.counters = Counter()
+
+    async def __aenter__(self):
+        self.wakeup = asyncio.Condition()
+        client = get_chess_com_client()
+        self.tasks = [asyncio.create_task(self.worker(client)) for _ in range(self.workers)]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def next_job(self) -> Optional[Tuple[PlayerDownloads, str]]:
+        for _ in range(len(self.players)):
+            key, downloads = next(iter(self.players.items()))
+            self.players.move_to_end(key)
+            if downloads.pending and downloads.in_flight + downloads.results.qsize() < self.buffer:
+                downloads.in_flight += 1
+                return downloads, downloads.pending.popleft()
+        return None
+
+    async def notify(self):
+        async with self.wakeup:
+            self.wakeup.notify_all()
+
+    async def worker(self, client):
+        while True:
+            async with self.wakeup:
+                job = self.next_job()
+                while job is None:
+                    await self.wakeup.wait()
+                    job = self.next_job()
+            downloads, month_str = job
+            try:
+                result = await fetch_month_games(downloads.player_name, month_str, client)
+            except Exception as e:
+                print(f"An error occurred in month {month_str} of {downloads.player_name}: {e}")
+                result = (*split_month_str(month_str), None)
+            downloads.results.put_nowait(result)
+            downloads.in_flight -= 1
+            self.counters["months"] += 1
+            await self.notify()
+
+    async def stream(self, player_name: str, months: List[str]
+                     ) -> AsyncIterator[Tuple[int, int, Optional[List[Dict[str, Any]]]]]:
+        """
+        Yields (year, month, games_list) for every month of the player, as stream_months does.
+        """
+        if self.wakeup is None:
+            raise RuntimeError("FairDownloadScheduler has to be entered (async with) before streaming.")
+        downloads = PlayerDownloads(player_name, months)
+        key = object() # the same player may be streamed twice
+        self.players[key] = downloads
+        self.counters["players"] += 1
+        await self.notify()
+        try:
+            for _ in range(len(months)):
+                result = await downloads.results.get()
+                await self.notify() # room for the next month of this player
+                yield result
+        finally:
+            self.players.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "active_players": len(self.players),
+            "pending_months": sum(len(d.pending) for d in self.players.values()),
+            "in_flight": sum(d.in_flight for d in self.players.values()),
+            **self.counters,
+        }
@@ -1,36 +1,86 @@
 # OPERATIONS FORMAT GAMES (REVISED for Asynchronous Execution and Efficiency)
-from typing import Union,Dict,Any, List, Set, Tuple
+from typing import Union,Dict,Any, List, Set, Tuple, NamedTuple, Optional
 import asyncio
 import concurrent.futures
-from sqlalchemy import text, select
+from collections import Counter
+from sqlalchemy import text, select, bindparam, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY
 from fastapi.encoders import jsonable_encoder
 import numpy as np
-from constants import DRAW_RESULTS, LOSE_RESULTS, WINING_RESULT
-from .models import PlayerCreateData, GameCreateData, MoveCreateData, MonthCreateData
+from constants import (DRAW_RESULTS, LOSE_RESULTS, WINING_RESULT,
+                       FORMAT_WORKERS, FORMAT_CHUNK_SIZE, STRICT_VALIDATION)
+from .models import (PlayerCreateData, GameCreateData, MoveCreateData, MonthCreateData,
+                     GAME_COLUMNS, MOVE_COLUMNS)
 import re
-import pandas as pd
 import multiprocessing as mp
-from database.database.ask_db import (
-    get_games_already_in_db
-)
-
+from database.database.ask_db import get_games_already_in_db
 from database.database.db_interface import DBInterface
-from database.database.models import Player, Game, Month, Move
+from database.database.models import Game, Month, Move
 import time
 from datetime import datetime
 from database.operations import players as players_ops
-from database.operations. check_player_in_db import get_only_players_not_in_db
-# this should be at the main.py i think
-cpu_bound_executor = concurrent.futures.ThreadPoolExecutor(max_workers=mp.cpu_count())
+from database.operations.months import month_status
+from database.operations.check_player_in_db import insert_missing_players
+from database.operations.known_links import known_links
+
+# Process pool for the CPU-bound formatting, started and stopped in main.py's lifespan.
+format_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+# The only raw fields create_game_dict reads, everything else stays out of the pickles.
+RAW_GAME_FIELDS = ('url', 'pgn', 'time_control', 'white', 'black', 'eco')
+
+# Game columns a replay overwrites: everything the formatter writes (fens_done belongs to the fens)
+REPLAY_GAME_COLUMNS = [column for column in GAME_COLUMNS if column not in ('link', 'fens_done')]
+
+# the rows a replay is about to overwrite, locked in link order like the merges
+REPLACED_GAMES_SQL = text("""
+    SELECT link, white, black FROM game WHERE link = ANY(:links) ORDER BY link FOR UPDATE
+""").bindparams(bindparam("links", type_=ARRAY(BigInteger)))
+DELETE_REPLACED_MOVES_SQL = text("""
+    DELETE FROM moves WHERE link = ANY(:links)
+""").bindparams(bindparam("links", type_=ARRAY(BigInteger)))
+
+
+def start_format_pool(max_workers: int = FORMAT_WORKERS) -> concurrent.futures.ProcessPoolExecutor:
+    """
+    Starts the process pool used by format_games. Without it, format_games
+    still works but formats in a thread of this process.
+    """
+    global format_pool
+    if format_pool is None:
+        # spawn: forking a process that already holds an event loop and DB connections is asking for trouble
+        format_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp.get_context("spawn")
+        )
+        print(f"Format pool started with {max_workers} workers.")
+    return format_pool
+
+
+async def stop_format_pool():
+    """Shuts the formatting process pool down, waiting for running chunks (in a thread, not on the event loop)."""
+    global format_pool
+    if format_pool is not None:
+        pool, format_pool = format_pool, None
+        await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+        print("Format pool stopped.")
 
 
-async def insert_new_data(games_list, moves_list, months_list):
+async def insert_new_data(games_rows, moves_rows, months_list, use_copy: bool = True, replace: bool = False):
     """
     Inserts formatted game, move, and month data into the database in the correct order
     to respect foreign key constraints. Games must be inserted before moves.
-
-    Args: lists for games, moves_list and month_list
-            each list contains one dictionary for item.
+    Everything runs in one transaction and every write is an ON CONFLICT upsert,
+    so rows that are already in the DB (or being written by a concurrent
+    ingestion of the opponent) are skipped instead of failing.
+
+    Args: games_rows, moves_rows: plain tuples laid out as GAME_COLUMNS / MOVE_COLUMNS
+            (see FormattedGames), months_list: one dictionary per month.
+          use_copy: stream games and moves with PostgreSQL COPY (default),
+            False sends them as multi-row INSERT ... ON CONFLICT statements.
+          replace: rewrite the games that are already in the DB instead of skipping
+            them (a replay): their REPLAY_GAME_COLUMNS are overwritten and their
+            moves deleted and written again.
 
     Returns: Nothing
     
@@ -39,37 +89,94 @@ async def insert_new_data(games_list, moves_list, months_list):
     move_interface = DBInterface(Move)
     month_interface = DBInterface(Month)
 
-    # Step 1: Insert games first. This is crucial for foreign key integrity with moves.
-    if games_list:
-        await game_interface.create_all(games_list)
-        print(f"Successfully inserted {len(games_list)} games.")
-    else:
-        print("No new games to insert.")
-
-    # Step 2: Insert moves after games are confirmed to be in the database.
-    if moves_list:
-        await move_interface.create_all(moves_list)
-        print(f"Successfully inserted {len(moves_list)} moves.")
-    else:
-        print("No new moves to insert.")
-
-    # Step 3: Insert months. This can be done after games and moves, or even concurrently
-    # For safety, keeping it sequential here.
-    if months_list:
-        await month_interface.create_all(months_list)
-        print(f"Successfully inserted {len(months_list)} months.")
-    else:
-        print("No new months to insert.")
-
-    total_inserted_items = len(games_list) + len(moves_list) + len(months_list)
+    white_index = GAME_COLUMNS.index('white')
+    black_index = GAME_COLUMNS.index('black')
+    game_link_index = GAME_COLUMNS.index('link')
+    update_columns = REPLAY_GAME_COLUMNS if replace else None
+
+    async with game_interface.session_scope() as session:
+        replaced_games = []
+        if replace and games_rows:
+            links = [game[game_link_index] for game in games_rows]
+            replaced_games = (await session.execute(REPLACED_GAMES_SQL, {"links": links})).all()
+            await session.execute(DELETE_REPLACED_MOVES_SQL, {"links": links})
+            print(f"Replacing {len(replaced_games)} games already in the DB and their moves.")
+
+        # Step 1: Insert games first. This is crucial for foreign key integrity with moves.
+        new_links = []
+        if games_rows:
+            if use_copy:
+                new_links = await game_interface.copy_all(
+                    games_rows, session=session, conflict_columns=['link'],
+                    returning='link', columns=GAME_COLUMNS, update_columns=update_columns
+                )
+            else:
+                new_links = await game_interface.upsert_all(
+                    games_rows, ['link'], update_columns=update_columns, returning='link',
+                    session=session, columns=GAME_COLUMNS
+                )
+            print(f"Successfully inserted {len(new_links)} new games out of {len(games_rows)}.")
+        else:
+            print("No new games to insert.")
+
+        # Step 2: Moves only for the games this transaction actually inserted,
+        # a game that was already there already has its moves (unless replaced, deleted above).
+        new_links = set(new_links)
+        link_index = MOVE_COLUMNS.index('link')
+        moves_rows = [move for move in moves_rows if move[link_index] in new_links]
+        if moves_rows:
+            if use_copy:
+                await move_interface.copy_all(
+                    moves_rows, session=session, conflict_columns=['link', 'n_move'], columns=MOVE_COLUMNS
+                )
+            else:
+                await move_interface.upsert_all(
+                    moves_rows, ['link', 'n_move'], session=session, columns=MOVE_COLUMNS
+                )
+            print(f"Successfully inserted {len(moves_rows)} moves.")
+        else:
+            print("No new moves to insert.")
+
+        # Step 3: Months. A month downloaded again gets its n_games refreshed.
+        if months_list:
+            await month_interface.upsert_all(
+                months_list,
+                ['player_name', 'year', 'month'],
+                update_columns=['n_games', 'status'],
+                session=session
+            )
+            print(f"Successfully upserted {len(months_list)} months.")
+        else:
+            print("No new months to insert.")
+
+        # Step 4: per-player game counts, only for the games this transaction inserted.
+        # A replaced game is counted again, so it is taken off its old players first.
+        n_new_games = Counter()
+        for game in games_rows:
+            if game[game_link_index] in new_links:
+                n_new_games[game[white_index]] += 1
+                n_new_games[game[black_index]] += 1
+        for _, white, black in replaced_games:
+            n_new_games[white] -= 1
+            n_new_games[black] -= 1
+        n_new_games = Counter({player: n for player, n in n_new_games.items() if n})
+        await players_ops.add_game_counts(n_new_games, session)
+
+    # committed, from now on these games are known without asking the DB
+    await known_links.add(new_links)
+    players_ops.invalidate_current_players(set(n_new_games), {month['player_name'] for month in months_list})
+
+    total_inserted_items = len(new_links) + len(moves_rows) + len(months_list)
     if total_inserted_items > 0:
-        print(f"Overall database insertion completed for {len(games_list)} games, {len(moves_list)} moves, and {len(months_list)} months.")
+        print(f"Overall database insertion completed for {len(new_links)} games, {len(moves_rows)} moves, and {len(months_list)} months.")
     else:
         print("No data was inserted into the database.")
 
 def get_pgn_item(game_pgn: str, item: str) -> str:
-    """Extracts an item from a PGN string."""
-    # This function is correct as provided.
+    """
+    Extracts an item from a PGN string.
+    Scans the whole PGN on every call, use parse_pgn_headers when more than one tag is needed.
+    """
     if item == "Termination":
         return (
             game_pgn.split(f"{item}")[1]
@@ -87,10 +194,37 @@ def get_pgn_item(game_pgn: str, item: str) -> str:
         .lower()
     )
 
-def get_start_and_end_date(game, game_for_db):
+# one [Tag "value"] per line; the value runs to the last '"]' so stray quotes inside it are kept
+PGN_TAG_PATTERN = re.compile(r'^\[(\w+) "(.*)"\]$', re.MULTILINE)
+
+class PgnHeaders(NamedTuple):
+    """All tags of a PGN plus its movetext (None when the PGN has no movetext block)."""
+    tags: Dict[str, str]
+    movetext: Optional[str]
+
+def parse_pgn_headers(game_pgn: str) -> PgnHeaders:
+    """
+    Reads every header tag of a PGN in a single regex pass over the header
+    block (get_pgn_item splits the whole PGN once per tag), and slices out the movetext (the block after the first blank line).
+
+    Arg: game_pgn = '[Event "Live Chess"]\n[Site "Chess.com"]\n...\n\n1. e4 {[%clk 0:02:59.9]} ...'
+
+    Returns: PgnHeaders(tags={'Event': 'Live Chess', ...}, movetext='1. e4 ...')
+    """
+    header_end = game_pgn.find("\n\n")
+    if header_end == -1:
+        return PgnHeaders(dict(PGN_TAG_PATTERN.findall(game_pgn)), None)
+    movetext_end = game_pgn.find("\n\n", header_end + 2)
+    movetext = game_pgn[header_end + 2:movetext_end] if movetext_end != -1 else game_pgn[header_end + 2:]
+    return PgnHeaders(dict(PGN_TAG_PATTERN.findall(game_pgn, 0, header_end)), movetext)
+
+def get_start_and_end_date(game, game_for_db, headers: Optional[PgnHeaders] = None):
     """Extracts and calculates game start/end dates and time elapsed."""
+    if headers is None:
+        headers = parse_pgn_headers(game['pgn'])
+    tags = headers.tags
     try:
-        game_date = get_pgn_item(game['pgn'], item='Date').split('.')
+        game_date = tags['Date'].split('.')
         game_for_db['year'] = int(game_date[0])
         game_for_db['month'] = int(game_date[1])
         game_for_db['day'] = int(game_date[2])
@@ -100,7 +234,7 @@ def get_start_and_end_date(game, game_for_db):
         return game_for_db
 
     try:
-        game_start_time_str = get_pgn_item(game['pgn'], item='StartTime').split(':')
+        game_start_time_str = tags['StartTime'].split(':')
         game_for_db['hour'] = int(game_start_time_str[0])
         game_for_db['minute'] = int(game_start_time_str[1])
         game_for_db['second'] = int(game_start_time_str[2])
@@ -119,11 +253,11 @@ def get_start_and_end_date(game, game_for_db):
                           second = game_for_db['second'])
 
     try:
-        game_end_date_str = get_pgn_item(game['pgn'], item='EndDate').split('.')
+        game_end_date_str = tags['EndDate'].split('.')
         game_for_db['end_year'] = int(game_end_date_str[0])
         game_for_db['end_month'] = int(game_end_date_str[1])
         game_for_db['end_day'] = int(game_end_date_str[2])
-        game_end_time_str = get_pgn_item(game['pgn'], item='EndTime').split(':')
+        game_end_time_str = tags['EndTime'].split(':')
         game_for_db['end_hour'] = int(game_end_time_str[0])
         game_for_db['end_minute'] = int(game_end_time_str[1])
         game_for_db['end_second'] = int(game_end_time_str[2])
@@ -187,51 +321,115 @@ def get_n_moves(raw_moves):
     numeric_moves = [int(x.replace(".", "")) for x in raw_moves.split() if x.replace(".", "").isnumeric()]
     return max(numeric_moves) if numeric_moves else 0
 
+# H, MM and SS.s of a clock, in nanoseconds
+CLOCK_FIELD_NS = np.array([3600e9, 60e9, 1e9])
+
+def decode_clocks(times: List[str]) -> np.ndarray:
+    """
+    Decodes [%clk H:MM:SS.s] values into seconds in one vectorized pass:
+    all values are split at once into an (n, 3) float array of H, MM, SS.s.
+    "--" (the padding for a missing clock) decodes to 0.0.
+    Seconds are rounded through whole nanoseconds, as pd.Timedelta(...).total_seconds() does.
+
+    Arg: times = ["0:03:00", "0:02:58.5", "--"]
+
+    Returns: np.array([180.0, 178.5, 0.0])
+    """
+    if not times:
+        return np.zeros(0)
+    fields = ":".join("0:0:0" if str_time == "--" else str_time for str_time in times).split(":")
+    if len(fields) != 3 * len(times):
+        raise ValueError(f"Clock values are not all H:MM:SS: {times[:5]}...")
+    nanoseconds = np.rint(np.array(fields, dtype=np.float64).reshape(-1, 3) @ CLOCK_FIELD_NS)
+    return nanoseconds / 1e9
+
+def decode_clocks_batch(games_times: List[List[str]]) -> List[np.ndarray]:
+    """
+    decode_clocks over the clock values of many games with a single decode,
+    split back into one array per game.
+    """
+    lengths = [len(times) for times in games_times]
+    all_seconds = decode_clocks([str_time for times in games_times for str_time in times])
+    return np.split(all_seconds, np.cumsum(lengths)[:-1]) if lengths else []
+
+def decode_chunk_clocks(games_times: List[List[str]]) -> List[Optional[np.ndarray]]:
+    """
+    decode_clocks_batch for a chunk of games. When a clock of the chunk can't be
+    decoded, the games are decoded one by one instead and the ones with a bad
+    clock get None (they are skipped, as create_game_dict skips them).
+    """
+    try:
+        return decode_clocks_batch(games_times)
+    except ValueError:
+        pass
+    games_clocks = []
+    for times in games_times:
+        try:
+            games_clocks.append(decode_clocks(times))
+        except ValueError:
+            games_clocks.append(None)
+    return games_clocks
+
+def reaction_times(clocks: np.ndarray, time_bonus: int) -> np.ndarray:
+    """
+    Seconds spent on each move from one side's consecutive clocks:
+    |clock[i] - clock[i + 1]| + bonus, with a 0 difference for the last move.
+    """
+    spent = np.zeros(len(clocks))
+    spent[:-1] = clocks[:-1] - clocks[1:]
+    return np.abs(spent) + time_bonus
+
 def create_moves_table(
         game_url:str,
         times: list,
         clean_moves: list,
         n_moves: int,
-        time_bonus: int) -> dict[str, Any]: 
-    """Formats raw move data into a dictionary suitable for MoveCreateData."""
+        time_bonus: int,
+        clocks: Optional[np.ndarray] = None) -> dict[str, Any]: 
+    """
+    Formats raw move data into a dictionary suitable for MoveCreateData.
+    clocks are the decoded times when the caller already has them (decode_clocks_batch).
+    """
     
     if len(clean_moves) % 2 != 0:
         clean_moves.append("--")
     if len(times) % 2 != 0:
         times.append("--")
 
-    ordered_times = np.array(times).reshape((-1, 2))
     ordered_moves = np.array(clean_moves).reshape((-1, 2))
 
-    white_times = pd.Series(
-        [pd.Timedelta(str(str_time)).total_seconds() if str(str_time) != "--" else 0.0 for str_time in ordered_times[:, 0]]
-    )
-
-    black_times = pd.Series(
-        [pd.Timedelta(str(str_time)).total_seconds() if str(str_time) != "--" else 0.0 for str_time in ordered_times[:, 1]]
-    )
-
-    white_reaction_times_raw = white_times.diff(periods=-1).fillna(0).abs() + time_bonus
-    black_reaction_times_raw = black_times.diff(periods=-1).fillna(0).abs() + time_bonus
-
+    if clocks is None:
+        clocks = decode_clocks(times)
+    ordered_clocks = clocks.reshape((-1, 2))
+    white_times = ordered_clocks[:, 0]
+    black_times = ordered_clocks[:, 1]
 
     result = {
         "link": int(game_url.split('/')[-1]),
         "white_moves": [str(x) for x in ordered_moves[:, 0].tolist()],
-        "white_reaction_times": [round(x, 3) for x in white_reaction_times_raw.tolist()],
-        "white_time_left": [round(x, 3) for x in white_times.tolist()],
+        "white_reaction_times": np.round(reaction_times(white_times, time_bonus), 3).tolist(),
+        "white_time_left": np.round(white_times, 3).tolist(),
         "black_moves": [str(x) for x in ordered_moves[:, 1].tolist()],
-        "black_reaction_times": [round(x, 3) for x in black_reaction_times_raw.tolist()],
-        "black_time_left": [round(x, 3) for x in black_times.tolist()]
+        "black_reaction_times": np.round(reaction_times(black_times, time_bonus), 3).tolist(),
+        "black_time_left": np.round(black_times, 3).tolist()
     }
     return result
 
-def get_moves_data(game: dict) -> tuple[int, dict]:
-    """Extracts and formats the moves of a game."""
+class RawMoves(NamedTuple):
+    """A game's moves as read from its movetext, before the clocks are decoded."""
+    n_moves: int
+    time_bonus: int
+    times: List[str]
+    clean_moves: List[str]
+
+def parse_moves(game: dict, movetext: Optional[str] = None) -> RawMoves:
+    """Reads the moves, clock strings and move count of a game's movetext."""
     time_bonus = get_time_bonus(game)
 
+    if movetext is None:
+        movetext = game['pgn'].split("\n\n")[1]
     raw_moves = (
-        game['pgn'].split("\n\n")[1]
+        movetext
         .replace("1/2-1/2", "")
         .replace("1-0", "")
         .replace("0-1", "")
@@ -247,16 +445,24 @@ def get_moves_data(game: dict) -> tuple[int, dict]:
 
     if len(times) % 2 != 0:
         times.append("--")
+    return RawMoves(n_moves, time_bonus, times, clean_moves)
 
+def get_moves_data(game: dict, movetext: Optional[str] = None) -> tuple[int, dict]:
+    """Extracts and formats the moves of a game."""
+    raw_moves = parse_moves(game, movetext)
     moves_data = create_moves_table(game['url'],
-                                    times,
-                                    clean_moves,
-                                    n_moves,
-                                    time_bonus)
-    return n_moves, moves_data
-
-def create_game_dict(game_raw_data: dict) -> Union[Dict[str, Any], str, bool]:
-    """Converts raw game data into a dictionary for the Game model."""
+                                    raw_moves.times,
+                                    raw_moves.clean_moves,
+                                    raw_moves.n_moves,
+                                    raw_moves.time_bonus)
+    return raw_moves.n_moves, moves_data
+
+def create_game_dict(game_raw_data: dict, decode_moves: bool = True) -> Union[Dict[str, Any], str, bool]:
+    """
+    Converts raw game data into a dictionary for the Game model.
+    Without decode_moves, 'moves_data' holds the game's RawMoves and its clocks
+    are left to the caller (format_games_chunk decodes a whole chunk at once).
+    """
     try:
         len(game_raw_data['pgn'])
     except KeyError:
@@ -266,7 +472,8 @@ def create_game_dict(game_raw_data: dict) -> Union[Dict[str, Any], str, bool]:
     game_for_db['fens_done'] = False
     game_for_db['link'] = int(game_raw_data['url'].split('/')[-1])
     game_for_db['time_control'] = game_raw_data['time_control']
-    game_for_db = get_start_and_end_date(game_raw_data, game_for_db)
+    headers = parse_pgn_headers(game_raw_data['pgn'])
+    game_for_db = get_start_and_end_date(game_raw_data, game_for_db, headers)
 
     if game_for_db['year'] == 0:
         print(f"Skipping game {game_raw_data.get('url', 'N/A')} due to date parsing error.")
@@ -279,7 +486,11 @@ def create_game_dict(game_raw_data: dict) -> Union[Dict[str, Any], str, bool]:
         return False
 
     try:
-        n_moves, moves_data = get_moves_data(game_raw_data)
+        if decode_moves:
+            n_moves, moves_data = get_moves_data(game_raw_data, headers.movetext)
+        else:
+            moves_data = parse_moves(game_raw_data, headers.movetext)
+            n_moves = moves_data.n_moves
     except Exception as e:
         #print(f"Error getting moves data for game {game_raw_data.get('url', 'N/A')}: {e}")
         return False
@@ -292,12 +503,76 @@ def create_game_dict(game_raw_data: dict) -> Union[Dict[str, Any], str, bool]:
         game_for_db['eco'] = 'no_eco'
     return game_for_db
 
-def format_one_game_moves(moves: dict) -> List[Dict[str, Any]]:
-    """Formats individual moves data for the Move model."""
+class FormattedGames(NamedTuple):
+    """Formatted games and moves as plain tuples, ready for bulk insert."""
+    game_rows: List[tuple] # laid out as GAME_COLUMNS
+    move_rows: List[tuple] # laid out as MOVE_COLUMNS
+
+MOVES_DATA_KEYS = ('white_moves', 'white_reaction_times', 'white_time_left',
+                   'black_moves', 'black_reaction_times', 'black_time_left')
+
+# (min, max) allowed for the numeric game columns, None for no bound
+GAME_INT_RANGES = {
+    'link': (1, None), 'year': (1, None), 'month': (1, 12), 'day': (1, 31),
+    'hour': (0, 23), 'minute': (0, 59), 'second': (0, 59),
+    'white_elo': (0, None), 'black_elo': (0, None),
+    'time_elapsed': (None, None), 'n_moves': (0, None),
+}
+GAME_FLOAT_RANGES = {'white_result': (0.0, 1.0), 'black_result': (0.0, 1.0)}
+GAME_STR_COLUMNS = ('white', 'black', 'white_str_result', 'black_str_result', 'time_control', 'eco')
+
+def _moves_float_column(values: list, n_rows: int) -> np.ndarray:
+    """A move time column padded with 0.0 up to n_rows (a side can have fewer clocks than moves)."""
+    column = np.zeros(n_rows)
+    n_values = min(n_rows, len(values))
+    column[:n_values] = np.asarray(values[:n_values], dtype=np.float64)
+    return column
+
+def validate_moves_columns(moves: dict) -> List[tuple]:
+    """
+    Checks one game's moves a whole column at a time (types, lengths and
+    value ranges) and lays them out as MOVE_COLUMNS tuples.
+
+    Raises ValueError when a column does not pass, the whole game should be skipped then.
+    """
+    if not all(isinstance(moves.get(key), list) for key in MOVES_DATA_KEYS):
+        raise ValueError(f"Missing or invalid moves data structure for game link {moves.get('link', 'N/A')}")
+    link = moves.get('link')
+    if not isinstance(link, int) or link <= 0:
+        raise ValueError(f"Invalid game link in moves data: {link}")
+
+    n_rows = len(moves['white_moves'])
+    white_moves = [str(move) for move in moves['white_moves']]
+    black_moves = [str(move) for move in moves['black_moves'][:n_rows]]
+    black_moves += ['--'] * (n_rows - len(black_moves))
+    if not all(white_moves) or not all(black_moves):
+        raise ValueError(f"Empty move string in game {link}")
+
+    times = np.vstack([
+        _moves_float_column(moves['white_reaction_times'], n_rows),
+        _moves_float_column(moves['black_reaction_times'], n_rows),
+        _moves_float_column(moves['white_time_left'], n_rows),
+        _moves_float_column(moves['black_time_left'], n_rows),
+    ])
+    if not np.isfinite(times).all() or (times < 0).any():
+        raise ValueError(f"Negative or non finite move times in game {link}")
+    times = np.round(times, 3).tolist()
+
+    return list(zip([link] * n_rows, range(1, n_rows + 1), white_moves, black_moves, *times))
+
+def format_one_game_moves(moves: dict, strict: bool = STRICT_VALIDATION) -> List[tuple]:
+    """
+    Formats individual moves data for the Move model, as MOVE_COLUMNS tuples.
+    Checked column-wise by validate_moves_columns, or move by move with
+    MoveCreateData when strict (debugging).
+    """
+    if not strict:
+        return validate_moves_columns(moves)
+
     to_insert_moves = []
     try:
         # Ensure 'white_moves', 'black_moves', etc. are present and are lists
-        if not all(k in moves and isinstance(moves[k], list) for k in ['white_moves', 'white_reaction_times', 'white_time_left', 'black_moves', 'black_reaction_times', 'black_time_left']):
+        if not all(k in moves and isinstance(moves[k], list) for k in MOVES_DATA_KEYS):
             print(f"Warning: Missing or invalid moves data structure for game link {moves.get('link', 'N/A')}")
             return []
     except KeyError:
@@ -326,153 +601,271 @@ def format_one_game_moves(moves: dict) -> List[Dict[str, Any]]:
             moves_dict['black_reaction_time'] = 0.0
             moves_dict['black_time_left'] = 0.0
 
-        # Validate and convert to Pydantic model, then dump to dict
+        # Validate and convert to Pydantic model, then dump to a tuple
         try:
-            to_insert_moves.append(MoveCreateData(**moves_dict).model_dump())
+            to_insert_moves.append(tuple(MoveCreateData(**moves_dict).model_dump().values()))
         except Exception as e:
             print(f"Error creating MoveCreateData for move {ind+1} of game {moves.get('link', 'N/A')}: {e}")
             # Decide whether to skip this move or the whole game, for now just skip this move
             continue
     return to_insert_moves
 
+def validate_game_rows(games: List[Dict[str, Any]], strict: bool = STRICT_VALIDATION) -> List[tuple]:
+    """
+    Checks a chunk of formatted games a whole column at a time (types and value
+    ranges) and lays them out as GAME_COLUMNS tuples. Games that do not pass are
+    dropped. With strict, every game goes through GameCreateData instead (debugging).
+    """
+    if strict:
+        game_rows = []
+        for game in games:
+            try:
+                game_rows.append(tuple(GameCreateData(**game).model_dump().values()))
+            except Exception as e:
+                print(f"Error creating GameCreateData for formatted game {game.get('link', 'N/A')}: {e}. Skipping game.")
+        return game_rows
 
-# --- MAIN FORMAT AND INSERT FUNCTION ---
-
-async def format_games(games, player_name):
+    if not games:
+        return []
+    valid = np.ones(len(games), dtype=bool)
+    columns = {}
+    for column, (low, high) in {**GAME_INT_RANGES, **GAME_FLOAT_RANGES}.items():
+        # None (missing value) becomes nan and fails the isfinite check
+        values = np.array([game.get(column) for game in games], dtype=np.float64)
+        ok = np.isfinite(values)
+        if column in GAME_INT_RANGES:
+            ok &= values == np.floor(values)
+        if low is not None:
+            ok &= values >= low
+        if high is not None:
+            ok &= values <= high
+        valid &= ok
+        values[~ok] = 0
+        columns[column] = values.astype(np.int64).tolist() if column in GAME_INT_RANGES else values.tolist()
+    for column in GAME_STR_COLUMNS:
+        columns[column] = [game.get(column) for game in games]
+        valid &= np.array([isinstance(value, str) and value != '' for value in columns[column]])
+    columns['fens_done'] = [game.get('fens_done') for game in games]
+    valid &= np.array([isinstance(value, bool) for value in columns['fens_done']])
+
+    if not valid.all():
+        skipped = [game.get('link', 'N/A') for game, ok in zip(games, valid) if not ok]
+        print(f"Skipping {len(skipped)} games that failed validation: {skipped[:10]}")
+    return [row for row, ok in zip(zip(*(columns[column] for column in GAME_COLUMNS)), valid) if ok]
+
+def format_games_chunk(raw_games: List[Dict[str, Any]], strict: bool = STRICT_VALIDATION) -> FormattedGames:
+    """
+    Runs in the format pool workers: formats and validates a chunk of raw games
+    and sends back plain game and move tuples, only for the games that could be formatted.
     """
-    Formats and inserts downloaded games into the database efficiently.
+    parsed_games = []
+    for game_raw_data in raw_games:
+        game_for_db = create_game_dict(game_raw_data, decode_moves=False)
+        if not game_for_db or game_for_db == "NO PGN":
+            continue
+        parsed_games.append((game_raw_data['url'], game_for_db))
+
+    # the clocks of the whole chunk are decoded at once
+    games_clocks = decode_chunk_clocks([game['moves_data'].times for _, game in parsed_games])
+    games = []
+    moves_by_link = {}
+    for (game_url, game_for_db), clocks in zip(parsed_games, games_clocks):
+        raw_moves = game_for_db.pop('moves_data')
+        if clocks is None:
+            continue
+        try:
+            moves_data = create_moves_table(game_url, raw_moves.times, raw_moves.clean_moves,
+                                            raw_moves.n_moves, raw_moves.time_bonus, clocks)
+        except Exception:
+            # same as a game get_moves_data can't format
+            continue
+        try:
+            moves_by_link[game_for_db['link']] = format_one_game_moves(moves_data, strict)
+        except ValueError as e:
+            print(f"Skipping game {game_for_db['link']}: {e}")
+            continue
+        games.append(game_for_db)
 
-    Args:
-        games (dict): Dictionary of downloaded games, structured by year and month.
-                      E.g., { '2023': { '01': [game_obj1, game_obj2], ... }, ... }
-        player_name (str): The name of the player for whom games are being processed.
+    game_rows = validate_game_rows(games, strict)
+    link_index = GAME_COLUMNS.index('link')
+    move_rows = [move for game in game_rows for move in moves_by_link[game[link_index]]]
+    return FormattedGames(game_rows, move_rows)
 
-    Returns:
-        str: A message indicating the outcome of the operation.
+
+async def format_games_in_pool(raw_games: List[Dict[str, Any]],
+                               chunk_size: int = FORMAT_CHUNK_SIZE) -> FormattedGames:
     """
-    player_interface = DBInterface(Player)
-    start_overall = time.time()
-    
+    Splits raw games into chunks and formats them in the format pool
+    (or in a thread when the pool was not started).
+
+    Returns: FormattedGames for all the chunks, in input order.
+    """
+    loop = asyncio.get_running_loop()
+    chunk_futures = []
+    for i in range(0, len(raw_games), chunk_size):
+        chunk = [
+            {field: game[field] for field in RAW_GAME_FIELDS if field in game}
+            for game in raw_games[i:i + chunk_size]
+        ]
+        if format_pool is not None:
+            chunk_futures.append(loop.run_in_executor(format_pool, format_games_chunk, chunk))
+        else:
+            chunk_futures.append(asyncio.to_thread(format_games_chunk, chunk))
+    formatted_chunks = await asyncio.gather(*chunk_futures)
+    return FormattedGames(
+        [game for chunk in formatted_chunks for game in chunk.game_rows],
+        [move for chunk in formatted_chunks for move in chunk.move_rows]
+    )
+
 
-    # Step 1: Filter out games already in DB (I/O-bound)
-    start_filter = time.time()
-    games_to_process = await get_just_new_games(games)
-    if not games_to_process: # get_just_new_games returns False if no new games or error
-        print(f"No new games to process for {player_name}. All games already at DB or input was empty.")
-        return "All games already at DB"
-    print(f"Filtered {sum(len(m_games) for y_games in games_to_process.values() for m_games in y_games.values())} new games in: {time.time() - start_filter:.2f} seconds")
+# --- MAIN FORMAT AND INSERT FUNCTION ---
+
+async def insert_players_of_games(raw_games: List[Dict[str, Any]]) -> int:
+    """
+    Inserts a bare Player row (only player_name) for every white and black
+    player of the raw games that is not in the DB yet.
+    ON CONFLICT DO NOTHING keeps existing profiles untouched
+    (see check_player_in_db.insert_missing_players).
 
-    # Step 2: Collect all unique players from the new games and ensure they are in the Player table
+    Returns: the number of new players.
+    """
     start_get_unique_players = time.time()
     unique_player_names = set()
-    for year_games in games_to_process.values():
-        for month_games in year_games.values():
-            for game_raw_data in month_games:
-                if 'white' in game_raw_data and 'username' in game_raw_data['white']:
-                    unique_player_names.add(game_raw_data['white']['username'].lower())
-                if 'black' in game_raw_data and 'username' in game_raw_data['black']:
-                    unique_player_names.add(game_raw_data['black']['username'].lower())
+    for game_raw_data in raw_games:
+        if 'white' in game_raw_data and 'username' in game_raw_data['white']:
+            unique_player_names.add(game_raw_data['white']['username'].lower())
+        if 'black' in game_raw_data and 'username' in game_raw_data['black']:
+            unique_player_names.add(game_raw_data['black']['username'].lower())
     
     print('$$$$$$$$$$$$$$$$$$$$$$')
     print('time to check all players: ',(time.time()-start_get_unique_players))
     print('all players: ', len(unique_player_names))
     print('$$$$$$$$$$$$$$$$$$$$$$')
     
-    
     start_inserting_players = time.time()
-    print('$$$$$$$$$')
-    unique_player_names = await get_only_players_not_in_db(unique_player_names) #############  await get_only_players_not_in_db(unique_player_names)
-    # Concurrently ensure all unique players exist in the Player table with full profiles
-    # This calls players_ops.insert_player for each, which handles fetching/inserting.
-    player_insertion_tasks = [{"player_name": p_name} for p_name in unique_player_names]
-    await player_interface.create_all(player_insertion_tasks)
-    
-    print(f"{len(unique_player_names)} unique players inserted in DB in: {time.time() - start_inserting_players:.2f} seconds")
+    new_players = await insert_missing_players(unique_player_names)
+    print(f"{len(new_players)} new players inserted in DB in: {time.time() - start_inserting_players:.2f} seconds")
+    return len(new_players)
 
+async def skip_known_games(raw_games: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Drops the games known_links knows are in the DB already (a partial month
+    downloaded again is mostly the games ingested last time), so they are
+    neither formatted nor sent to the DB. Once known_links is a Bloom filter,
+    its positives are confirmed with one get_games_already_in_db query and the
+    confirmed ones dropped (the certainly new games never reach the DB).
+    Until known_links is warm every game is kept and the inserts' ON CONFLICT
+    skips the old ones, as before.
+
+    Returns: (games still to format and insert, number of games skipped)
+    """
+    game_links = []
+    for game in raw_games:
+        try:
+            game_links.append(int(game['url'].split('/')[-1]))
+        except (KeyError, AttributeError, ValueError):
+            game_links.append(None) # left to the formatter
+    known, to_verify = known_links.classify({link for link in game_links if link is not None})
+    if to_verify and known_links.ready:
+        confirmed = await get_games_already_in_db(tuple(to_verify))
+        known_links.counters["verified_known"] += len(confirmed)
+        known |= confirmed
+    if not known:
+        return raw_games, 0
+    new_games = [game for game, link in zip(raw_games, game_links) if link not in known]
+    return new_games, len(raw_games) - len(new_games)
+
+async def format_games(games, player_name):
+    """
+    Makes sure every player in the downloaded games is in the Player table
+    and formats the games for insertion.
+
+    Args:
+        games (dict): Dictionary of downloaded games, structured by year and month.
+                      E.g., { '2023': { '01': [game_obj1, game_obj2], ... }, ... }
+        player_name (str): The name of the player for whom games are being processed.
 
-    # Step 3: Format games and moves (CPU-bound, offload to executor)
+    Returns:
+        FormattedGames: game and move tuples (games that could not be formatted are left out).
+    """
+    if not games:
+        print(f"No games to process for {player_name}.")
+        return FormattedGames([], [])
+
+    # Step 1: make sure every player of the games is in the Player table.
+    # Games already in the DB are not filtered out here: the inserts are upserts.
+    raw_games = [
+        game_raw_data
+        for year in games.keys()
+        for month in games[year].keys()
+        for game_raw_data in games[year][month]
+    ]
+    await insert_players_of_games(raw_games)
+
+    # Step 2: Format games and moves (CPU-bound, chunks go to the format pool)
     start_format = time.time()
-    games_futures = []
-    for year in games_to_process.keys():
-        for month in games_to_process[year].keys():
-            # Create a list of futures for CPU-bound game formatting
-            for game_raw_data in games_to_process[year][month]:
-                # Offload create_game_dict to a separate thread
-                game_future = asyncio.to_thread(create_game_dict, game_raw_data)
-                games_futures.append(game_future)
-
-    # Await all game formatting futures concurrently
-    formatted_games_results = await asyncio.gather(*games_futures)
-    #formatted_games_results = [x for x in formatted_games_results]
-    print(f'Formatted {len(formatted_games_results)} games in {time.time()-start_format}')
-    return formatted_games_results
-
-async def insert_games_months_moves_and_players(formatted_games_results, player_name): # Added player_name as arg
-    games_list_for_db = []
-    moves_list_for_db = []
+    formatted_games = await format_games_in_pool(raw_games)
+    print(f'Formatted {len(formatted_games.game_rows)} of {len(raw_games)} games in {time.time()-start_format}')
+    return formatted_games
+
+async def insert_games_months_moves_and_players(formatted_games: FormattedGames,
+                                                player_name: str,
+                                                year: Optional[int] = None,
+                                                month: Optional[int] = None,
+                                                n_known_games: int = 0,
+                                                replace: bool = False):
+    """
+    Inserts formatted games and moves together with their Month rows, in one transaction.
+
+    With year and month (one downloaded archive month, as the ingestion pipeline does)
+    that month's row is the checkpoint: it is written even when no game of the
+    archive could be formatted, and it only exists once its games and moves are
+    committed, so an interrupted ingestion resumes at the first month without a row.
+    Its status (complete, empty or partial, see months.month_status) tells whether
+    it ever has to be downloaded again.
+    n_known_games (games of the archive already in the DB, see skip_known_games)
+    count in its n_games without being inserted again.
+    Without them, months are counted from the games' own dates.
+    replace rewrites the games already in the DB (a replay, see insert_new_data).
+    """
     # Collect month data based on successfully formatted games for this player
     # This ensures that 'n_games' accurately reflects only the games that were
     # successfully formatted and would be inserted.
     months_processed_count = {} # { (year, month): count }
-    start_formating_moves_and_game_for_insert = time.time()
-    for game_dict_result in formatted_games_results:
-        if game_dict_result and game_dict_result != "NO PGN" and game_dict_result != False: # Added check for 'False'
-            # Safely pop moves_data to prepare for GameCreateData
-            try:
-                moves_data = game_dict_result.pop('moves_data', None) # Use .pop with default
-            except: continue
-            
-            if moves_data: # Only proceed if moves_data was successfully extracted
-                # Offload format_one_game_moves to a separate thread
-                moves_formatted_future = asyncio.to_thread(format_one_game_moves, moves_data)
-                moves_list_for_db.extend(await moves_formatted_future)
-
-            # Ensure the game_dict_result can be parsed by GameCreateData
-            try:
-                games_list_for_db.append(GameCreateData(**game_dict_result).model_dump())
-                
-                # Update month counts for the current player
-                game_year = game_dict_result.get('year')
-                game_month = game_dict_result.get('month')
-                if game_year and game_month:
-                    key = (int(game_year), int(game_month))
-                    months_processed_count[key] = months_processed_count.get(key, 0) + 1
-
-            except Exception as e:
-                print(f"Error creating GameCreateData for formatted game {game_dict_result.get('link', 'N/A')}: {e}. Skipping game.")
-                continue
-    print(f'{len(games_list_for_db)} Games ready to insert')
-    print(f'{len(moves_list_for_db)} Moves ready to insert')
-    print(f'Time elapsed: {time.time()-start_formating_moves_and_game_for_insert}')
-    
+    if year is not None and month is not None:
+        # games are archived by the month they ended in, which is not always the month of their Date
+        months_processed_count[(year, month)] = len(formatted_games.game_rows) + n_known_games
+    else:
+        year_index = GAME_COLUMNS.index('year')
+        month_index = GAME_COLUMNS.index('month')
+        for game_row in formatted_games.game_rows:
+            key = (game_row[year_index], game_row[month_index])
+            months_processed_count[key] = months_processed_count.get(key, 0) + 1
+    print(f'{len(formatted_games.game_rows)} Games ready to insert')
+    print(f'{len(formatted_games.move_rows)} Moves ready to insert')
     
     # Create months_list_for_db from the collected counts
     months_list_for_db = []
-    for (year, month), n_games in months_processed_count.items():
+    for (game_year, game_month), n_games in months_processed_count.items():
         month_data = {
             "player_name": player_name,
-            "year": year,
-            "month": month,
-            "n_games": n_games
+            "year": game_year,
+            "month": game_month,
+            "n_games": n_games,
+            "status": month_status(game_year, game_month, n_games)
         }
         months_list_for_db.append(MonthCreateData(**month_data).model_dump())
 
-
-    print(f"Formatted {len(games_list_for_db)} games and {len(moves_list_for_db)} moves in: {time.time() - start_formating_moves_and_game_for_insert:.2f} seconds") # This print refers to 'start_format' from the calling func. Could be misleading.
-
-    # Step 4: Insert data into DB (I/O-bound, run concurrently)
-    if not games_list_for_db and not moves_list_for_db and not months_list_for_db:
+    # Step 4: Insert data into DB
+    if not formatted_games.game_rows and not months_list_for_db:
         print("No data to insert after formatting. Skipping database insertion.")
         return f"No new data to insert for {player_name}."
 
     start_insert = time.time() # This should be local to this function.
-    await insert_new_data(games_list_for_db, moves_list_for_db, months_list_for_db)
-    print(f'Inserted games, moves, and months for {len(games_list_for_db)} games in: {time.time()-start_insert:.2f} seconds') # Use local start_insert
-
-    end_overall = time.time() # This is a misnomer, it's just end_insert
-    print(f"Total time for processing this batch of formatted games: {(end_overall-start_insert):.2f} seconds") # More accurate description
+    await insert_new_data(formatted_games.game_rows, formatted_games.move_rows, months_list_for_db, replace=replace)
+    print(f'Inserted games, moves, and months for {len(formatted_games.game_rows)} games in: {time.time()-start_insert:.2f} seconds') # Use local start_insert
 
-    return f"Successfully processed and inserted {len(games_list_for_db)} games for {player_name}."
+    return f"Successfully processed and inserted {len(formatted_games.game_rows)} games for {player_name}."
     
 # async def get_only_players_not_in_db(player_names: Set[str]) -> Set[str]:
 #     """
@@ -497,67 +890,3 @@ async def insert_games_months_moves_and_players(formatted_games_results, player_
 #     # Return the set of players that were in the input but NOT found in the database
 #     players_not_in_db = player_names - players_found_in_db
 #     return list(players_not_in_db)
-
-async def get_just_new_games(games: Dict[str, Dict[str, List[Dict[str, Any]]]]) -> Union[Dict[str, Dict[str, List[Dict[str, Any]]]], bool]:
-    """
-    Asynchronously checks the available games and returns only those not already in the DB.
-
-    Args:
-        games (dict): Dictionary of downloaded games, structured by year and month.
-
-    Returns:
-        Union[Dict[str, Dict[str, List[Dict[str, Any]]]], bool]: A dictionary of new games
-        structured by year and month, or False if no new games are found or an error occurs.
-    """
-    links_to_check = set()
-    
-    for year_data in games.values():
-        for month_data in year_data.values():
-            for game in month_data:
-                try:
-                    if game['url']:
-                        game_link_str = game['url'].split('/')[-1]
-                        links_to_check.add(int(game_link_str))
-                    else:
-                        print(f"Warning: {year_data}_{month_data}: {game.get('url', 'N/A')}")
-                except Exception as e:
-                    print(f"Error processing game for link extraction: {e}, game data: {game}")
-                    continue
-
-    if not links_to_check:
-        print("No valid game links found to check against the database.")
-        return False
-
-    # Asynchronously get games already in the database
-    in_db_game_links = await get_games_already_in_db(tuple(links_to_check)) # AWAIT HERE
-
-    to_insert_game_links = links_to_check - in_db_game_links
-
-    if not to_insert_game_links:
-        print("All available games are already in the database.")
-        return False
-
-    # Reconstruct the nested dictionary with only the new games
-    new_games_structured: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
-    total_new_games_count = 0
-
-    for year, month_data in games.items():
-        for month, games_in_month in month_data.items():
-            filtered_games_in_month = []
-            for game in games_in_month:
-                if 'url' in game and game['url'] and int(game['url'].split('/')[-1]) in to_insert_game_links:
-                    filtered_games_in_month.append(game)
-                    total_new_games_count += 1
-            
-            if filtered_games_in_month:
-                if year not in new_games_structured:
-                    new_games_structured[year] = {}
-                new_games_structured[year][month] = filtered_games_in_month
-
-    if total_new_games_count == 0:
-        print("After filtering, no new games remain. Is this a blessing or a curse?")
-        return False
-
-    return new_games_structured
-
-
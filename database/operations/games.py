@@ -1,12 +1,16 @@
 #OPERATIONS
 
-from .available_months import just_new_months
-from .format_games import format_games, insert_games_months_moves_and_players
+from .available_months import plan_new_months
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
-from .chess_com_api import download_months
-from .months import get_most_recent_month, generate_months_from_date_to_now
-from database.database.ask_db import open_request
+from .pipeline import ingest_months
+from .months import get_most_recent_month, generate_months_from_date_to_now, is_finished_month
+from database.database.ask_db import open_request, get_principal_players
+from database.database.db_interface import DBInterface
+from database.database.models import Player
+from .download_scheduler import FairDownloadScheduler
+from constants import SWEEP_WORKERS, SWEEP_ACTIVE_PLAYERS
+import asyncio
 import time
 
 async def read_game(data):
@@ -22,56 +26,94 @@ async def create_games(data: dict) -> str:
     player_name = data['player_name'].lower()
     start_create_games = time.time()
     start_new_months = time.time()
-    new_months = await just_new_months(player_name)
-    if new_months is False:
+    plan = await plan_new_months(player_name)
+    if "error" in plan:
+        return plan["error"]
+    new_months = plan["new_months"]
+    skipped_months = plan["skipped_months"]
+    if not new_months:
         print('#####')
         print("MONTHS found: 0", 'time elapsed: ',time.time()-start_new_months)
         return 'ALL MONTHS IN DB ALREADY'
     else:
         print('#####')
-        print(f"MONTHS found: {len(new_months)}", 'time elapsed: ',time.time()-start_new_months)
-    print('... Starting DOWNLOAD ...')
-    downloaded_games_by_month = await download_months(player_name, new_months)    
-    num_downloaded_games = sum(len(v) for y in downloaded_games_by_month.values()
-                               for v in y.values()) if downloaded_games_by_month else 0
-    
-    print(f"Processed {len(new_months)} months. Downloaded games: {num_downloaded_games}")
-    print('#####')
-    print('#####')
-    print('Start the formating of the games')
-    start_format = time.time()
-    # THIS IS THE NEXT PART OF THE PROCESS
-    formatted_games_results = await format_games(downloaded_games_by_month, player_name)
-    print(f'FORMAT of {len(formatted_games_results)} games in: {time.time()-start_format}')
-    await insert_games_months_moves_and_players(formatted_games_results, player_name)
+        print(f"MONTHS found: {len(new_months)}, skipped on resume: {skipped_months}", 'time elapsed: ',time.time()-start_new_months)
+    print('... Starting DOWNLOAD, FORMAT and INSERT ...')
+    summary = await ingest_months(player_name, new_months)
+    print(f"Processed {len(new_months)} months. Inserted games: {summary['games']}")
     end_create_games = time.time()
     print('Format done in: ',(end_create_games-start_create_games)/60)
-    return f"DATA READY FOR {player_name}"
+    if summary["failed_months"]:
+        return (f"DATA READY FOR {player_name} ({skipped_months} months skipped on resume), "
+                f"FAILED MONTHS (retried on the next call): {sorted(summary['failed_months'])}")
+    return f"DATA READY FOR {player_name} ({skipped_months} months skipped on resume)"
 
-async def update_player_games(player_name):
+async def update_player_games(player_name, scheduler=None):
     start_create_games = time.time()
     current_months = await open_request("""
                 select * from months where player_name = :player_name     
                 """,params = {"player_name":player_name}, fetch_as_dict=True)
     
+    # finished months are never downloaded again, partial ones are refreshed
+    finished_months = {
+        f"{m['year']}-{m['month']}" for m in current_months if is_finished_month(m.get('status'))
+    }
+    partial_months = [
+        f"{m['year']}-{m['month']}" for m in current_months if not is_finished_month(m.get('status'))
+    ]
     most_recent_month = get_most_recent_month(current_months)
-    new_months_for_update = generate_months_from_date_to_now(most_recent_month)
-    downloaded_games_by_month = await download_months(player_name, new_months_for_update)
-    
-    num_downloaded_games = sum(len(v) for y in downloaded_games_by_month.values()
-                               for v in y.values()) if downloaded_games_by_month else 0
-    
-    print(f"Processed {len(new_months_for_update)} months. Downloaded games: {num_downloaded_games}")
-    print('#####')
-    print('#####')
-    print('Start the formating of the games')
-    
-    start_format = time.time()
-    # THIS IS THE NEXT PART OF THE PROCESS
-    formatted_games_results = await format_games(downloaded_games_by_month, player_name)
-    print(f'FORMAT of {len(formatted_games_results)} games in: {time.time()-start_format}')
-    await insert_games_months_moves_and_players(formatted_games_results, player_name)
+    new_months_for_update = [
+        month_str for month_str in generate_months_from_date_to_now(most_recent_month)
+        if month_str not in finished_months
+    ]
+    new_months_for_update += [m for m in partial_months if m not in new_months_for_update]
+    summary = await ingest_months(player_name, new_months_for_update, scheduler=scheduler)
+    print(f"Processed {len(new_months_for_update)} months. Inserted games: {summary['games']}")
     end_create_games = time.time()
     print('Format done in: ',(end_create_games-start_create_games)/60)
+    if summary["failed_months"]:
+        return f"DATA READY FOR {player_name}, FAILED MONTHS: {sorted(summary['failed_months'])}"
     return f"DATA READY FOR {player_name}"
-    
\ No newline at end of file
+
+async def replay_player_games(player_name: str) -> str:
+    """
+    Formats and inserts again every month of the player saved in the raw archive store,
+    without asking chess.com (after a schema change or a formatter fix). Games
+    already in the DB are rewritten with the new formatting, moves included.
+    """
+    start_replay = time.time()
+    # the months' rows need the player, which may not be in a fresh DB
+    await DBInterface(Player).upsert_all([{"player_name": player_name}], ['player_name'])
+    summary = await ingest_months(player_name, None, replay=True)
+    print('Replay done in: ',(time.time()-start_replay)/60)
+    if summary["failed_months"]:
+        return f"REPLAYED {summary['months']} MONTHS FOR {player_name}, UNREADABLE: {sorted(summary['failed_months'])}"
+    return f"REPLAYED {summary['months']} MONTHS FOR {player_name}"
+
+async def update_all_players_games(workers: int = SWEEP_WORKERS,
+                                   active_players: int = SWEEP_ACTIVE_PLAYERS) -> str:
+    """
+    Updates every principal player. Up to active_players players are ingested at
+    the same time and their month requests are interleaved by one
+    FairDownloadScheduler, so the sweep takes as long as its requests (under the
+    shared rate limiter) instead of the sum of every player's update.
+    """
+    start_sweep = time.time()
+    players = await get_principal_players()
+    slots = asyncio.Semaphore(active_players)
+    failed_players = []
+
+    async def update_one(player_name):
+        async with slots:
+            try:
+                await update_player_games(player_name, scheduler=scheduler)
+            except Exception as e:
+                print(f"Update of {player_name} failed: {e}")
+                failed_players.append(player_name)
+
+    async with FairDownloadScheduler(workers=workers) as scheduler:
+        await asyncio.gather(*(update_one(player_name) for player_name in players))
+        print(f"Sweep of {len(players)} players done in {(time.time()-start_sweep)/60:.2f} minutes: {scheduler.stats()}")
+    if failed_players:
+        return f"{len(players) - len(failed_players)} PLAYERS UPDATED, FAILED: {sorted(failed_players)}"
+    return "EVERY PLAYER UPDATED"
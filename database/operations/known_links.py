@@ -0,0 +1,292 @@
+# database/operations/known_links.py
+
+import asyncio
+import math
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from constants import (KNOWN_LINKS_ENABLED, KNOWN_LINKS_MAX_BYTES, KNOWN_LINKS_BLOOM_FP_RATE,
+                       KNOWN_LINKS_BLOOM, KNOWN_LINKS_MERGE_SIZE)
+from database.database.ask_db import open_request
+from database.database.engine import AsyncDBSession
+
+# rows per fetch while warming
+WARM_BATCH_SIZE = 1_000_000
+
+EXACT = "exact"
+BLOOM = "bloom"
+
+
+def splitmix64(x: np.ndarray) -> np.ndarray:
+    """Mixes uint64 values into well spread hashes (the links themselves are nearly consecutive)."""
+    with np.errstate(over='ignore'):
+        x = (x + np.uint64(0x9E3779B97F4A7C15))
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+class LinkBloomFilter:
+    """
+    Bloom filter over game links on a numpy bit array: no false negatives,
+    false positives at about the rate it was sized for, whatever the number of links.
+    """
+
+    def __init__(self, n_bits: int, n_hashes: int):
+        self.n_bits = max(64, n_bits)
+        self.n_hashes = max(1, n_hashes)
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float, max_bytes: int) -> "LinkBloomFilter":
+        capacity = max(1, capacity)
+        n_bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        n_bits = min(n_bits, max_bytes * 8)
+        return cls(n_bits, round(n_bits / capacity * math.log(2)))
+
+    def positions(self, links: np.ndarray):
+        h1 = splitmix64(links.astype(np.uint64))
+        h2 = splitmix64(h1) | np.uint64(1)
+        n_bits = np.uint64(self.n_bits)
+        with np.errstate(over='ignore'):
+            for i in range(self.n_hashes):
+                yield (h1 + np.uint64(i) * h2) % n_bits
+
+    def add(self, links: np.ndarray):
+        for position in self.positions(links):
+            np.bitwise_or.at(self.bits, position >> np.uint64(3),
+                             np.left_shift(1, position & np.uint64(7)).astype(np.uint8))
+        self.count += len(links)
+
+    def contains(self, links: np.ndarray) -> np.ndarray:
+        found = np.ones(len(links), dtype=bool)
+        for position in self.positions(links):
+            found &= ((self.bits[position >> np.uint64(3)] >> (position & np.uint64(7)).astype(np.uint8)) & 1).astype(bool)
+        return found
+
+    def false_positive_rate(self) -> float:
+        return (1 - math.exp(-self.n_hashes * self.count / self.n_bits)) ** self.n_hashes
+
+
+class KnownLinks:
+    """
+    The game links already in the DB, in memory, so most "is this game new?"
+    lookups don't reach Postgres.
+
+    Links live in a sorted int64 array (8 bytes a link) searched with
+    np.searchsorted; links inserted since the last merge wait in a set and are
+    merged every merge_size. If the array would pass max_bytes (about 67M links
+    with the default 512MB), it is replaced by a Bloom filter of at most
+    max_bytes: a link it doesn't know is certainly new, one it knows has to be
+    confirmed by the DB (classify's to_verify). KNOWN_LINKS_BLOOM also puts a
+    Bloom filter in front of the exact array.
+
+    Deleting games behind its back (benchmarks) leaves it believing they exist
+    until the next restart.
+    """
+
+    def __init__(self,
+                 enabled: bool = KNOWN_LINKS_ENABLED,
+                 max_bytes: int = KNOWN_LINKS_MAX_BYTES,
+                 fp_rate: float = KNOWN_LINKS_BLOOM_FP_RATE,
+                 first_level_bloom: bool = KNOWN_LINKS_BLOOM,
+                 merge_size: int = KNOWN_LINKS_MERGE_SIZE):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.fp_rate = fp_rate
+        self.first_level_bloom = first_level_bloom
+        self.merge_size = merge_size
+        self.mode = EXACT
+        self.links = np.empty(0, dtype=np.int64) # sorted
+        self.pending = set()
+        self.merging = set()
+        self.bloom: Optional[LinkBloomFilter] = None
+        self.ready = False
+        self.warm_seconds = None
+        self.counters = Counter()
+
+    @staticmethod
+    def to_array(links: Iterable[int]) -> np.ndarray:
+        links = list(links)
+        return np.fromiter(links, dtype=np.int64, count=len(links))
+
+    def sorted_contains(self, links: np.ndarray) -> np.ndarray:
+        if not len(self.links):
+            return np.zeros(len(links), dtype=bool)
+        index = np.searchsorted(self.links, links)
+        index[index == len(self.links)] = 0
+        return self.links[index] == links
+
+    def classify(self, links: Set[int]) -> Tuple[Set[int], Set[int]]:
+        """
+        Splits links in the ones certainly in the DB and the ones that have to be
+        asked to the DB (all of them until the index is warm, the Bloom filter's
+        positives once it's a Bloom filter). The rest are certainly new.
+
+        Returns: (known, to_verify)
+        """
+        self.counters["lookups"] += len(links)
+        if not self.ready:
+            self.counters["to_verify"] += len(links)
+            return set(), set(links)
+        candidates = self.to_array(links)
+        if self.bloom is not None:
+            candidates = candidates[self.bloom.contains(candidates)]
+        if self.mode == BLOOM:
+            to_verify = set(candidates.tolist())
+            self.counters["to_verify"] += len(to_verify)
+            return set(), to_verify
+        known = set(candidates[self.sorted_contains(candidates)].tolist())
+        known |= links & self.pending
+        known |= links & self.merging
+        self.counters["known"] += len(known)
+        return known, set()
+
+    async def add(self, links: Iterable[int]):
+        """
+        Records links just committed to the DB.
+        """
+        if not self.enabled:
+            return
+        links = set(links)
+        if not links:
+            return
+        if self.mode == BLOOM:
+            self.bloom.add(self.to_array(links))
+            return
+        if self.bloom is not None:
+            self.bloom.add(self.to_array(links))
+        self.pending |= links
+        if self.ready and len(self.pending) >= self.merge_size and not self.merging:
+            await self.merge()
+
+    async def merge(self):
+        self.merging, self.pending = self.pending, set()
+        try:
+            merged = await asyncio.to_thread(np.union1d, self.links, self.to_array(self.merging))
+            if self.exact_bytes(len(merged)) > self.max_bytes:
+                await self.switch_to_bloom(merged, 2 * len(merged))
+            else:
+                self.links = merged
+        finally:
+            self.merging = set()
+
+    def exact_bytes(self, n_links: int) -> int:
+        return n_links * 8 + (self.bloom.bits.nbytes if self.bloom is not None else 0)
+
+    async def switch_to_bloom(self, links: np.ndarray, capacity: int):
+        bloom = LinkBloomFilter.for_capacity(capacity, self.fp_rate, self.max_bytes)
+        await asyncio.to_thread(bloom.add, links)
+        bloom.add(self.to_array(self.pending)) # merging is already part of links
+        self.bloom = bloom
+        self.mode = BLOOM
+        self.links = np.empty(0, dtype=np.int64)
+        self.pending = set()
+        print(f"Known links: {len(links)} links pass {self.max_bytes} bytes, "
+              f"switched to a Bloom filter of {bloom.bits.nbytes} bytes.")
+
+    async def warm(self):
+        """
+        Loads every game.link, streamed WARM_BATCH_SIZE rows at a time.
+        Links added meanwhile wait in pending, lookups go to the DB until it's done.
+        """
+        start_warm = time.time()
+        estimate = await open_request("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = 'game'")
+        estimate = estimate[0][0] if estimate else 0
+        if self.exact_bytes(estimate) > self.max_bytes:
+            await self.switch_to_bloom(np.empty(0, dtype=np.int64), 2 * estimate)
+
+        chunks = []
+        n_links = 0
+        async with AsyncDBSession() as session:
+            result = await session.stream(text("SELECT link FROM game"))
+            async for partition in result.partitions(WARM_BATCH_SIZE):
+                chunk = self.to_array(row[0] for row in partition)
+                if self.mode == BLOOM:
+                    await asyncio.to_thread(self.bloom.add, chunk)
+                    continue
+                chunks.append(chunk)
+                n_links += len(chunk)
+                if self.exact_bytes(n_links) > self.max_bytes:
+                    await self.switch_to_bloom(np.concatenate(chunks), 2 * max(n_links, estimate))
+                    chunks = []
+
+        if self.mode == EXACT:
+            self.links = await asyncio.to_thread(
+                lambda: np.union1d(np.concatenate(chunks), self.links) if chunks else self.links
+            )
+            spare_bytes = self.max_bytes - self.exact_bytes(len(self.links))
+            if self.first_level_bloom and spare_bytes > 0:
+                bloom = LinkBloomFilter.for_capacity(2 * len(self.links), self.fp_rate, spare_bytes)
+                await asyncio.to_thread(bloom.add, self.links)
+                bloom.add(self.to_array(self.pending))
+                self.bloom = bloom
+        self.ready = True
+        self.warm_seconds = round(time.time() - start_warm, 2)
+        print(f"Known links warmed in {self.warm_seconds} seconds: {self.stats()}")
+
+    def memory_bytes(self) -> int:
+        pending_bytes = sys.getsizeof(self.pending) + sys.getsizeof(self.merging)
+        pending_bytes += 32 * (len(self.pending) + len(self.merging)) # the int objects
+        bloom_bytes = self.bloom.bits.nbytes if self.bloom is not None else 0
+        return self.links.nbytes + bloom_bytes + pending_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "mode": self.mode,
+            "links": len(self.links) + len(self.pending) + len(self.merging) if self.mode == EXACT else self.bloom.count,
+            "pending": len(self.pending),
+            "memory_bytes": self.memory_bytes(),
+            "max_bytes": self.max_bytes,
+            "warm_seconds": self.warm_seconds,
+            **self.counters,
+        }
+        if self.bloom is not None:
+            stats["bloom"] = {
+                "bytes": self.bloom.bits.nbytes,
+                "hashes": self.bloom.n_hashes,
+                "false_positive_rate": round(self.bloom.false_positive_rate(), 6),
+            }
+        return stats
+
+
+# one instance for the process, like archive_validators
+known_links = KnownLinks()
+warm_task: Optional[asyncio.Task] = None
+
+
+def start_known_links():
+    """
+    Warms known_links in the background (main.py's lifespan), the server doesn't wait for it.
+    """
+    global warm_task
+    if not known_links.enabled:
+        print("Known links disabled (KNOWN_LINKS_ENABLED).")
+        return
+
+    async def warm():
+        try:
+            await known_links.warm()
+        except Exception as e:
+            # lookups keep going to the DB, and links stop piling up in pending
+            print(f"Known links could not be warmed: {e}")
+            known_links.enabled = False
+            known_links.pending = set()
+
+    warm_task = asyncio.create_task(warm())
+
+
+async def stop_known_links():
+    global warm_task
+    if warm_task is not None:
+        warm_task.cancel()
+        await asyncio.gather(warm_task, return_exceptions=True)
+        warm_task = None
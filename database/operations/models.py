@@ -17,6 +17,7 @@ class PlayerCreateData(BaseModel):
     twitch_url: Optional[str] = None
     verified: Optional[bool] = False
     league: Optional[str] = None
+    profile_fetched_at: Optional[int] = None
 
 class PlayerResult(BaseModel):
     player_name: str
@@ -51,14 +52,21 @@ class MoveCreateData(BaseModel):
     black_reaction_time:float
     white_time_left:float
     black_time_left:float
+
+# Column order of the plain tuples sent to bulk inserts.
+GAME_COLUMNS = tuple(GameCreateData.model_fields)
+MOVE_COLUMNS = tuple(MoveCreateData.model_fields)
+
 class MonthCreateData(BaseModel):
     player_name: str
     year: int
     month: int
     n_games: int
+    status: Optional[str] = None
 class MonthResult(BaseModel):
     id: int
     player_name: str
     year: int
     month: int
-    n_games: int
\ No newline at end of file
+    n_games: int
+    status: Optional[str] = None
\ No newline at end of file
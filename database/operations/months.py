@@ -10,6 +10,33 @@ from sqlalchemy import select
 from typing import List, Optional
 
 pipi = 'lksajdfhl'
+
+# What a Month row says about its archive.
+MONTH_COMPLETE = "complete" # fetched after the month ended, with games
+MONTH_EMPTY = "empty"       # fetched after the month ended, no games (or 404)
+MONTH_PARTIAL = "partial"   # fetched while the month was still running
+FINISHED_MONTH_STATUSES = (MONTH_COMPLETE, MONTH_EMPTY)
+
+
+def month_status(year: int, month: int, n_games: int, today: Optional[datetime.date] = None) -> str:
+    """
+    Status of a month archive fetched today.
+
+    Returns: MONTH_PARTIAL for the current (or a future) month, otherwise
+             MONTH_COMPLETE or MONTH_EMPTY depending on n_games.
+    """
+    today = today or datetime.date.today()
+    if (year, month) >= (today.year, today.month):
+        return MONTH_PARTIAL
+    return MONTH_COMPLETE if n_games else MONTH_EMPTY
+
+
+def is_finished_month(status: Optional[str]) -> bool:
+    """
+    A finished month is never downloaded again, only partial ones are refreshed.
+    """
+    return status in FINISHED_MONTH_STATUSES
+
 def get_most_recent_month(db_months:list):
 
     most_recent_entry = None
@@ -0,0 +1,128 @@
+# database/operations/pipeline.py
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from constants import PIPELINE_QUEUE_SIZE, PIPELINE_FORMAT_MONTHS
+from database.operations.chess_com_api import stream_months, replay_months, archive_validators, NOT_MODIFIED
+from database.operations.format_games import (
+    FormattedGames, format_games_in_pool, insert_players_of_games, insert_games_months_moves_and_players,
+    skip_known_games
+)
+
+# Marks the end of a stage's output.
+END_OF_STREAM = None
+
+
+async def ingest_months(player_name: str,
+                        months: Optional[List[str]],
+                        queue_size: int = PIPELINE_QUEUE_SIZE,
+                        replay: bool = False,
+                        scheduler=None,
+                        format_months: int = PIPELINE_FORMAT_MONTHS) -> Dict[str, int]:
+    """
+    Downloads, formats and inserts a player's months as a pipeline: every month
+    flows through the three stages on its own and is committed as soon as it is
+    formatted. The stages are connected by bounded queues, so a slow stage makes
+    the ones before it wait (backpressure) and memory holds at most a few months,
+    whatever the size of the account.
+
+        download (stream_months) -> [queue] -> format (format pool) -> [queue] -> insert
+
+    Up to format_months months are formatted at the same time (a month is
+    rarely more than one chunk, one month alone keeps one pool worker busy),
+    and they are still inserted in the order they were downloaded.
+
+    Args:
+        player_name (str): chess.com player's username, lowercase.
+        months (List[str]): 'YYYY-MM' strings to ingest (with replay, None means every stored month).
+        queue_size (int): months allowed to wait between download and format.
+        replay (bool): read the months from the raw archive store instead of chess.com,
+            and rewrite their games and moves even when they are in the DB already.
+        scheduler (FairDownloadScheduler): download through the shared workers of a
+            multi-player sweep instead of this player's own (stream_months).
+        format_months (int): months being formatted, or formatted and waiting to be inserted.
+
+    Returns: counts of months, games and moves ingested (known_games: games of the
+             archives skipped because they were in the DB already), and the 'YYYY-MM' months
+             that could not be downloaded (failed_months): they are not committed
+             and are downloaded again by the next run.
+    """
+    downloaded_months = asyncio.Queue(maxsize=queue_size)
+    # bounded by format_slots: a slot is taken before a month is formatted and freed once it is inserted
+    formatted_months = asyncio.Queue()
+    format_slots = asyncio.Semaphore(max(1, format_months))
+    summary = {"months": 0, "empty_months": 0, "not_modified_months": 0, "failed_months": [], "games": 0, "known_games": 0, "moves": 0}
+    start = time.time()
+
+    async def download_stage():
+        if replay:
+            source = replay_months(player_name, months)
+        elif scheduler is not None:
+            source = scheduler.stream(player_name, months)
+        else:
+            source = stream_months(player_name, months)
+        async for year, month, games in source:
+            if games is None:
+                # no row for this month, so the next run downloads it again
+                summary["failed_months"].append(f"{year}-{month:02d}")
+                continue
+            if games is NOT_MODIFIED:
+                # same archive as the one already committed, nothing to parse, format or insert
+                summary["not_modified_months"] += 1
+                continue
+            if not games:
+                summary["empty_months"] += 1
+            await downloaded_months.put((year, month, games))
+        await downloaded_months.put(END_OF_STREAM)
+
+    async def format_month(games):
+        if replay:
+            # every game is formatted again and overwrites its rows (insert_new_data's replace)
+            new_games, n_known_games = games, 0
+        else:
+            # games already in the DB (known_links) still count in the month's n_games
+            new_games, n_known_games = await skip_known_games(games)
+        if not new_games:
+            # still committed, an empty (or already ingested) month is a finished month
+            return FormattedGames([], []), n_known_games
+        await insert_players_of_games(new_games)
+        return await format_games_in_pool(new_games), n_known_games
+
+    async def format_stage():
+        while (item := await downloaded_months.get()) is not END_OF_STREAM:
+            year, month, games = item
+            await format_slots.acquire()
+            # the month formats in the background, the insert stage awaits it in download order
+            await formatted_months.put((year, month, stages.create_task(format_month(games))))
+        await formatted_months.put(END_OF_STREAM)
+
+    async def insert_stage():
+        while (item := await formatted_months.get()) is not END_OF_STREAM:
+            year, month, formatting = item
+            try:
+                formatted_games, n_known_games = await formatting
+                # games, moves and the month's checkpoint row commit together
+                await insert_games_months_moves_and_players(formatted_games, player_name, year, month,
+                                                            n_known_games, replace=replay)
+            finally:
+                format_slots.release()
+            archive_validators.commit(player_name, year, month)
+            summary["months"] += 1
+            summary["known_games"] += n_known_games
+            summary["games"] += len(formatted_games.game_rows)
+            summary["moves"] += len(formatted_games.move_rows)
+            print(f"{player_name} {year}-{month:02d} committed: {len(formatted_games.game_rows)} games "
+                  f"({summary['months']} months so far, {time.time() - start:.2f} seconds)")
+
+    # a failing stage cancels the other two instead of leaving them waiting on a queue
+    async with asyncio.TaskGroup() as stages:
+        stages.create_task(download_stage())
+        stages.create_task(format_stage())
+        stages.create_task(insert_stage())
+
+    print(f"Ingested {summary['months']} months, {summary['games']} games for {player_name} in {time.time() - start:.2f} seconds.")
+    if summary["failed_months"]:
+        print(f"Failed to download {len(summary['failed_months'])} months for {player_name}: {sorted(summary['failed_months'])}")
+    return summary
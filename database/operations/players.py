@@ -1,31 +1,84 @@
 # database/operations/players.py
 from fastapi.encoders import jsonable_encoder
-from typing import Optional, Union, Dict, Any, Tuple
-from sqlalchemy.exc import IntegrityError
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from typing import Optional, Union, Dict, Any, Tuple, List, Set
+from sqlalchemy import String, BigInteger, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
 from database.database.db_interface import DBInterface
 from database.database.models import Player
 from database.operations.models import PlayerCreateData 
-from database.operations.chess_com_api import get_profile
+from database.operations.chess_com_api import get_profile, PROFILE_GONE
 from database.database.ask_db import open_request
+from constants import (PROFILE_ENRICH_LIMIT, PROFILE_MAX_AGE_DAYS, PROFILE_BATCH_SIZE,
+                       PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL, PROFILE_RETRY_SECONDS)
 
 
-async def get_current_players_with_games_in_db():
-    current_players = await open_request("""SELECT player_name 
-                        FROM player
-                        WHERE player.name IS NOT NULL""")
-    current_players = [x[0] for x in current_players]
-    final_result = {}
-    for player in current_players:
-        params = {"player_name": player}
-        sql_query = """SELECT COUNT(link)
-                    FROM game
-                    WHERE white = :player_name
-                    OR black = :player_name;"""
-        result = await open_request(sql_query, params)
-        final_result[player] = result[0][0]
-    sorted_desc = sorted(final_result.items(), key=lambda item: item[1], reverse=True)
-    sorted_desc = {x[0]:x[1] for x in sorted_desc}
-    return sorted_desc
+# /current_players, computed once and dropped by invalidate_current_players
+current_players_cache: Optional[Dict[str, int]] = None
+# bumped by every invalidation, a query that started before one isn't cached
+current_players_generation = 0
+
+ADD_GAME_COUNTS_SQL = text("""
+    INSERT INTO player_game_counts (player_name, n_games)
+    SELECT * FROM unnest(:player_names, :n_games)
+    ON CONFLICT (player_name) DO UPDATE
+        SET n_games = player_game_counts.n_games + EXCLUDED.n_games
+""").bindparams(bindparam("player_names", type_=ARRAY(String)),
+                bindparam("n_games", type_=ARRAY(BigInteger)))
+
+async def get_current_players_with_games_in_db() -> Dict[str, int]:
+    """
+    Every ingested player (the ones with months in the DB) with their number of
+    games, most games first. One query on player_game_counts, cached until
+    ingestion touches one of these players.
+    """
+    global current_players_cache
+    if current_players_cache is not None:
+        return current_players_cache
+    generation = current_players_generation
+    rows = await open_request("""
+        SELECT ingested.player_name, COALESCE(counts.n_games, 0) AS n_games
+        FROM (SELECT DISTINCT player_name FROM months) ingested
+        LEFT JOIN player_game_counts counts ON counts.player_name = ingested.player_name
+        ORDER BY n_games DESC, ingested.player_name
+    """)
+    current_players = {player_name: n_games for player_name, n_games in rows}
+    if generation == current_players_generation:
+        current_players_cache = current_players
+    return current_players
+
+def invalidate_current_players(game_players: Set[str], ingested_players: Set[str]):
+    """
+    Drops the /current_players cache when new games belong to a player in it,
+    or a player not in it got months (a newly ingested player).
+    With no cache, a query may be running: its result is not cached.
+    """
+    global current_players_cache, current_players_generation
+    if current_players_cache is None:
+        current_players_generation += 1
+        return
+    if any(player in current_players_cache for player in game_players) or \
+       any(player not in current_players_cache for player in ingested_players):
+        current_players_cache = None
+        current_players_generation += 1
+
+async def add_game_counts(n_games: Counter, session: AsyncSession):
+    """
+    Adds the games just inserted to player_game_counts, in the transaction that
+    inserts them. Players are sorted so concurrent ingestions lock their rows in
+    the same order.
+    """
+    if not n_games:
+        return
+    player_names = sorted(n_games)
+    await session.execute(ADD_GAME_COUNTS_SQL, {
+        "player_names": player_names,
+        "n_games": [n_games[player_name] for player_name in player_names],
+    })
+
 async def read_player(player_name: str) -> Optional[Dict[str, Any]]:
     """
     Reads a player's profile from the database by player_name.
@@ -44,11 +97,58 @@ async def read_player(player_name: str) -> Optional[Dict[str, Any]]:
         print(f"Player {player_name_lower} not found in DB.")
         return None
 
+# every profile column, the upserts of a fetched profile overwrite all of them
+PROFILE_COLUMNS = [column for column in PlayerCreateData.model_fields if column != 'player_name']
+
+
+class ProfileCache:
+    """
+    In-process LRU of player profiles. A profile is fresh for ttl seconds after
+    its profile_fetched_at; the column keeps that clock in the DB, so a restarted
+    server trusts the stored profiles instead of asking chess.com again.
+    """
+
+    def __init__(self, max_size: int = PROFILE_CACHE_SIZE, ttl: float = PROFILE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.profiles = OrderedDict()
+        self.counters = Counter()
+
+    def is_fresh(self, profile: PlayerCreateData) -> bool:
+        fetched_at = profile.profile_fetched_at
+        return fetched_at is not None and time.time() - fetched_at < self.ttl
+
+    def get(self, player_name: str) -> Optional[PlayerCreateData]:
+        profile = self.profiles.get(player_name)
+        if profile is None:
+            self.counters["misses"] += 1
+            return None
+        if not self.is_fresh(profile):
+            del self.profiles[player_name]
+            self.counters["expired"] += 1
+            return None
+        self.profiles.move_to_end(player_name)
+        self.counters["hits"] += 1
+        return profile
+
+    def put(self, profile: PlayerCreateData):
+        self.profiles[profile.player_name] = profile
+        self.profiles.move_to_end(profile.player_name)
+        while len(self.profiles) > self.max_size:
+            self.profiles.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self.profiles), "ttl": self.ttl, **self.counters}
+
+
+# one instance for the process, like archive_validators
+profile_cache = ProfileCache()
+
 async def insert_player(data: dict) -> Optional[PlayerCreateData]:
     """
-    Inserts a new player into the database or updates an existing one if a unique
-    constraint violation occurs during insertion (i.e., the player already exists).
-    It always attempts to update with the latest profile data fetched from Chess.com.
+    Fetches a player's profile from Chess.com and upserts it (one
+    INSERT ... ON CONFLICT DO UPDATE, new and existing players alike).
+    The fresh profile goes into profile_cache.
 
     Args:
         data (dict): A dictionary containing 'player_name' to process.
@@ -60,29 +160,113 @@ async def insert_player(data: dict) -> Optional[PlayerCreateData]:
     player_name_lower = data['player_name'].lower()
     player_interface = DBInterface(Player)
 
-    fetched_profile: Optional[PlayerCreateData] = await get_profile(player_name_lower)
+    fetched_profile = await get_profile(player_name_lower)
 
     if fetched_profile is None:
-        print('player_name_lower has to be incorrect, the profile from chess.com came back as None')
+        print(f'{player_name_lower} has to be incorrect, the profile from chess.com came back as None')
         return None
 
-    fetched_profile_dict = fetched_profile
-
     try:
-        print(f"Attempting to insert new player profile for: {player_name_lower}")
-        created_player_orm = await player_interface.create(fetched_profile_dict)
-        print(f'NEW player {player_name_lower} inserted')
-        return PlayerCreateData(**player_interface.to_dict(created_player_orm))
-    except IntegrityError: # Catches unique constraint violations (and other integrity errors)
-        # Means player exists
-        # So, we attempt to update the existing record with the new fetched data.
-        print(f"Updating {player_name_lower}.")
-        try:
-            updated_player_orm = await player_interface.update_by_name(player_name_lower, fetched_profile_dict)
-            return PlayerCreateData(**player_interface.to_dict(updated_player_orm))
-        except Exception as update_e:
-            print(f"Error updating player {player_name_lower} after failed insert: {update_e}")
-            return None
+        profile = PlayerCreateData(**fetched_profile)
+        await player_interface.upsert_all([profile.model_dump()], ['player_name'], update_columns=PROFILE_COLUMNS)
+        profile_cache.counters["fetched"] += 1
+        profile_cache.put(profile)
+        return profile
     except Exception as e:
-        print(f"An unexpected error occurred during player creation for {player_name_lower}: {e}")
+        print(f"An unexpected error occurred during player upsert for {player_name_lower}: {e}")
         return None
+
+async def read_player_profile(player_name: str) -> Optional[PlayerCreateData]:
+    """
+    Returns: the player's profile as stored in the DB, None if the player isn't there.
+    """
+    rows = await open_request("SELECT * FROM player WHERE player_name = :player_name",
+                              {"player_name": player_name}, fetch_as_dict=True)
+    return PlayerCreateData(**rows[0]) if rows else None
+
+async def get_player_profile(player_name: str) -> Optional[PlayerCreateData]:
+    """
+    The player's profile, asking chess.com only when it expired (PROFILE_CACHE_TTL):
+    profile_cache first, then the DB row, then insert_player.
+    If chess.com can't answer, an expired profile at the DB is still used.
+
+    Returns: the profile, None if there is none anywhere.
+    """
+    player_name_lower = player_name.lower()
+    profile = profile_cache.get(player_name_lower)
+    if profile is not None:
+        return profile
+
+    stored = await read_player_profile(player_name_lower)
+    # bare opponents and failed enrichments have no joined date, they are fetched
+    if stored is not None and stored.joined and profile_cache.is_fresh(stored):
+        profile_cache.counters["db_hits"] += 1
+        profile_cache.put(stored)
+        return stored
+
+    profile = await insert_player({"player_name": player_name_lower})
+    if profile is None and stored is not None and stored.joined:
+        print(f"Profile of {player_name_lower} couldn't be refreshed, using the stored one.")
+        return stored
+    return profile
+
+async def select_players_to_enrich(limit: int, max_age_days: float) -> List[str]:
+    """
+    Players whose profile was never asked for (bare opponents) or is older than max_age_days,
+    never asked first.
+    """
+    rows = await open_request("""
+        SELECT player_name FROM player
+        WHERE profile_fetched_at IS NULL OR profile_fetched_at < :stale_before
+        ORDER BY profile_fetched_at NULLS FIRST
+        LIMIT :limit
+    """, {"stale_before": int(time.time() - max_age_days * 86400), "limit": limit})
+    return [row[0] for row in rows]
+
+async def enrich_profiles(limit: int = PROFILE_ENRICH_LIMIT,
+                          max_age_days: float = PROFILE_MAX_AGE_DAYS,
+                          batch_size: int = PROFILE_BATCH_SIZE,
+                          retry_seconds: float = PROFILE_RETRY_SECONDS) -> Dict[str, int]:
+    """
+    Fetches the missing or stale profiles of up to `limit` players from chess.com
+    and upserts them, batch_size profiles at a time. The requests of a batch run
+    concurrently through the shared client and rate limiter.
+
+    A profile that can't be fetched only gets its profile_fetched_at, so it isn't
+    first in line on every run. A profile chess.com says is gone (404/410, a
+    closed account) waits max_age_days like the others. One that failed for any
+    other reason (429, 5xx, timeout, open circuit breaker) is stamped as if it
+    was fetched max_age_days - retry_seconds ago, so it is stale again, and
+    retried, after retry_seconds.
+
+    Returns: players selected, enriched, gone and failed (gone included).
+    """
+    player_interface = DBInterface(Player)
+    start_enrich = time.time()
+    player_names = await select_players_to_enrich(limit, max_age_days)
+    summary = {"selected": len(player_names), "enriched": 0, "gone": 0, "failed": 0}
+
+    for i in range(0, len(player_names), batch_size):
+        batch = player_names[i:i + batch_size]
+        profiles = await asyncio.gather(*(get_profile(player_name, report_gone=True) for player_name in batch))
+        fetched_at = int(time.time())
+        retry_at = int(fetched_at - max_age_days * 86400 + retry_seconds)
+        enriched = [PlayerCreateData(**profile).model_dump() for profile in profiles
+                    if profile is not None and profile is not PROFILE_GONE]
+        failed = [{"player_name": player_name,
+                   "profile_fetched_at": fetched_at if profile is PROFILE_GONE else retry_at}
+                  for player_name, profile in zip(batch, profiles) if profile is None or profile is PROFILE_GONE]
+        if enriched:
+            await player_interface.upsert_all(enriched, ['player_name'], update_columns=PROFILE_COLUMNS)
+            for profile in enriched:
+                profile_cache.put(PlayerCreateData(**profile))
+        if failed:
+            await player_interface.upsert_all(failed, ['player_name'], update_columns=['profile_fetched_at'])
+        summary["enriched"] += len(enriched)
+        summary["gone"] += sum(profile is PROFILE_GONE for profile in profiles)
+        summary["failed"] += len(failed)
+        print(f"Profiles enriched: {summary['enriched']}, failed: {summary['failed']} "
+              f"({summary['gone']} gone) of {len(player_names)}")
+
+    print(f"Profile enrichment done in {time.time() - start_enrich:.2f} seconds: {summary}")
+    return summary
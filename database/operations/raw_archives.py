@@ -0,0 +1,168 @@
+# database/operations/raw_archives.py
+
+import gzip
+import hashlib
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from constants import RAW_ARCHIVE_DIR, RAW_ARCHIVE_MAX_BYTES
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class RawArchiveStore:
+    """
+    Raw chess.com month archives on disk, so re-ingesting (after a schema change
+    or a formatter fix) doesn't have to download them again.
+
+        {root}/blobs/ab/abcd...{.zst|.gz}    compressed response, named by its sha256
+        {root}/refs/{player}/{YYYY-MM}       sha256 and extension of the month's blob
+
+    Identical archives are stored once. Blobs are zstd compressed when zstandard
+    is installed, gzip otherwise (both are read back whatever the current default).
+    When the blobs pass max_bytes, the least recently used ones are evicted,
+    with the refs pointing to them.
+    """
+
+    def __init__(self, root: str, max_bytes: int = RAW_ARCHIVE_MAX_BYTES):
+        # resolved once, a later chdir doesn't move the store
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.blobs_dir = os.path.join(self.root, "blobs")
+        self.refs_dir = os.path.join(self.root, "refs")
+        self.extension = ".zst" if zstandard is not None else ".gz"
+        self.lock = threading.Lock()
+        self.total_bytes = None # computed on first write
+
+    def blob_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.blobs_dir, digest[:2], digest + extension)
+
+    def ref_path(self, player_name: str, year: int, month: int) -> str:
+        return os.path.join(self.refs_dir, player_name, f"{year}-{month:02d}")
+
+    @staticmethod
+    def write_atomically(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def compress(self, raw: bytes) -> bytes:
+        if self.extension == ".zst":
+            return zstandard.ZstdCompressor(level=3).compress(raw)
+        return gzip.compress(raw, compresslevel=6)
+
+    @staticmethod
+    def decompress(data: bytes, extension: str) -> bytes:
+        if extension == ".zst":
+            if zstandard is None:
+                raise RuntimeError("zstandard is needed to read .zst archives")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def save(self, player_name: str, year: int, month: int, raw: bytes) -> str:
+        """
+        Stores a month's raw response.
+
+        Returns: the sha256 of the raw bytes.
+        """
+        digest = hashlib.sha256(raw).hexdigest()
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = self.blobs_size()
+            existing = [ext for ext in (".zst", ".gz") if os.path.exists(self.blob_path(digest, ext))]
+            if existing:
+                extension = existing[0]
+                os.utime(self.blob_path(digest, extension))
+            else:
+                extension = self.extension
+                compressed = self.compress(raw)
+                self.write_atomically(self.blob_path(digest, extension), compressed)
+                self.total_bytes += len(compressed)
+            self.write_atomically(self.ref_path(player_name, year, month), f"{digest}{extension}".encode())
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+        return digest
+
+    def load(self, player_name: str, year: int, month: int) -> Optional[bytes]:
+        """
+        Returns: the month's raw response, None if it isn't stored.
+        """
+        try:
+            with open(self.ref_path(player_name, year, month)) as f:
+                blob_name = f.read().strip()
+            digest, extension = os.path.splitext(blob_name)
+            path = self.blob_path(digest, extension)
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path) # recently used, evicted last
+        except FileNotFoundError:
+            # evicted (blob, or ref and blob) meanwhile
+            return None
+        return self.decompress(data, extension)
+
+    def months(self, player_name: str) -> List[str]:
+        """
+        Returns: the 'YYYY-MM' months stored for a player, in calendar order.
+        """
+        try:
+            # save's half written refs end in .tmp
+            return sorted(name for name in os.listdir(os.path.join(self.refs_dir, player_name))
+                          if not name.endswith(".tmp"))
+        except FileNotFoundError:
+            return []
+
+    def blob_files(self) -> List[os.DirEntry]:
+        if not os.path.isdir(self.blobs_dir):
+            return []
+        entries = []
+        for prefix in os.scandir(self.blobs_dir):
+            if prefix.is_dir():
+                entries.extend(e for e in os.scandir(prefix.path) if not e.name.endswith(".tmp"))
+        return entries
+
+    def blobs_size(self) -> int:
+        return sum(entry.stat().st_size for entry in self.blob_files())
+
+    def evict(self):
+        """
+        Deletes least recently used blobs down to 90% of max_bytes, and their refs.
+        """
+        target = int(self.max_bytes * 0.9)
+        evicted = set()
+        for entry in sorted(self.blob_files(), key=lambda e: e.stat().st_mtime):
+            if self.total_bytes <= target:
+                break
+            self.total_bytes -= entry.stat().st_size
+            os.remove(entry.path)
+            evicted.add(entry.name)
+        if not evicted:
+            return
+        for player_name in os.listdir(self.refs_dir):
+            player_dir = os.path.join(self.refs_dir, player_name)
+            for month_str in os.listdir(player_dir):
+                ref = os.path.join(player_dir, month_str)
+                with open(ref) as f:
+                    if f.read().strip() in evicted:
+                        os.remove(ref)
+        print(f"Raw archive store: evicted {len(evicted)} archives, {self.total_bytes} bytes kept.")
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = self.blobs_size()
+            return {
+                "root": self.root,
+                "compression": self.extension.lstrip("."),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# off unless RAW_ARCHIVE_DIR is set
+raw_archive_store = RawArchiveStore(RAW_ARCHIVE_DIR) if RAW_ARCHIVE_DIR else None
@@ -0,0 +1,20 @@
+# database/routers/crawler.py
+from fastapi import APIRouter
+from database.operations.crawler import frontier_status, refresh_frontier
+
+router = APIRouter()
+
+@router.get("/crawler")
+async def api_crawler_status():
+    """
+    Players of the crawl frontier per status and the next ones to be crawled.
+    """
+    return await frontier_status()
+
+@router.post("/crawler/refresh")
+async def api_refresh_frontier():
+    """
+    Queues the opponents of the principal players now, instead of waiting for the crawler.
+    """
+    queued = await refresh_frontier()
+    return f"{queued} PLAYERS QUEUED OR RE-PRIORITIZED"
@@ -1,9 +1,8 @@
 # database/routers/games.py
 from fastapi.responses import JSONResponse
 from fastapi import APIRouter, Body
-from database.operations.games import create_games, read_game, update_player_games
-
-from database.database.ask_db import get_principal_players
+from database.operations.games import (create_games, read_game, update_player_games,
+                                       replay_player_games, update_all_players_games)
 router = APIRouter()
 
 
@@ -47,14 +46,24 @@ async def api_create_game(data: dict = Body(...)) -> JSONResponse:
     congratulation = await create_games(data)
     return congratulation
 
+# declared before /games/update/{player_name}, which would take "all" as a player name
+@router.post("/games/update/all")
+async def api_update_all_players_games() -> JSONResponse:
+    """
+    Updates every principal player, interleaving their downloads (see update_all_players_games).
+    """
+    congratulation = await update_all_players_games()
+    return congratulation
+
 @router.post("/games/update/{player_name}")
-async def api_update_player_games(data: dict = Body(...)) -> JSONResponse:
-    congratulation = await update_player_games(player_name)
+async def api_update_player_games(player_name: str) -> JSONResponse:
+    congratulation = await update_player_games(player_name.lower())
     return congratulation
 
-@router.post("/games/update/all")
-async def api_update_all_players_games() -> JSONResponse:
-    players = await get_principal_players()
-    for player in players:
-        await update_player_games(player_name)
-    return "EVERY PLAYER UPDATED"
+@router.post("/games/replay/{player_name}")
+async def api_replay_player_games(player_name: str) -> JSONResponse:
+    """
+    Formats and inserts the player's months again from the raw archive store, no chess.com calls.
+    """
+    congratulation = await replay_player_games(player_name.lower())
+    return congratulation
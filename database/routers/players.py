@@ -1,7 +1,8 @@
 # ROUTERS
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
-from database.operations.players import get_current_players_with_games_in_db
+from database.operations.players import get_current_players_with_games_in_db, enrich_profiles
+from constants import PROFILE_ENRICH_LIMIT
 from typing import Dict, Any
 
 router = APIRouter()
@@ -10,4 +11,12 @@ router = APIRouter()
 async def api_get_current_players_with_games():
     result = await get_current_players_with_games_in_db()
     return result
-    
\ No newline at end of file
+    
+
+@router.post("/players/enrich")
+async def api_enrich_profiles(limit: int = PROFILE_ENRICH_LIMIT):
+    """
+    Fetches the missing or stale profiles of up to `limit` players (see enrich_profiles).
+    """
+    result = await enrich_profiles(limit=limit)
+    return result
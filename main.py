@@ -4,17 +4,34 @@ from dotenv import load_dotenv
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from constants import CONN_STRING
-from database.database.engine import init_db
-from database.routers import games, players
+from database.database.engine import init_db, dispose_engine, engine_pool_stats
+from database.database.query_plans import check_query_plans
+from database.routers import games, players, crawler
 from database.database.db_interface import DBInterface
+from database.operations.format_games import start_format_pool, stop_format_pool
+from database.operations.chess_com_client import start_chess_com_client, stop_chess_com_client, chess_com_client_stats
+from database.operations.chess_com_api import chess_com_rate_limiter, chess_com_circuit_breaker, archive_validators
+from database.operations.raw_archives import raw_archive_store
+from database.operations.crawler import start_crawler, stop_crawler
+from database.operations.players import profile_cache
+from database.operations.known_links import known_links, start_known_links, stop_known_links
 
 # lifespan event handler for new implementation
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db(CONN_STRING)
     DBInterface.initialize_engine_and_session(CONN_STRING)
+    start_known_links()
+    start_format_pool()
+    start_chess_com_client()
+    await start_crawler()
     print('BASAL Server ON YO!...')
     yield
+    await stop_crawler()
+    await stop_known_links()
+    await stop_format_pool()
+    await stop_chess_com_client()
+    await dispose_engine()
     print('BASAL Server DOWN YO!...')
 
 app = FastAPI(lifespan=lifespan)
@@ -23,5 +40,25 @@ app = FastAPI(lifespan=lifespan)
 def read_root():
     return "MAIN_CHESSISM server running."
 
+@app.get("/stats/http")
+def read_http_stats():
+    return {
+        **chess_com_client_stats(),
+        "rate_limiter": chess_com_rate_limiter.stats(),
+        "circuit_breaker": chess_com_circuit_breaker.stats(),
+        "archive_validators": archive_validators.stats(),
+        "raw_archive_store": raw_archive_store.stats() if raw_archive_store is not None else None,
+        "profile_cache": profile_cache.stats(),
+    }
+
+@app.get("/stats/db")
+def read_db_stats():
+    return {**engine_pool_stats(), "known_links": known_links.stats()}
+
+@app.get("/stats/db/plans")
+async def read_db_plans():
+    return await check_query_plans()
+
 app.include_router(players.router)
-app.include_router(games.router)
\ No newline at end of file
+app.include_router(games.router)
+app.include_router(crawler.router)
\ No newline at end of file